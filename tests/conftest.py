@@ -0,0 +1,45 @@
+"""测试共用的卡组状态、伤害序列和精确解"""
+
+import pytest
+
+from wssim import parse_damage_sequence, solve_exact
+
+# 小卡组：序列中途会卡组更新、升级，并触发zj追加
+DECK = (15, 3, 10, 2, 3, 1)
+SEQUENCE = "2zj(3),3,1,4"
+# 检查蒙特卡洛估计时使用的置信水平，固定种子下结果确定，不会偶然失败
+CONFIDENCE = 0.999
+
+class ExactDistribution:
+    """solve_exact 给出的伤害分布，用来检查各模拟引擎的估计"""
+    def __init__(self, deck, damage_seq, draw_card):
+        self.damage_probs, self.refresh_probs, self.level_up_probs = solve_exact(
+            *deck, damage_seq, draw_card)
+        self.survival = [sum(self.damage_probs[k:]) for k in range(len(self.damage_probs))]
+        self.mean = sum(k * p for k, p in enumerate(self.damage_probs))
+
+    def at_least(self, k):
+        return self.survival[k] if k < len(self.survival) else 0.0
+
+    def check(self, result, confidence=CONFIDENCE):
+        """result 的期望伤害和每个 P(伤害≥k) 的置信区间都覆盖精确值"""
+        low, high = result.mean_interval(confidence)
+        assert low <= self.mean <= high, (self.mean, low, high)
+        for k, p in enumerate(self.survival):
+            low, high = result.survival_interval(k, confidence)
+            assert low - 1e-12 <= p <= high + 1e-12, (k, p, low, high)
+
+@pytest.fixture
+def deck():
+    return DECK
+
+@pytest.fixture
+def sequence():
+    return parse_damage_sequence(SEQUENCE)
+
+@pytest.fixture
+def exact(sequence):
+    """exact(damage_seq=共用序列, deck=共用卡组, draw_card=True) -> ExactDistribution"""
+    def distribution(damage_seq=sequence, deck=DECK, draw_card=True):
+        return ExactDistribution(deck, damage_seq, draw_card)
+    return distribution
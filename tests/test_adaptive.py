@@ -0,0 +1,54 @@
+"""自适应试验次数：达到目标精度即停止，不超过上限，估计与精确解一致"""
+
+import pytest
+
+from wssim import PROGRESS_INTERVAL, simulate_adaptive
+
+def half_width(interval):
+    low, high = interval
+    return (high - low) / 2
+
+def test_stops_when_target_reached(deck, sequence, exact):
+    result = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.01, seed=1)
+    assert half_width(result.survival_interval(8)) <= 0.01
+    # 分批模拟，上一批结束时尚未达标
+    assert result.trials % PROGRESS_INTERVAL == 0
+    previous = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.01, seed=1,
+                                 max_trials=result.trials - PROGRESS_INTERVAL)
+    assert half_width(previous.survival_interval(8)) > 0.01
+    exact().check(result)
+
+def test_mean_half_width(deck, sequence):
+    result = simulate_adaptive(*deck, sequence, True, mean_half_width=0.05, seed=2)
+    assert half_width(result.mean_interval()) <= 0.05
+    both = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.01,
+                             mean_half_width=0.05, seed=2)
+    assert both.trials >= result.trials
+    assert half_width(both.survival_interval(8)) <= 0.01
+
+def test_max_trials_caps_run(deck, sequence):
+    result = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.001,
+                               max_trials=3000, seed=3)
+    assert result.trials == 3000
+    assert half_width(result.survival_interval(8)) > 0.001
+
+def test_easy_target_uses_min_trials(deck, sequence):
+    result = simulate_adaptive(*deck, sequence, True, threshold=0, half_width=0.2, seed=4)
+    assert result.trials == PROGRESS_INTERVAL
+
+def test_seeded_adaptive_is_deterministic(deck, sequence):
+    first = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.02, seed=5)
+    second = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.02, seed=5)
+    assert first.damage_hist == second.damage_hist
+
+def test_requires_stop_condition(deck, sequence):
+    with pytest.raises(ValueError):
+        simulate_adaptive(*deck, sequence, True)
+
+def test_progress_estimates_total(deck, sequence):
+    calls = []
+    result = simulate_adaptive(*deck, sequence, True, threshold=8, half_width=0.01, seed=1,
+                               progress=lambda done, total: calls.append((done, total)))
+    assert calls
+    assert all(done < total for done, total in calls)
+    assert calls[-1][0] == result.trials - PROGRESS_INTERVAL
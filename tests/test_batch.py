@@ -0,0 +1,29 @@
+"""向量化批量引擎与精确解和逐次模拟同分布"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from wssim import parse_damage_sequence, simulate
+from wssim.batch import simulate_batch
+
+@pytest.mark.parametrize("draw_card", [False, True])
+def test_batch_matches_exact(draw_card, deck, sequence, exact):
+    result = simulate_batch(*deck, sequence, draw_card, trials=20000, batch_size=7000, seed=1)
+    assert result.trials == 20000
+    exact(draw_card=draw_card).check(result)
+
+@pytest.mark.parametrize("text", ["*2zj(1),*3zj(2),4", "3,fx2,3", "DT>RS4:C+zj(2),3"])
+def test_batch_matches_simulate(text, deck):
+    damage_seq = parse_damage_sequence(text)
+    batch = simulate_batch(*deck, damage_seq, True, trials=20000, seed=1)
+    direct = simulate(*deck, damage_seq, True, trials=20000, seed=2)
+    std_error = ((batch.std_damage() ** 2 + direct.std_damage() ** 2) / 20000) ** 0.5
+    assert abs(batch.mean_damage() - direct.mean_damage()) <= 4 * std_error
+    assert abs(batch.mean_refreshes() - direct.mean_refreshes()) <= 0.05
+
+def test_batch_is_deterministic(deck, sequence):
+    first = simulate_batch(*deck, sequence, True, trials=3000, batch_size=1000, seed=4)
+    second = simulate_batch(*deck, sequence, True, trials=3000, batch_size=1000, seed=4)
+    assert first.damage_hist == second.damage_hist
+    assert first.level_up_hist == second.level_up_hist
@@ -0,0 +1,35 @@
+"""基准测试的用例集、参考基准和退步判断"""
+
+import json
+
+from wssim import parse_damage_sequence
+from wssim.bench import CORPUS, DEFAULT_BASELINE, compare, run_benchmarks
+
+def test_corpus_parses_and_covers_draw_card():
+    for damage, state, draw_card in CORPUS.values():
+        assert parse_damage_sequence(damage)
+        assert len(state) == 6
+    assert any(draw_card for _, _, draw_card in CORPUS.values())
+
+def test_reference_baseline_covers_corpus():
+    with open(DEFAULT_BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    for case in CORPUS:
+        assert baseline[f"{case}/simulate"]["trials_per_sec"] > 0
+
+def test_run_benchmarks_reports_each_case():
+    report = run_benchmarks(cases=["plain", "draw-card"], trials=200, repeat=1)
+    assert set(report) == {"plain/simulate", "draw-card/simulate"}
+    assert all(entry["trials_per_sec"] > 0 for entry in report.values())
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {"a/simulate": {"trials_per_sec": 1000.0, "peak_kib": 10.0},
+                "b/simulate": {"trials_per_sec": 1000.0, "peak_kib": 10.0}}
+    report = {"a/simulate": {"trials_per_sec": 900.0, "peak_kib": 11.0},
+              "b/simulate": {"trials_per_sec": 800.0, "peak_kib": 12.0},
+              "c/simulate": {"trials_per_sec": 1.0, "peak_kib": 1000.0}}
+    assert compare(report, baseline, threshold=0.15) == [
+        ("b/simulate", "trials_per_sec", 1000.0, 800.0),
+        ("b/simulate", "peak_kib", 10.0, 12.0),
+    ]
+    assert compare(report, baseline, threshold=0.25) == []
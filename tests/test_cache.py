@@ -0,0 +1,84 @@
+"""磁盘结果缓存：命中直接返回、按最近使用淘汰、等价序列和参数共用缓存键"""
+
+import pytest
+
+import wssim.cache
+from wssim import ResultCache, compile_damage_sequence, parse_damage_sequence, simulate
+from wssim.cache import cache_key
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache.sqlite3"))
+
+def test_hit_returns_stored_result_without_simulating(cache, deck, sequence, monkeypatch):
+    first = cache.simulate(*deck, sequence, True, trials=2000, seed=1)
+    assert first.damage_hist == simulate(*deck, sequence, True, trials=2000, seed=1).damage_hist
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("命中缓存时不应模拟")
+    monkeypatch.setattr(wssim.cache, "simulate_program", fail)
+    second = cache.simulate(*deck, sequence, True, trials=2000, seed=1)
+    assert second.damage_hist == first.damage_hist
+    assert second.refresh_hist == first.refresh_hist
+    assert second.level_up_hist == first.level_up_hist
+    assert second.mean_damage() == first.mean_damage()
+
+def test_cache_survives_reopening(tmp_path, deck, sequence):
+    path = str(tmp_path / "cache.sqlite3")
+    first = ResultCache(path).simulate(*deck, sequence, trials=1000, seed=2)
+    key = cache_key(compile_damage_sequence(sequence), *deck, False, 1000, 2)
+    assert ResultCache(path).get(key).damage_hist == first.damage_hist
+
+def test_unseeded_runs_are_not_cached(cache, deck, sequence, monkeypatch):
+    cache.simulate(*deck, sequence, trials=500)
+    stored = []
+    monkeypatch.setattr(cache, "put", lambda key, result: stored.append(key))
+    monkeypatch.setattr(cache, "get", lambda key: pytest.fail("seed为None时不应查询缓存"))
+    cache.simulate(*deck, sequence, trials=500)
+    assert stored == []
+
+def test_key_normalization(sequence):
+    program = compile_damage_sequence(sequence)
+    key = cache_key(program, 15, 3, 10, 2, 3, 1, True, 1000, 1)
+    # 写法不同但编译结果相同的序列、等价的 draw_card 值命中同一条缓存
+    spaced = compile_damage_sequence(parse_damage_sequence("2zj( 3 ), 3 ,1, 4"))
+    assert cache_key(spaced, 15, 3, 10, 2, 3, 1, 1, 1000, 1) == key
+    # 其余任何一项不同都得到不同的键
+    others = [
+        cache_key(compile_damage_sequence(parse_damage_sequence("2zj(3),3,1,3")),
+                  15, 3, 10, 2, 3, 1, True, 1000, 1),
+        cache_key(program, 15, 4, 10, 2, 3, 1, True, 1000, 1),
+        cache_key(program, 15, 3, 10, 2, 3, 1, False, 1000, 1),
+        cache_key(program, 15, 3, 10, 2, 3, 1, True, 1001, 1),
+        cache_key(program, 15, 3, 10, 2, 3, 1, True, 1000, 2),
+    ]
+    assert len(set(others + [key])) == len(others) + 1
+
+def test_engine_version_is_part_of_key(sequence, monkeypatch):
+    program = compile_damage_sequence(sequence)
+    key = cache_key(program, 15, 3, 10, 2, 3, 1, True, 1000, 1)
+    monkeypatch.setattr(wssim.cache, "ENGINE_VERSION", wssim.cache.ENGINE_VERSION + 1)
+    assert cache_key(program, 15, 3, 10, 2, 3, 1, True, 1000, 1) != key
+
+def test_lru_eviction(tmp_path, deck, sequence, monkeypatch):
+    clock = iter(range(1, 1000))
+    monkeypatch.setattr(wssim.cache.time, "time", lambda: next(clock))
+    probe = ResultCache(str(tmp_path / "probe.sqlite3"))
+    size = len(wssim.cache._encode(probe.simulate(*deck, sequence, trials=200, seed=1)))
+    
+    # 容量约为三条结果
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_bytes=size * 3 + size // 2)
+    program = compile_damage_sequence(sequence)
+    keys = [cache_key(program, *deck, False, 200, seed) for seed in range(1, 5)]
+    for seed in (1, 2, 3):
+        cache.simulate(*deck, sequence, trials=200, seed=seed)
+    assert cache.get(keys[0]) is not None     # 使用后seed=1成为最近使用
+    cache.simulate(*deck, sequence, trials=200, seed=4)
+    
+    assert cache.get(keys[1]) is None          # 最久未使用的seed=2被淘汰
+    assert all(cache.get(keys[i]) is not None for i in (0, 2, 3))
+
+def test_clear(cache, deck, sequence):
+    cache.simulate(*deck, sequence, trials=200, seed=1)
+    cache.clear()
+    assert cache.get(cache_key(compile_damage_sequence(sequence), *deck, False, 200, 1)) is None
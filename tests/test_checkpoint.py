@@ -0,0 +1,70 @@
+"""前缀状态检查点：从保存的状态续算与完整模拟同分布"""
+
+import pytest
+
+from wssim import (PrefixCheckpoint, compile_damage_sequence, parse_damage_sequence, simulate,
+                   simulate_incremental, simulate_program)
+
+PREFIX = parse_damage_sequence("2zj(3),3")
+
+def test_fresh_run_equals_simulate(deck, sequence):
+    result, checkpoint = simulate_incremental(*deck, sequence, True, trials=3000, seed=1)
+    assert result.damage_hist == simulate(*deck, sequence, True, trials=3000, seed=1).damage_hist
+    assert isinstance(checkpoint, PrefixCheckpoint)
+    assert len(checkpoint.states) == len(sequence)
+    for states in checkpoint.states:
+        assert sum(states.values()) == 3000
+
+def test_extended_sequence_resumes_from_prefix(deck, sequence, exact):
+    _, checkpoint = simulate_incremental(*deck, PREFIX, True, trials=20000, seed=1)
+    program = compile_damage_sequence(sequence)
+    assert checkpoint.extended_by(deck, 20000, program)
+    assert checkpoint.reusable(deck, 20000, program) == len(PREFIX)
+    
+    result, extended = simulate_incremental(*deck, sequence, True, trials=20000, seed=2,
+                                            checkpoint=checkpoint, extend_only=True)
+    assert result.trials == 20000
+    exact().check(result)
+    # 前缀部分的状态直接沿用
+    assert extended.states[:len(PREFIX)] == checkpoint.states
+    assert len(extended.states) == len(sequence)
+
+def test_edited_tail_resumes_from_common_prefix(deck, sequence, exact):
+    _, checkpoint = simulate_incremental(*deck, sequence, True, trials=20000, seed=1)
+    edited = parse_damage_sequence("2zj(3),3,1,3")
+    assert checkpoint.reusable(deck, 20000, compile_damage_sequence(edited)) == 3
+    assert not checkpoint.extended_by(deck, 20000, compile_damage_sequence(edited))
+    
+    result, _ = simulate_incremental(*deck, edited, True, trials=20000, seed=2,
+                                     checkpoint=checkpoint)
+    exact(edited).check(result)
+
+def test_extend_only_resimulates_other_edits(deck, sequence):
+    _, checkpoint = simulate_incremental(*deck, sequence, True, trials=2000, seed=1)
+    edited = parse_damage_sequence("2zj(3),3,1,3")
+    result, _ = simulate_incremental(*deck, edited, True, trials=2000, seed=5,
+                                     checkpoint=checkpoint, extend_only=True)
+    assert result.damage_hist == simulate(*deck, edited, True, trials=2000, seed=5).damage_hist
+
+@pytest.mark.parametrize("state, trials", [
+    ((15, 4, 10, 2, 3, 1), 2000),
+    ((15, 3, 10, 2, 3, 1), 2001),
+])
+def test_checkpoint_requires_same_state_and_trials(state, trials, sequence):
+    _, checkpoint = simulate_incremental(15, 3, 10, 2, 3, 1, PREFIX, trials=2000, seed=1)
+    program = compile_damage_sequence(sequence)
+    assert checkpoint.reusable(state, trials, program) == 0
+    assert not checkpoint.extended_by(state, trials, program)
+
+def test_changed_szj_carry_is_not_reused(deck):
+    # 前缀相同但传火效果改变了下一项的编译结果，不能续算
+    _, checkpoint = simulate_incremental(*deck, parse_damage_sequence("2zj(1),3"), trials=500,
+                                         seed=1)
+    program = compile_damage_sequence(parse_damage_sequence("*2zj(1),3,4"))
+    assert checkpoint.reusable(deck, 500, program) == 0
+
+def test_resume_rejects_trial_seeds(deck, sequence):
+    _, checkpoint = simulate_incremental(*deck, PREFIX, trials=100, seed=1)
+    with pytest.raises(ValueError):
+        simulate_program(compile_damage_sequence(sequence), *deck, trial_seeds=[1, 2],
+                         resume=(1, checkpoint.states[0]))
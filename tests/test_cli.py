@@ -0,0 +1,86 @@
+"""命令行入口的输出格式和参数检查"""
+
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from wssim import parse_damage_sequence, simulate
+from wssim.cli import main
+
+ARGS = ["2zj(3),4", "-D", "20", "-N", "4", "-R", "5", "--RC", "1", "-n", "3000", "--seed", "9"]
+
+def test_json_output_matches_simulate(capsys):
+    assert main(ARGS) == 0
+    data = json.loads(capsys.readouterr().out)
+    result = simulate(20, 4, 5, 1, 0, 0, parse_damage_sequence("2zj(3),4"), trials=3000, seed=9)
+    
+    assert data["params"] == {"D": 20, "N": 4, "R": 5, "RC": 1, "C": 0, "CC": 0,
+                              "damage": "2zj(3),4", "draw_card": False, "trials": 3000,
+                              "seed": 9, "workers": 1}
+    assert data["adaptive"] is None
+    assert data["damage_hist"] == {str(k): v for k, v in result.damage_hist.items()}
+    assert data["mean_damage"] == pytest.approx(result.mean_damage())
+    assert data["survival"] == pytest.approx(result.survival())
+    assert data["median_damage"] == result.percentile(50)
+
+def test_csv_output_by_extension(tmp_path):
+    path = tmp_path / "result.csv"
+    assert main(ARGS + ["-o", str(path)]) == 0
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    result = simulate(20, 4, 5, 1, 0, 0, parse_damage_sequence("2zj(3),4"), trials=3000, seed=9)
+    
+    assert [int(row["damage"]) for row in rows] == list(range(result.min_damage,
+                                                              result.max_damage + 1))
+    assert sum(int(row["count"]) for row in rows) == 3000
+    for row in rows:
+        k = int(row["damage"])
+        assert float(row["at_least"]) == pytest.approx(result.survival()[k], abs=1e-6)
+
+def test_adaptive_output_reports_interval(capsys):
+    assert main(ARGS + ["--half-width", "0.05", "--lethal", "4"]) == 0
+    data = json.loads(capsys.readouterr().out)
+    low, high = data["adaptive"]["interval"]
+    assert data["adaptive"]["lethal"] == 4
+    assert high - low <= 2 * 0.05 + 1e-9
+    assert data["params"]["trials"] <= 3000
+
+@pytest.mark.parametrize("extra", [
+    ["-n", "0"],
+    ["-j", "-1"],
+    ["-N", "21"],
+    ["--RC", "6"],
+    ["-C", "-1"],
+    ["--CC", "1"],
+    ["--half-width", "0.6"],
+    ["-j", "2", "--profile"],
+    ["-j", "0", "--half-width", "0.05"],
+    ["--profile", "--half-width", "0.05"],
+    ["--cache", "x.sqlite3", "--profile"],
+])
+def test_invalid_arguments_are_rejected(extra, capsys):
+    with pytest.raises(SystemExit) as info:
+        main(ARGS + extra)
+    assert info.value.code == 2
+    assert "error" in capsys.readouterr().err
+
+def test_cache_requires_seed(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main(["2,3", "--cache", str(tmp_path / "cache.sqlite3")])
+    assert "--seed" in capsys.readouterr().err
+
+@pytest.mark.parametrize("damage", ["2zj(", "", "abc"])
+def test_unparsable_sequence_is_rejected(damage):
+    with pytest.raises(SystemExit):
+        main([damage])
+
+def test_cli_imports_no_gui_modules():
+    code = ("import sys, wssim.cli; "
+            "print(any(m in sys.modules for m in ('tkinter', 'matplotlib', 'numpy')))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=Path(__file__).resolve().parents[1], check=True).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,55 @@
+"""共同随机数配对比较：差值的置信区间覆盖精确差值，且比独立模拟窄得多"""
+
+import pytest
+
+from wssim import compare_paired
+from wssim.result import z_value
+
+def config(damage_seq, D=15, N=3, R=10, RC=2, C=3, CC=1, draw_card=True):
+    return {'D': D, 'N': N, 'R': R, 'RC': RC, 'C': C, 'CC': CC,
+            'damage_seq': damage_seq, 'draw_card': draw_card}
+
+def test_identical_configs_have_zero_difference(sequence):
+    results, (difference,) = compare_paired([config(sequence), config(sequence)], 6,
+                                            trials=3000, seed=1)
+    assert results[0].damage_hist == results[1].damage_hist
+    assert difference.mean == 0 and difference.mean_ci == (0.0, 0.0)
+    assert difference.lethal == 0 and difference.lethal_ci == (0.0, 0.0)
+
+def test_paired_difference_covers_exact(sequence, exact):
+    configs = [config(sequence), config(sequence, N=4), config(sequence, RC=0)]
+    results, differences = compare_paired(configs, 8, trials=20000, seed=2, confidence=0.999)
+    assert [result.trials for result in results] == [20000] * 3
+    
+    base = exact()
+    for cfg, result, difference in zip(configs[1:], results[1:], differences):
+        other = exact(deck=(cfg['D'], cfg['N'], cfg['R'], cfg['RC'], cfg['C'], cfg['CC']))
+        other.check(result)
+        low, high = difference.mean_ci
+        assert low <= other.mean - base.mean <= high
+        low, high = difference.lethal_ci
+        assert low <= other.at_least(8) - base.at_least(8) <= high
+        assert difference.mean == pytest.approx(result.mean_damage() - results[0].mean_damage())
+
+def test_paired_interval_is_narrower_than_independent(sequence):
+    configs = [config(sequence), config(sequence, N=4)]
+    results, (difference,) = compare_paired(configs, 8, trials=20000, seed=3)
+    low, high = difference.mean_ci
+    # 两次独立模拟之差的正态区间半宽
+    independent = z_value(0.95) * ((results[0].std_damage() ** 2
+                                    + results[1].std_damage() ** 2) / 20000) ** 0.5
+    assert (high - low) / 2 < 0.8 * independent
+
+def test_paired_comparison_is_reproducible(sequence):
+    configs = [config(sequence), config(sequence, N=4)]
+    first = compare_paired(configs, 6, trials=2500, seed=4)
+    second = compare_paired(configs, 6, trials=2500, seed=4)
+    assert first[1] == second[1]
+    assert [r.damage_hist for r in first[0]] == [r.damage_hist for r in second[0]]
+
+def test_progress_reports_batches(sequence):
+    calls = []
+    compare_paired([config(sequence), config(sequence, N=4)], 6, trials=2500, seed=5,
+                   progress=lambda done, total: calls.append((done, total)))
+    assert calls[-1] == (2500, 2500)
+    assert [done for done, _ in calls] == sorted(done for done, _ in calls)
@@ -0,0 +1,33 @@
+"""精确解：概率之和为1，与蒙特卡洛模拟在置信区间内一致，不支持的序列抛出ValueError"""
+
+import pytest
+
+from wssim import parse_damage_sequence, simulate, solve_exact
+
+@pytest.mark.parametrize("draw_card", [False, True])
+def test_probabilities_sum_to_one(draw_card, deck, sequence):
+    for probs in solve_exact(*deck, sequence, draw_card):
+        assert sum(probs) == pytest.approx(1.0)
+        assert all(p >= 0 for p in probs)
+
+@pytest.mark.parametrize("draw_card", [False, True])
+def test_simulate_matches_exact(draw_card, deck, sequence, exact):
+    result = simulate(*deck, sequence, draw_card, trials=20000, seed=1)
+    assert result.trials == 20000
+    exact(draw_card=draw_card).check(result)
+
+def test_deterministic_deck():
+    # 没有高潮卡时每点伤害都命中
+    damage_probs, refresh_probs, _ = solve_exact(20, 0, 0, 0, 0, 0,
+                                                 parse_damage_sequence("2zj(3),4"))
+    assert damage_probs == pytest.approx([0.0] * 6 + [1.0])
+    assert refresh_probs == pytest.approx([1.0])
+
+@pytest.mark.parametrize("text, state", [
+    ("RS>DT2,3", (15, 3, 10, 2, 3, 1)),
+    ("CL>RS1,3", (15, 3, 10, 2, 3, 1)),
+    ("3", (15, 3, 10, 2, 7, 1)),
+])
+def test_unsupported_sequences_raise(text, state):
+    with pytest.raises(ValueError):
+        solve_exact(*state, parse_damage_sequence(text))
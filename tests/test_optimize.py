@@ -0,0 +1,64 @@
+"""伤害顺序优化：列出不同排列，逐次减半淘汰后排名第一的顺序接近精确最优"""
+
+import pytest
+
+from wssim import format_damage_seq, parse_damage_sequence, solve_exact
+from wssim.optimize import optimize_order, orderings
+
+ITEMS = parse_damage_sequence("*2zj(1),3,1,4")
+
+def keys(orders):
+    return [format_damage_seq(order) for order in orders]
+
+def test_orderings_are_distinct_permutations():
+    orders = orderings(parse_damage_sequence("3,3,2zj(1)"))
+    assert sorted(keys(orders)) == ["2zj(1),3,3", "3,2zj(1),3", "3,3,2zj(1)"]
+    assert len(orderings(ITEMS)) == 24
+
+def test_orderings_sample_when_too_many():
+    items = parse_damage_sequence("1,2,3,4,5,6,7")
+    sampled = orderings(items, max_orders=50, seed=1)
+    assert len(set(keys(sampled))) == 50
+    assert keys(sampled) == keys(orderings(items, max_orders=50, seed=1))
+    for order in sampled:
+        assert sorted(order) == sorted(items)
+
+def test_best_order_is_near_exact_optimum(deck):
+    exact = {}
+    for order in orderings(ITEMS):
+        damage_probs, _, _ = solve_exact(*deck, order)
+        exact[format_damage_seq(order)] = sum(damage_probs[7:])
+    
+    ranked = optimize_order(ITEMS, 7, *deck, workers=1, seed=1)
+    assert sorted(keys(entry.damage_seq for entry in ranked)) == sorted(exact)
+    best = ranked[0]
+    assert exact[format_damage_seq(best.damage_seq)] >= max(exact.values()) - 0.03
+    # 领先者得到最多的试验，明显较差的顺序只得到第一批
+    assert best.result.trials == max(entry.result.trials for entry in ranked)
+    assert min(entry.result.trials for entry in ranked) == 400
+    worst = min(exact, key=exact.get)
+    assert next(entry for entry in ranked
+                if format_damage_seq(entry.damage_seq) == worst).result.trials == 400
+    for entry in ranked:
+        low, high = entry.interval
+        assert low <= entry.probability <= high
+
+def test_parallel_ranking_matches_serial(deck):
+    serial = optimize_order(ITEMS, 7, *deck, max_rounds=3, workers=1, seed=2)
+    pooled = optimize_order(ITEMS, 7, *deck, max_rounds=3, workers=2, seed=2)
+    assert [(keys([e.damage_seq]), e.result.damage_hist) for e in serial] == [
+        (keys([e.damage_seq]), e.result.damage_hist) for e in pooled]
+
+def test_progress_reaches_total(deck):
+    calls = []
+    ranked = optimize_order(ITEMS, 7, *deck, workers=1, seed=3,
+                            progress=lambda done, total: calls.append((done, total)))
+    done = sum(entry.result.trials for entry in ranked)
+    assert calls[-1][0] == done
+    assert all(d <= total for d, total in calls)
+
+def test_single_order():
+    (entry,) = optimize_order(parse_damage_sequence("3,3"), 4, 20, 4, 0, 0, 0, 0, workers=1,
+                              seed=1)
+    assert entry.result.trials == 400
+    assert entry.probability == pytest.approx(entry.result.survival(4)[4])
@@ -0,0 +1,61 @@
+"""性能剖析：结果与不剖析时相同，计数与模拟一致，未启用时不执行剖析代码"""
+
+from wssim import EngineProfile, compile_damage_sequence, parse_damage_sequence, simulate
+from wssim.profile import describe_op
+
+def test_profiled_result_is_identical(deck, sequence):
+    profile = EngineProfile()
+    profiled = simulate(*deck, sequence, True, trials=3000, seed=1, profile=profile)
+    plain = simulate(*deck, sequence, True, trials=3000, seed=1)
+    assert profiled.damage_hist == plain.damage_hist
+    assert profiled.refresh_hist == plain.refresh_hist
+    assert profiled.level_up_hist == plain.level_up_hist
+    
+    assert profile.trials == 3000
+    assert profile.refreshes == sum(k * v for k, v in plain.refresh_hist.items())
+    assert profile.level_ups == sum(k * v for k, v in plain.level_up_hist.items())
+
+def test_counts_per_position_and_reveals():
+    # 没有高潮卡、卡组足够大：每次试验每个位置恰好执行一次，翻开2+3张
+    profile = EngineProfile()
+    simulate(30, 0, 0, 0, 0, 0, parse_damage_sequence("2,3"), trials=500, seed=1, profile=profile)
+    assert profile.reveals == 500 * 5
+    positions = profile.by_position()
+    assert sorted((index, text, calls) for index, text, calls, _, _ in positions) == [
+        (0, "2", 500), (1, "3", 500)]
+    assert all(total >= own >= 0 for _, _, _, total, own in positions)
+    assert profile.by_type()["伤害"][0] == 1000
+
+def test_zj_branches_are_counted_inside_their_damage():
+    # 全是高潮卡：第一张就取消，每次都执行zj分支
+    profile = EngineProfile()
+    simulate(10, 10, 0, 0, 0, 0, parse_damage_sequence("2zj(1)"), trials=200, seed=1,
+             profile=profile)
+    rows = {text: (calls, total, own) for _, text, calls, total, own in profile.by_position()}
+    assert rows["2zj"][0] == 200 and rows["1"][0] == 200
+    assert rows["2zj"][1] >= rows["1"][1]
+
+def test_profile_accumulates_and_reports(deck, sequence):
+    profile = EngineProfile()
+    simulate(*deck, sequence, True, trials=1000, seed=1, profile=profile)
+    simulate(*deck, sequence, True, trials=1000, seed=2, profile=profile)
+    assert profile.trials == 2000
+    data = profile.to_dict()
+    assert data["trials"] == 2000
+    assert {"伤害", "refresh_deck", "check_level_up"} <= set(data["by_type"])
+    assert [entry["index"] for entry in data["by_position"]] == [
+        index for index, *_ in profile.by_position()]
+    report = profile.format_report()
+    assert "试验次数: 2000" in report and "2zj" in report
+
+def test_describe_op():
+    ops = compile_damage_sequence(parse_damage_sequence(
+        "3,2zj(1),*2zj(1),fx2,DT>RS4:C+zj(2),DT>RS3,CL-C,DT+N")).ops
+    texts = {describe_op(op) for op in ops}
+    assert {"3", "2zj", "*2zj", "fx2", "DT>RS4:C", "DT>RS3", "CL-C", "DT+N"} <= texts
+
+def test_disabled_profile_runs_no_instrumentation(deck, sequence, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("未启用剖析时不应包装引擎")
+    monkeypatch.setattr(EngineProfile, "instrument", fail)
+    simulate(*deck, sequence, True, trials=200, seed=1)
@@ -0,0 +1,97 @@
+"""伤害序列编译：操作记录、追加分支与传火入口表，以及编译后的引擎与精确解一致"""
+
+import pytest
+
+from wssim import compile_damage_sequence, parse_damage_sequence, simulate, slot_ops_end
+from wssim.program import (OP_DAMAGE, OP_FX, OP_MOVE, OP_ADD, OP_REMOVE, ZONE_DT, ZONE_RS,
+                           ZONE_CL, EFFECT_NONE, EFFECT_ZJ, EFFECT_SZJ)
+
+def compile_text(text):
+    return compile_damage_sequence(parse_damage_sequence(text))
+
+def test_ops_are_decoded_once():
+    ops, slots, tail = compile_text("3,fx2,DT>RS4:C+zj(2),DT>RS3,CL-C,DT+N")
+    top = [ops[slot[0]] for slot in slots]
+    assert [(op.code, op.count) for op in top] == [
+        (OP_DAMAGE, 3), (OP_FX, 2), (OP_MOVE, 4), (OP_MOVE, 3), (OP_REMOVE, 1), (OP_ADD, 1)]
+    conditional, plain, remove, add = top[2:]
+    assert (conditional.src, conditional.dst, conditional.card, conditional.effect) == (
+        ZONE_DT, ZONE_RS, 'C', EFFECT_ZJ)
+    assert [(op.code, op.count) for op in ops[conditional.start:conditional.end]] == [(OP_DAMAGE, 2)]
+    assert (plain.src, plain.dst, plain.card, plain.effect) == (ZONE_DT, ZONE_RS, None, EFFECT_NONE)
+    assert (remove.src, remove.card) == (ZONE_CL, 'C')
+    assert (add.src, add.card) == (ZONE_DT, 'N')
+    assert tail == {}
+
+def test_zj_branches_are_contiguous_ranges():
+    ops, slots, _ = compile_text("2zj(3zj(1),2),4")
+    first = ops[slots[0][0]]
+    assert first.effect == EFFECT_ZJ
+    branch = ops[first.start:first.end]
+    assert [(op.count, op.effect) for op in branch] == [(3, EFFECT_ZJ), (2, EFFECT_NONE)]
+    nested = branch[0]
+    assert [op.count for op in ops[nested.start:nested.end]] == [1]
+    assert ops[slots[1][0]].count == 4
+
+def test_szj_carry_becomes_slot_entries():
+    ops, slots, tail = compile_text("*2zj(1),3,fx2")
+    carrier = ops[slots[0][0]]
+    assert carrier.effect == EFFECT_SZJ and carrier.carry
+    # 下一个伤害按是否收到传火效果各有一个入口，被改写为 *3zj(1)
+    assert set(slots[1]) == {0, carrier.carry}
+    plain, carried = ops[slots[1][0]], ops[slots[1][carrier.carry]]
+    assert (plain.count, plain.effect) == (3, EFFECT_NONE)
+    assert (carried.count, carried.effect) == (3, EFFECT_SZJ)
+    assert [op.count for op in ops[carried.start:carried.end]] == [1]
+    # fx 不接收传火效果，两个入口指向同一条操作
+    assert set(slots[2]) == {0, carried.carry}
+    assert slots[2][0] == slots[2][carried.carry]
+    assert tail == {}
+
+def test_szj_at_end_goes_to_tail():
+    ops, slots, tail = compile_text("3,*2zj(1)")
+    carrier = ops[slots[1][0]]
+    assert set(tail) == {carrier.carry}
+    # 序列结束后仍未触发的传火效果由 finish 执行
+    final = ops[tail[carrier.carry]]
+    assert (final.count, final.effect) == (2, EFFECT_SZJ)
+    assert [op.count for op in ops[final.start:final.end]] == [1]
+
+def test_slot_ops_end():
+    program = compile_text("2zj(3),4,*2zj(1),1")
+    assert slot_ops_end(program, 0) == 0
+    ends = [slot_ops_end(program, k) for k in range(1, len(program.slots) + 1)]
+    assert ends == sorted(ends)
+    # 序列结束后的传火操作排在所有顶层位置之后
+    assert all(index >= ends[-1] for index in program.tail.values())
+    # 前k个位置的操作与只编译前k项的结果相同
+    assert program.ops[:ends[1]] == compile_text("2zj(3),4").ops
+
+def test_equivalent_spellings_compile_identically():
+    assert compile_text("2zj(3), 4") == compile_text("2zj(3),4")
+
+@pytest.mark.parametrize("text", [
+    "2zj(3),3,1,4",
+    "*2zj(1),*3zj(2),4",
+    "2zj(3zj(1)),2",
+    "3,fx2,3",
+    "DT>RS4:C+zj(2),3",
+    "DT>RS3:N+zj(1),4",
+    "DT+N,2,CL-C,3",
+    "DT>RS3,2",
+    "DB>CL2,3",
+    "DT-C,3",
+])
+def test_compiled_engine_matches_exact(text, deck, exact):
+    damage_seq = parse_damage_sequence(text)
+    result = simulate(*deck, damage_seq, True, trials=20000, seed=1)
+    exact(damage_seq).check(result)
+
+def test_unconditional_move_is_executed():
+    # DT>RS3 曾被当作 DT+/DT- 处理而被忽略；现在移走3张，随后的伤害翻完卡组触发卡组更新
+    moved = simulate(4, 0, 0, 0, 0, 0, parse_damage_sequence("DT>RS3,2"), trials=200, seed=1)
+    assert moved.refresh_hist == {1: 200}
+    assert moved.damage_hist == {3: 200}
+    kept = simulate(4, 0, 0, 0, 0, 0, parse_damage_sequence("2"), trials=200, seed=1)
+    assert kept.refresh_hist == {0: 200}
+    assert kept.damage_hist == {2: 200}
@@ -0,0 +1,74 @@
+"""SimulationResult 的统计量与由逐次样本直接计算的结果一致"""
+
+import random
+import statistics
+
+import pytest
+
+from wssim import SimulationResult
+
+def make_samples(trials, seed):
+    rng = random.Random(seed)
+    damage = [rng.randint(-1, 12) for _ in range(trials)]
+    refreshes = [rng.randint(0, 2) for _ in range(trials)]
+    level_ups = [rng.randint(0, 1) for _ in range(trials)]
+    return damage, refreshes, level_ups
+
+def test_statistics_match_raw_samples():
+    damage, refreshes, level_ups = make_samples(5000, 1)
+    result = SimulationResult.from_samples(damage, refreshes, level_ups)
+    assert result.trials == len(damage)
+    assert result.min_damage == min(damage)
+    assert result.max_damage == max(damage)
+    assert result.mean_damage() == pytest.approx(statistics.fmean(damage))
+    assert result.std_damage() == pytest.approx(statistics.pstdev(damage))
+    assert result.mean_refreshes() == pytest.approx(statistics.fmean(refreshes))
+    assert result.mean_level_ups() == pytest.approx(statistics.fmean(level_ups))
+    assert result.survival() == pytest.approx(
+        [sum(x >= i for x in damage) / len(damage) for i in range(max(damage) + 1)])
+    
+    ordered = sorted(damage)
+    for q in (0, 10, 50, 90, 100):
+        # 累计试验数首次达到 q% 的伤害值
+        expected = ordered[max(-(-len(damage) * q // 100) - 1, 0)]
+        assert result.percentile(q) == expected, q
+
+def test_survival_pads_and_truncates():
+    result = SimulationResult.from_samples([2, 3, 3], [0, 0, 0], [0, 0, 0])
+    assert result.survival() == pytest.approx([1.0, 1.0, 1.0, 2 / 3])
+    assert result.survival(1) == pytest.approx([1.0, 1.0])
+    assert result.survival(5) == pytest.approx([1.0, 1.0, 1.0, 2 / 3, 0.0, 0.0])
+
+def test_merge_matches_concatenated_samples():
+    first, second = make_samples(1000, 2), make_samples(700, 3)
+    merged = SimulationResult.from_samples(*first)
+    assert merged.mean_damage() == pytest.approx(statistics.fmean(first[0]))
+    merged.merge(SimulationResult.from_samples(*second))
+    whole = SimulationResult.from_samples(*(a + b for a, b in zip(first, second)))
+    assert merged.damage_hist == whole.damage_hist
+    assert merged.trials == whole.trials
+    assert merged.mean_damage() == pytest.approx(whole.mean_damage())
+    assert merged.survival() == pytest.approx(whole.survival())
+
+def test_intervals_cover_point_estimates():
+    result = SimulationResult.from_samples(*make_samples(2000, 4))
+    for k in (0, 5, 12, 13):
+        low, high = result.survival_interval(k)
+        p = result.survival(13)[k]
+        assert low - 1e-12 <= p <= high + 1e-12, k
+    low, high = result.mean_interval()
+    assert low < result.mean_damage() < high
+
+def test_empty_result():
+    result = SimulationResult()
+    assert result.trials == 0
+    assert (result.min_damage, result.max_damage) == (0, 0)
+    assert result.mean_damage() == 0.0
+    assert result.percentile(50) == 0
+    assert result.survival(2) == [0.0, 0.0, 0.0]
+    assert result.survival_interval(1) == (0.0, 1.0)
+    assert result.mean_refreshes() == 0.0
+    
+    result.merge(SimulationResult({4: 2}, {0: 2}, {1: 2}))
+    assert result.trials == 2
+    assert result.mean_damage() == 4.0
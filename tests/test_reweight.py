@@ -0,0 +1,42 @@
+"""似然比重新加权：可靠的候选构成与直接模拟一致"""
+
+import pytest
+
+from wssim import simulate, simulate_what_if
+
+def test_what_if_matches_direct_simulation(deck, sequence, exact):
+    D, N, R, RC, C, CC = deck
+    candidates = [(N - 1, RC, CC), (N, RC - 1, CC), (N, RC, CC - 1), (N + 1, RC, CC)]
+    reference, what_ifs = simulate_what_if(*deck, sequence, candidates, True, trials=20000,
+                                           seed=1)
+    assert reference.trials == 20000
+    assert [(w.N, w.RC, w.CC) for w in what_ifs] == candidates
+    
+    checked = 0
+    for what_if in what_ifs:
+        if not what_if.reliable:
+            continue
+        state = (D, what_if.N, R, what_if.RC, C, what_if.CC)
+        direct = simulate(*state, sequence, True, trials=20000, seed=2)
+        estimate = what_if.result
+        std_error = (estimate.std_damage() ** 2 / what_if.effective_trials
+                     + direct.std_damage() ** 2 / 20000) ** 0.5
+        assert abs(estimate.mean_damage() - direct.mean_damage()) <= 4 * std_error, what_if
+        assert abs(estimate.mean_damage() - exact(deck=state).mean) <= 4 * std_error, what_if
+        checked += 1
+    assert checked >= 3
+
+def test_reference_candidate_is_identical(deck, sequence):
+    # 与参考相同的构成权重恒为1，结果与参考完全相同
+    N, RC, CC = deck[1], deck[3], deck[5]
+    reference, (same,) = simulate_what_if(*deck, sequence, [(N, RC, CC)], True, trials=2000,
+                                          seed=3)
+    assert same.result.damage_hist == reference.damage_hist
+    assert same.result.damage_hist == simulate(*deck, sequence, True, trials=2000,
+                                               seed=3).damage_hist
+    assert same.effective_trials == pytest.approx(2000)
+    assert same.uncovered == 0.0 and same.reliable
+
+def test_candidates_out_of_range_raise(deck, sequence):
+    with pytest.raises(ValueError):
+        simulate_what_if(*deck, sequence, [(deck[0] + 1, 0, 0)], trials=10)
@@ -0,0 +1,99 @@
+"""参数扫描：取值解析、网格结果与逐点模拟一致、非法状态为NaN"""
+
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from wssim import SimulationCancelled, simulate
+from wssim.parallel import shard_seeds
+from wssim.sweep import SweepResult, parse_values, sweep, valid_state
+
+@pytest.mark.parametrize("text, values", [
+    ("8", [8]),
+    ("10-50:10", [10, 20, 30, 40, 50]),
+    ("0-3", [0, 1, 2, 3]),
+    ("0, 2,4", [0, 2, 4]),
+    ("1-3,7,9-13:2", [1, 2, 3, 7, 9, 11, 13]),
+    ("4-4", [4]),
+])
+def test_parse_values(text, values):
+    assert parse_values(text) == values
+
+@pytest.mark.parametrize("text", ["", "a", "5-3", "1-5:0", "1-5:-1", "1-", "-2", "1.5"])
+def test_parse_values_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_values(text)
+
+def test_valid_state():
+    assert valid_state(10, 10, 0, 0, 0, 0)
+    assert not valid_state(10, 11, 0, 0, 0, 0)
+    assert not valid_state(10, 2, 3, 4, 0, 0)
+    assert not valid_state(10, 2, 0, 0, 1, 2)
+    assert not valid_state(10, -1, 0, 0, 0, 0)
+
+def test_sweep_points_match_simulate(sequence):
+    D, N = [8, 20], [0, 3, 10]
+    result = sweep(sequence, D, N, 4, 1, 2, 0, draw_card=True, trials=500, workers=1, seed=11)
+    assert isinstance(result, SweepResult)
+    assert result.axes == {'D': D, 'N': N, 'R': [4], 'RC': [1], 'C': [2], 'CC': [0]}
+    assert result.shape == (2, 3, 1, 1, 1, 1)
+    assert result.varying() == ['D', 'N']
+    
+    # 非法状态 (D=8, N=10) 不模拟，其余各点的种子按网格顺序由seed派生
+    states = [(d, n, 4, 1, 2, 0) for d in D for n in N if n <= d]
+    assert sorted(result.results) == sorted(states)
+    for state, point_seed in zip(states, shard_seeds(11, len(states))):
+        direct = simulate(*state, sequence, True, trials=500, seed=point_seed)
+        assert result.results[state].damage_hist == direct.damage_hist
+
+def test_survival_tensor_and_probability_grid(sequence):
+    result = sweep(sequence, [8, 20], [0, 3, 10], 4, 1, 2, 0, trials=500, workers=1, seed=11)
+    max_dmg = result.max_damage()
+    tensor = result.survival_tensor()
+    assert tensor.shape == result.shape + (max_dmg + 1,)
+    
+    for k in (0, 4, max_dmg, max_dmg + 2):
+        grid = result.probability_grid(k)
+        assert grid.shape == result.shape
+        for i, d in enumerate([8, 20]):
+            for j, n in enumerate([0, 3, 10]):
+                value = grid[i, j, 0, 0, 0, 0]
+                if n > d:
+                    assert math.isnan(value)
+                else:
+                    expected = result.results[(d, n, 4, 1, 2, 0)].survival(k)[k]
+                    assert value == pytest.approx(expected)
+    # 没有高潮卡时每点伤害都命中，P(伤害≥总伤害)=1
+    assert result.probability_grid(10)[1, 0, 0, 0, 0, 0] == 1.0
+
+def test_sweep_matches_exact(sequence, exact):
+    result = sweep(sequence, 15, [2, 3, 4], 10, 2, 3, 1, draw_card=True, trials=20000, workers=1,
+                   seed=5)
+    for n in (2, 3, 4):
+        exact(deck=(15, n, 10, 2, 3, 1)).check(result.results[(15, n, 10, 2, 3, 1)])
+
+def test_sweep_is_reproducible_across_workers(sequence):
+    serial = sweep(sequence, [10, 15], [2, 4], 0, 0, 0, 0, trials=300, workers=1, seed=2)
+    pooled = sweep(sequence, [10, 15], [2, 4], 0, 0, 0, 0, trials=300, workers=2, seed=2)
+    assert serial.results.keys() == pooled.results.keys()
+    for state, result in serial.results.items():
+        assert pooled.results[state].damage_hist == result.damage_hist
+
+def test_sweep_progress_and_cancel(sequence):
+    calls = []
+    sweep(sequence, [10, 15], 2, 0, 0, 0, 0, trials=100, workers=1,
+          progress=lambda done, total: calls.append((done, total)))
+    assert calls == [(1, 2), (2, 2)]
+    
+    def cancel(done, total):
+        raise SimulationCancelled()
+    with pytest.raises(SimulationCancelled):
+        sweep(sequence, [10, 15], 2, 0, 0, 0, 0, trials=100, workers=1, progress=cancel)
+
+def test_all_states_invalid(sequence):
+    result = sweep(sequence, 5, 6, 0, 0, 0, 0, trials=100, workers=1, seed=1)
+    assert result.results == {}
+    assert result.max_damage() == 0
+    assert np.isnan(result.probability_grid(0)).all()
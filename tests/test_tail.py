@@ -0,0 +1,27 @@
+"""重要性抽样的尾部概率估计无偏：置信区间覆盖精确值"""
+
+import pytest
+
+from wssim import estimate_tail, simulate
+
+@pytest.mark.parametrize("threshold, tilt", [(10, 2.0), (12, 3.0)])
+def test_tail_estimate_is_unbiased(threshold, tilt, deck, sequence, exact):
+    estimate = estimate_tail(*deck, sequence, threshold, True, trials=20000, tilt=tilt, seed=1,
+                             confidence=0.999)
+    low, high = estimate.interval
+    assert low <= exact().at_least(threshold) <= high
+    assert 0 < estimate.effective_trials <= 20000
+    assert estimate.trials == 20000
+
+def test_tail_without_tilt_matches_simulate(deck, sequence):
+    # tilt=1 时权重恒为1，估计即普通蒙特卡洛的命中比例，有效样本量为命中阈值的试验数
+    estimate = estimate_tail(*deck, sequence, 8, True, trials=2000, tilt=1.0, seed=5)
+    result = simulate(*deck, sequence, True, trials=2000, seed=5)
+    assert estimate.probability == pytest.approx(result.survival(8)[8])
+    assert estimate.effective_trials == pytest.approx(sum(
+        count for damage, count in result.damage_hist.items() if damage >= 8))
+
+def test_tilt_reduces_standard_error(deck, sequence):
+    plain = estimate_tail(*deck, sequence, 12, True, trials=20000, tilt=1.0, seed=3)
+    tilted = estimate_tail(*deck, sequence, 12, True, trials=20000, tilt=3.0, seed=3)
+    assert tilted.std_error < plain.std_error
@@ -0,0 +1,40 @@
+"""阈值查询：提前结束试验后 P(伤害≥k) 仍与精确解一致；引擎变体互斥"""
+
+import pytest
+
+from wssim import (EngineProfile, compile_damage_sequence, parse_damage_sequence,
+                   simulate_program, simulate_threshold)
+from wssim.tail import TiltedSampler
+
+@pytest.mark.parametrize("draw_card", [False, True])
+def test_threshold_matches_exact(draw_card, deck, sequence, exact):
+    distribution = exact(draw_card=draw_card)
+    for threshold in (4, 8, 11):
+        estimate = simulate_threshold(*deck, sequence, threshold, draw_card, trials=20000,
+                                      seed=1, confidence=0.999)
+        assert estimate.trials == 20000
+        assert estimate.threshold == threshold
+        low, high = estimate.interval
+        assert low <= distribution.at_least(threshold) <= high, threshold
+
+def test_damage_reducing_ops_prevent_early_stop(deck, exact):
+    # CL-C 之后伤害可能减少，达到阈值也不能提前结束
+    damage_seq = parse_damage_sequence("4,3,CL-C,CL-N,2")
+    estimate = simulate_threshold(*deck, damage_seq, 6, True, trials=20000, seed=2,
+                                  confidence=0.999)
+    low, high = estimate.interval
+    assert low <= exact(damage_seq).at_least(6) <= high
+
+def test_threshold_above_max_damage_is_zero(deck, sequence, exact):
+    threshold = len(exact().survival)
+    estimate = simulate_threshold(*deck, sequence, threshold, True, trials=1000, seed=1)
+    assert estimate.probability == 0.0
+
+def test_engine_variants_are_exclusive(deck, sequence):
+    program = compile_damage_sequence(sequence)
+    with pytest.raises(ValueError):
+        simulate_program(program, *deck, trials=10, profile=EngineProfile(),
+                         sampler=TiltedSampler(2.0))
+    with pytest.raises(ValueError):
+        simulate_program(program, *deck, trials=10, checkpoints=[{}] * len(program.slots),
+                         early_stop=(6, [True] * len(program.slots), [0] * len(program.slots)))
@@ -0,0 +1,50 @@
+"""共享前缀的批量模拟：各叶子配置与精确解一致，公共前缀只模拟一次"""
+
+import random
+
+import wssim.tree
+from wssim import parse_damage_sequence, simulate, simulate_tree
+
+def config(text, D=15, N=3, R=10, RC=2, C=3, CC=1):
+    return {'D': D, 'N': N, 'R': R, 'RC': RC, 'C': C, 'CC': CC,
+            'damage_seq': parse_damage_sequence(text), 'draw_card': True}
+
+VARIANTS = ["2,3,fx2,3", "2,3,fx2,4zj(1)", "2,3,fx2,3,1", "2,3,1", "3,3"]
+
+def test_leaves_match_exact(exact):
+    configs = [config(text) for text in VARIANTS] + [config("2,3,fx2,3", N=5)]
+    results = simulate_tree(configs, trials=20000, seed=1)
+    assert len(results) == len(configs)
+    for cfg, result in zip(configs, results):
+        assert result.trials == 20000
+        state = tuple(cfg[name] for name in ('D', 'N', 'R', 'RC', 'C', 'CC'))
+        exact(cfg['damage_seq'], deck=state).check(result)
+
+def test_shared_prefix_is_simulated_once(monkeypatch):
+    starts = []
+    original = wssim.tree.simulate_program
+    
+    def record(program, *args, resume=None, **kwargs):
+        starts.append(resume[0] if resume else 0)
+        return original(program, *args, resume=resume, **kwargs)
+    monkeypatch.setattr(wssim.tree, "simulate_program", record)
+    
+    simulate_tree([config(text) for text in VARIANTS], trials=500, seed=1)
+    # 第一个配置从头模拟，其余从与之（或与同组第一个）的公共前缀处续算
+    assert starts == [0, 3, 4, 2, 0]
+
+def test_first_leaf_equals_plain_simulation():
+    cfg = config(VARIANTS[0])
+    (result,) = simulate_tree([cfg], trials=2000, seed=7)
+    seed = random.Random(7).getrandbits(64)
+    direct = simulate(15, 3, 10, 2, 3, 1, cfg['damage_seq'], True, trials=2000, seed=seed)
+    assert result.damage_hist == direct.damage_hist
+
+def test_tree_is_reproducible_and_reports_progress():
+    configs = [config(text) for text in VARIANTS]
+    calls = []
+    first = simulate_tree(configs, trials=600, seed=3,
+                          progress=lambda done, total: calls.append((done, total)))
+    second = simulate_tree(configs, trials=600, seed=3)
+    assert [r.damage_hist for r in first] == [r.damage_hist for r in second]
+    assert calls[-1] == (600 * len(configs), 600 * len(configs))
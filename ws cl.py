@@ -1,483 +1,74 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, simpledialog
+import multiprocessing
+import queue
 import random
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import re
+import sqlite3
+import threading
 
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 用于显示中文标签
-plt.rcParams['axes.unicode_minus'] = False  # 用于显示负号
+from wssim import (DamageSequenceError, EngineProfile, SimulationCancelled, compare_paired,
+                   parse_damage_sequence, format_damage_seq, simulate, simulate_adaptive,
+                   simulate_incremental, simulate_tree, estimate_tail, simulate_what_if,
+                   ResultCache)
 
-def parse_damage_sequence(dmg_str):
-    """解析伤害序列字符串"""
-    if not dmg_str:
-        return []
-    
-    result = []
-    i = 0
-    while i < len(dmg_str):
-        # 处理特殊的*前缀
-        is_special_zj = False
-        if i < len(dmg_str) and dmg_str[i] == "*":
-            is_special_zj = True
-            i += 1
-            
-        # 处理数字开头的伤害
-        if i < len(dmg_str) and dmg_str[i].isdigit():
-            j = i
-            while j < len(dmg_str) and dmg_str[j].isdigit():
-                j += 1
-                
-            num = int(dmg_str[i:j])
-            
-            # 检查是否是追加伤害效果
-            if j+2 < len(dmg_str) and dmg_str[j:j+2] == "zj" and dmg_str[j+2] == "(":
-                effect_type = dmg_str[j:j+2]  # zj
-                # 找到匹配的右括号
-                bracket_count = 1
-                k = j + 3
-                while k < len(dmg_str) and bracket_count > 0:
-                    if dmg_str[k] == "(":
-                        bracket_count += 1
-                    elif dmg_str[k] == ")":
-                        bracket_count -= 1
-                    k += 1
-                
-                if bracket_count == 0:
-                    # 递归解析括号内的内容
-                    inner_seq = parse_damage_sequence(dmg_str[j+3:k-1])
-                    if is_special_zj and effect_type == "zj":
-                        # 特殊的zj，添加标记
-                        result.append((num, "szj", inner_seq))
-                    else:
-                        result.append((num, effect_type, inner_seq))
-                    i = k
-                else:
-                    messagebox.showerror("解析错误", f"括号不匹配: {dmg_str}")
-                    return []
-            else:
-                result.append(num)
-                i = j
-        
-        # 处理fx反洗
-        elif dmg_str[i:i+2] == "fx" and i+2 < len(dmg_str) and dmg_str[i+2].isdigit():
-            j = i + 2
-            while j < len(dmg_str) and dmg_str[j].isdigit():
-                j += 1
-            
-            result.append(f"fx{dmg_str[i+2:j]}")
-            i = j
-        
-        # 处理卡片移动操作 (如 DT>RS, DT>CL, RS>DT)
-        elif i+4 < len(dmg_str) and dmg_str[i:i+2] in ["DT", "DB", "RS", "CL"] and dmg_str[i+2] == ">" and dmg_str[i+3:i+5] in ["DT", "DB", "RS", "CL"]:
-            from_loc = dmg_str[i:i+2]
-            to_loc = dmg_str[i+3:i+5]
-            
-            # 检查是否是带数量的移动操作 (如 DT>RS4)
-            if i+5 < len(dmg_str) and dmg_str[i+5].isdigit():
-                j = i + 5
-                while j < len(dmg_str) and dmg_str[j].isdigit():
-                 j += 1
-                count = int(dmg_str[i+5:j])
-                
-                # 检查是否有条件判断部分 (如 DT>RS4:C+zj(2))
-                if j < len(dmg_str) and dmg_str[j] == ":":
-                    # 找到条件类型 (C或N)
-                    if j+1 < len(dmg_str) and dmg_str[j+1] in ["C", "N"]:
-                        condition = dmg_str[j+1]
-                        j += 2
-                        
-                        # 查找追加伤害部分
-                        if j+3 < len(dmg_str) and dmg_str[j:j+3] == "+zj":
-                            # 找到匹配的右括号
-                            bracket_count = 1
-                            k = j + 4
-                            while k < len(dmg_str) and bracket_count > 0:
-                                if dmg_str[k] == "(":
-                                    bracket_count += 1
-                                elif dmg_str[k] == ")":
-                                    bracket_count -= 1
-                                k += 1
-                            
-                            if bracket_count == 0:
-                                # 递归解析括号内的内容
-                                zj_seq = parse_damage_sequence(dmg_str[j+4:k-1])
-                                result.append((f"{from_loc}>{to_loc}{count}:{condition}", "zj", zj_seq))
-                                i = k
-                            else:
-                                messagebox.showerror("解析错误", f"追加伤害括号不匹配: {dmg_str[i:]}")
-                                return []
-                        else:
-                            messagebox.showerror("解析错误", f"条件判断格式错误: {dmg_str[i:]}")
-                            return []
-                    else:
-                        messagebox.showerror("解析错误", f"条件类型错误: {dmg_str[i:]}")
-                        return []
-                else:
-                    # 只有数量没有条件判断
-                    result.append(f"{from_loc}>{to_loc}{count}")
-                    i = j
-            else:
-                # 简单移动操作
-                result.append(f"{from_loc}>{to_loc}")
-                i += 5
-        
-        # 处理卡组操作
-        elif i+2 < len(dmg_str) and (
-                dmg_str[i:i+2] == "DT" or   # 卡组顶部
-                dmg_str[i:i+2] == "DB" or   # 卡组底部
-                dmg_str[i:i+2] == "RS" or   # 休息室
-                dmg_str[i:i+2] == "CL"      # 计时区
-            ):
-            location = dmg_str[i:i+2]
-            if i+3 < len(dmg_str) and dmg_str[i+2] in ['+', '-'] and dmg_str[i+3] in ['N', 'C']:
-                operation = dmg_str[i+2]
-                card_type = dmg_str[i+3]
-                result.append(f"{location}{operation}{card_type}")
-                i += 4
-            else:
-                messagebox.showerror("解析错误", f"卡组操作格式错误: {dmg_str[i:]}")
-                return []
-        
-        # 跳过分隔符和空格
-        elif dmg_str[i] == "," or dmg_str[i] == " ":
-            i += 1
-        
-        # 未知字符
-        else:
-            messagebox.showerror("解析错误", f"未知字符: {dmg_str[i]}")
-            return []
-    
-    return result
-
-def format_damage_seq(seq):
-    """格式化伤害序列为可读字符串"""
-    result = []
-    for item in seq:
-        if isinstance(item, tuple):
-            if isinstance(item[0], str) and ":" in item[0]:
-                # 条件判断操作 (如 DT>RS4:C+zj(2))
-                move_op, effect_type, zj_seq = item
-                sub_formatted = format_damage_seq(zj_seq)
-                result.append(f"{move_op}+{effect_type}({sub_formatted})")
-            else:
-                # 普通追加伤害或特殊zj
-                dmg, effect_type, sub_seq = item
-                sub_formatted = format_damage_seq(sub_seq)
-                if effect_type == "szj":
-                    # 特殊的zj，添加*前缀
-                    result.append(f"*{dmg}zj({sub_formatted})")
-                else:
-                    result.append(f"{dmg}{effect_type}({sub_formatted})")
-        elif isinstance(item, str):
-            result.append(item)
-        else:
-            result.append(str(item))
-    return ','.join(result)
-
-def simulate(D, N, R, RC, C, CC, damage_seq, draw_card=False, trials=10000):
-    results, refresh_counts, level_up_counts = [], [], []
-    
-    for _ in range(trials):
-        deck = ['C'] * N + ['N'] * (D - N)
-        rest = ['C'] * RC + ['N'] * (R - RC)
-        clock = ['C'] * CC + ['N'] * (C - CC)
-        random.shuffle(deck)
-        random.shuffle(rest)
-        random.shuffle(clock)
-        refresh_count = 0
-        total_damage = 0
-        level_up_count = 0
-        
-        def refresh_deck():
-            nonlocal deck, rest, clock, refresh_count, total_damage, level_up_count
-            if not deck:
-                if not rest:
-                    return False
-                
-                refresh_count += 1
-                deck = rest.copy()
-                rest = []
-                random.shuffle(deck)
-                
-                if deck:
-                    card = deck.pop(0)
-                    clock.append(card)
-                    total_damage += 1
-                    check_level_up()
-                
-                return True
-            return True
-        
-        def check_level_up():
-            nonlocal clock, rest, level_up_count
-            while len(clock) >= 7:
-                lvl_cards = clock[:7]
-                level_up_card = next((x for x in lvl_cards if x == 'N'), None)
-                if level_up_card:
-                    lvl_cards.remove(level_up_card)
-                else:
-                    level_up_card = lvl_cards.pop(0)
-                rest.extend(lvl_cards)
-                clock = clock[7:]
-                level_up_count += 1
-        
-        def process_damage(dmg_item):
-            nonlocal deck, rest, clock, total_damage, level_up_count
-            
-            # 处理fx反洗
-            if isinstance(dmg_item, str) and dmg_item.startswith('fx'):
-                if not refresh_deck():
-                    return False, None, None
-                
-                check_level_up()
-                num_fx = int(dmg_item[2:])
-                rest_N = [card for card in rest if card == 'N']
-                for _ in range(min(num_fx, len(rest_N))):
-                    rest.remove('N')
-                    deck.append('N')
-                random.shuffle(deck)
-                return False, None, None
-            
-            # 处理条件判断操作
-            if isinstance(dmg_item, tuple) and isinstance(dmg_item[0], str) and ":" in dmg_item[0]:
-                move_op, effect_type, zj_seq = dmg_item
-                parts = move_op.split(":")
-                if len(parts) != 2:
-                    return False, None, None
-                    
-                move_part = parts[0]
-                condition = parts[1]
-                
-                from_loc = move_part[:2]
-                to_loc = move_part[3:5]
-                count = 1
-                if len(move_part) > 5 and move_part[5:].isdigit():
-                    count = int(move_part[5:])
-                
-                if not refresh_deck():
-                    return False, None, None
-                
-                moved_cards = []
-                condition_met = False
-                
-                for _ in range(count):
-                    card = None
-                    if from_loc == "DT" and deck:
-                        card = deck.pop(0)
-                        # 检查牌组是否为空
-                        if not deck:
-                            refresh_deck()
-                    elif from_loc == "DB" and deck:
-                        card = deck.pop(-1)
-                        # 检查牌组是否为空
-                        if not deck:
-                            refresh_deck()
-                    elif from_loc == "RS" and rest:
-                        card = rest.pop(random.randrange(len(rest)))
-                    elif from_loc == "CL" and clock:
-                        card = clock.pop(random.randrange(len(clock)))
-                        if card:
-                            total_damage -= 1
-                    
-                    if card:
-                        moved_cards.append(card)
-                        if card == condition:
-                            condition_met = True
-                
-                for card in moved_cards:
-                    if to_loc == "DT":
-                        deck.insert(0, card)
-                    elif to_loc == "DB":
-                        deck.append(card)
-                    elif to_loc == "RS":
-                        rest.append(card)
-                    elif to_loc == "CL":
-                        clock.append(card)
-                        total_damage += 1
-                        check_level_up()
-                
-                if condition_met and zj_seq:
-                    for zj_item in zj_seq:
-                        process_damage(zj_item)
-                
-                return False, None, None
-            
-            # 处理卡组操作
-            if isinstance(dmg_item, str) and (
-                    dmg_item.startswith('DT') or 
-                    dmg_item.startswith('DB') or 
-                    dmg_item.startswith('RS') or 
-                    dmg_item.startswith('CL')):
-                
-                if not refresh_deck():
-                    return False, None, None
-                
-                location = dmg_item[:2]
-                operation = dmg_item[2]
-                card_type = dmg_item[3]
-                
-                if location == 'DT':
-                    if operation == '+':
-                        deck.insert(0, card_type)
-                    elif operation == '-' and deck:
-                        if card_type in deck:
-                            deck.remove(card_type)
-                
-                elif location == 'DB':
-                    if operation == '+':
-                        deck.append(card_type)
-                    elif operation == '-' and deck:
-                        if card_type in deck:
-                            for i in range(len(deck)-1, -1, -1):
-                                if deck[i] == card_type:
-                                    deck.pop(i)
-                                    break
-                
-                elif location == 'RS':
-                    if operation == '+':
-                        rest.append(card_type)
-                    elif operation == '-' and rest:
-                        if card_type in rest:
-                            rest.remove(card_type)
-                
-                elif location == 'CL':
-                    if operation == '+':
-                        clock.append(card_type)
-                        total_damage += 1
-                        check_level_up()
-                    elif operation == '-' and clock:
-                        if card_type in clock:
-                            clock.remove(card_type)
-                            total_damage -= 1
-                
-                return False, None, None
-            
-            # 处理普通伤害或带效果的伤害
-            if isinstance(dmg_item, tuple):
-                dmg, effect_type, zj_seq = dmg_item
-            else:
-                dmg = dmg_item
-                effect_type = None
-                zj_seq = None
-            
-            # 处理当前伤害
-            processing_zone = []
-            cancelled = False
-            
-            # 优化：添加对dmg为0或负数的保护
-            if isinstance(dmg, int) and dmg <= 0:
-                return False, None, None
-                
-            for _ in range(dmg):
-                if not deck and not refresh_deck():
-                    break
-                
-                card = deck.pop(0)
-                processing_zone.append(card)
-                
-                # 在每次取牌后检查牌组是否为空
-                if not deck:
-                    refresh_deck()
-                
-                if card == 'C':
-                    cancelled = True
-                    break
-            
-            # 处理翻出的卡
-            if cancelled:
-                rest.extend(processing_zone)
-                
-                # 处理特殊的zj效果
-                if effect_type == "szj":
-                    # 处理当前伤害的追加效果
-                    for zj_item in zj_seq:
-                        process_damage(zj_item)
-                    
-                    # 返回特殊zj效果给下一个伤害
-                    return True, None, (dmg, zj_seq)
-                
-                # 处理普通的追加效果
-                elif effect_type == "zj" and zj_seq:
-                    for zj_item in zj_seq:
-                        process_damage(zj_item)
-            else:
-                clock.extend(processing_zone)
-                total_damage += len(processing_zone)
-                
-            check_level_up()
-            refresh_deck()
-            return cancelled, None, None
-        
-        # 处理所有伤害
-        i = 0
-        carry_szj = None
-        
-        while i < len(damage_seq):
-            refresh_deck()
-            dmg_item = damage_seq[i]
-            
-            # 如果有特殊zj效果，应用到当前伤害
-            if carry_szj is not None:
-                orig_dmg, orig_zj_seq = carry_szj
-                # 根据当前伤害类型修改
-                if isinstance(dmg_item, int):
-                    # 数字伤害变为带特殊zj效果的伤害
-                    dmg_item = (dmg_item, "szj", orig_zj_seq)
-                elif isinstance(dmg_item, tuple) and len(dmg_item) == 3:
-                    # 已经是带效果的伤害，需要特殊处理
-                    current_dmg, current_effect, current_seq = dmg_item
-                    
-                    if current_effect == "szj":
-                        # 如果当前伤害已经是特殊zj，则叠加效果
-                        combined_seq = current_seq + orig_zj_seq
-                        dmg_item = (current_dmg, "szj", combined_seq)
-                    else:
-                        # 其他类型的效果，替换为特殊zj
-                        dmg_item = (current_dmg, "szj", orig_zj_seq)
-                
-                carry_szj = None
-            
-            # 处理当前伤害
-            cancelled, _, next_carry_szj = process_damage(dmg_item)
-            
-            # 如果伤害被取消且有特殊zj效果，保存给下一个伤害
-            if cancelled and next_carry_szj:
-                carry_szj = next_carry_szj
-            
-            i += 1
+_plotting = None
 
-        # 处理最后可能剩余的特殊zj效果
-        if carry_szj:
-            orig_dmg, orig_zj_seq = carry_szj
-            # 创建一个伤害为orig_dmg的特殊zj
-            process_damage((orig_dmg, "szj", orig_zj_seq))
+SWEEP_LABELS = {
+    'D': "牌组大小(D)", 'N': "牌组高潮卡数(N)", 'R': "休息室总数(R)",
+    'RC': "休息室高潮数(RC)", 'C': "计时区总数(C)", 'CC': "计时区高潮数(CC)",
+}
 
-        refresh_deck()
-        # 处理抽牌
-        if draw_card:
-            refresh_deck()
-            if deck:
-                card = deck.pop(0)
-                clock.append(card)
-                total_damage += 1
-                check_level_up()
-                refresh_deck()
+def deck_state(params):
+    """任务参数中的卡组状态 (D, N, R, RC, C, CC)，按 wssim 各函数的参数顺序"""
+    return tuple(params[key] for key in ('D', 'N', 'R', 'RC', 'C', 'CC'))
 
-        results.append(total_damage)
-        refresh_counts.append(refresh_count)
-        level_up_counts.append(level_up_count)
-
-    return results, refresh_counts, level_up_counts
+def load_plotting():
+    """首次绘图时才导入matplotlib并设置中文字体，返回 (plt, FigureCanvasTkAgg)"""
+    global _plotting
+    if _plotting is None:
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        plt.rcParams['font.sans-serif'] = ['SimHei']  # 用于显示中文标签
+        plt.rcParams['axes.unicode_minus'] = False  # 用于显示负号
+        _plotting = (plt, FigureCanvasTkAgg)
+    return _plotting
 
 class WeissSimulator:
+    # 轮询后台模拟线程消息的间隔(毫秒)
+    POLL_INTERVAL_MS = 100
+    # 配对比较每个配置的模拟次数
+    PAIRED_TRIALS = 20000
+    # 重要性抽样估计稀有尾部概率的试验次数和倾斜程度
+    TAIL_TRIALS = 20000
+    TAIL_TILT = 3.0
+    # 似然比重新加权估计相邻高潮数的试验次数，以及牌组高潮数上下浮动的范围
+    WHAT_IF_TRIALS = 50000
+    WHAT_IF_SPAN = 2
+    # 各类任务运行时的状态栏文字（'save' 的文字含配置名）
+    JOB_STATUS = {
+        'plot': "正在模拟...",
+        'sweep': "正在参数扫描...",
+        'paired': "正在配对比较...",
+        'profile': "正在性能剖析...",
+        'tree': "正在共享前缀模拟...",
+        'optimize': "正在优化伤害顺序...",
+        'tail': "正在估计尾部概率...",
+        'what_if': "正在估计相邻高潮数...",
+    }
+
     def __init__(self, master):
         self.master = master
         master.title("Weiß Schwarz伤害模拟计算器")
         master.geometry("950x750")
         
         self.simulation_results = {}
+        # 磁盘结果缓存，缓存目录不可写时直接模拟
+        try:
+            self.result_cache = ResultCache()
+        except (OSError, sqlite3.Error):
+            self.result_cache = None
+        # 上一次模拟各顶层位置结束后的状态，逐步编辑序列时只需模拟改动的部分
+        self.prefix_checkpoint = None
 
         frame = ttk.LabelFrame(master, text="输入参数")
         frame.pack(padx=10, pady=10, fill='x')
@@ -608,6 +199,69 @@ class WeissSimulator:
                    command=self.save_configuration).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="比较分析", 
                    command=self.open_comparison_window).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="参数扫描", 
+                   command=self.open_sweep_window).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="顺序优化", 
+                   command=self.open_order_optimizer).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="性能剖析", 
+                   command=lambda: self.start_simulation(profile=True)).pack(side=tk.LEFT, padx=5)
+
+        adaptive_frame = ttk.Frame(frame)
+        adaptive_frame.grid(row=8, column=0, columnspan=2, padx=5, sticky='w')
+        
+        self.adaptive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adaptive_frame, text="自适应模拟次数", 
+                        variable=self.adaptive_var).pack(side=tk.LEFT)
+        ttk.Label(adaptive_frame, text="致死阈值k:").pack(side=tk.LEFT, padx=(10, 2))
+        self.adaptive_k_entry = ttk.Entry(adaptive_frame, width=6)
+        self.adaptive_k_entry.insert(0, "6")
+        self.adaptive_k_entry.pack(side=tk.LEFT)
+        ttk.Label(adaptive_frame, text="P(≥k)置信区间半宽:").pack(side=tk.LEFT, padx=(10, 2))
+        self.adaptive_hw_entry = ttk.Entry(adaptive_frame, width=8)
+        self.adaptive_hw_entry.insert(0, "0.01")
+        self.adaptive_hw_entry.pack(side=tk.LEFT)
+        
+        # 逐次追加伤害时才记录前缀状态，记录本身比普通模拟慢，默认关闭
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adaptive_frame, text="增量模拟(追加伤害后从上次的前缀状态继续)",
+                        variable=self.incremental_var).pack(side=tk.LEFT, padx=(20, 0))
+        
+        # 留空时每次随机生成种子；使用的种子随结果显示和保存，相同配置和种子直接读取缓存
+        ttk.Label(adaptive_frame, text="随机种子:").pack(side=tk.LEFT, padx=(20, 2))
+        self.seed_entry = ttk.Entry(adaptive_frame, width=12)
+        self.seed_entry.pack(side=tk.LEFT)
+
+        progress_frame = ttk.Frame(frame)
+        progress_frame.grid(row=9, column=0, columnspan=2, padx=5, pady=(0, 5), sticky='ew')
+        
+        self.progress_var = tk.DoubleVar(value=0.0)
+        self.status_var = tk.StringVar(value="就绪")
+        ttk.Progressbar(progress_frame, variable=self.progress_var, maximum=1.0,
+                        length=250).pack(side=tk.LEFT, padx=5)
+        ttk.Label(progress_frame, textvariable=self.status_var).pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(progress_frame, text="取消模拟", state=tk.DISABLED,
+                                        command=self.cancel_simulation)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        
+        # 模拟在后台线程中运行，任务依次排队；工作线程只往消息队列里放进度和结果，
+        # 主线程用after()轮询消息并更新界面
+        self.pending_jobs = []
+        self.current_job = None
+        self.worker_messages = queue.Queue()
+        # 任务类型 -> 在工作线程中运行的函数 (params, progress) -> 结果
+        self.job_runners = {
+            'plot': self._run_simulation,
+            'save': self._run_simulation,
+            'profile': self._run_profile,
+            'sweep': self._run_sweep,
+            'paired': lambda params, progress: compare_paired(
+                params['configs'], params['threshold'], params['trials'], progress=progress),
+            'tree': lambda params, progress: simulate_tree(params['configs'], progress=progress),
+            'optimize': self._run_optimize,
+            'tail': self._run_tail,
+            'what_if': self._run_what_if,
+        }
+        self.cancel_event = threading.Event()
 
         author_label = ttk.Label(master, text="程序由NoFaMe制作 © 2025")
         author_label.pack(side='bottom', pady=5)
@@ -770,9 +424,32 @@ class WeissSimulator:
         except Exception as e:
             messagebox.showerror("解析错误", f"伤害序列解析失败: {str(e)}")
 
-    def start_simulation(self):
+    def adaptive_settings(self):
+        """自适应模式的停止条件 {'threshold': k, 'half_width': h}，未启用时为None；输入无效时抛出ValueError"""
+        if not self.adaptive_var.get():
+            return None
+        threshold = int(self.adaptive_k_entry.get())
+        half_width = float(self.adaptive_hw_entry.get())
+        if threshold < 0 or not 0 < half_width < 0.5:
+            raise ValueError("自适应参数超出范围")
+        return {'threshold': threshold, 'half_width': half_width}
+
+    def run_seed(self):
+        """本次模拟的随机种子：输入框留空时随机生成一个；输入无效时抛出ValueError"""
+        text = self.seed_entry.get().strip()
+        if not text:
+            return random.getrandbits(32)
+        seed = int(text)
+        if seed < 0:
+            raise ValueError("随机种子不能为负数")
+        return seed
+
+    def start_simulation(self, profile=False):
+        """profile为True时以剖析模式模拟，完成后显示各操作的耗时报告而不是绘图"""
         try:
             D, N, R, RC, C, CC = [int(e.get()) for e in self.entries[:6]]
+            adaptive = self.adaptive_settings()
+            seed = self.run_seed()
             dmg_seq_str = self.entries[6].get("1.0", tk.END).strip()
             
             if not dmg_seq_str:
@@ -797,11 +474,175 @@ class WeissSimulator:
         if not response:
             return
 
-        draw_card = self.draw_card_var.get()
-        dmg_results, refreshes, level_ups = simulate(D, N, R, RC, C, CC, damage_seq, draw_card)
-        self.plot_results(dmg_results, refreshes, level_ups)
+        params = {
+            'D': D, 'N': N, 'R': R, 'RC': RC, 'C': C, 'CC': CC,
+            'damage_seq': damage_seq,
+            'damage_str': dmg_seq_str,
+            'draw_card': self.draw_card_var.get(),
+            'adaptive': adaptive,
+            'incremental': self.incremental_var.get(),
+            'seed': seed
+        }
+        if profile:
+            self.submit_simulation('profile', params, on_done=self.show_profile_report)
+        else:
+            self.submit_simulation('plot', params)
+
+    def submit_simulation(self, kind, params, name=None, on_done=None):
+        """
+        提交模拟任务，已有任务运行时排队。kind 为 job_runners 中的任务类型，完成后把结果交给
+        on_done；on_done 省略时绘制结果。'save' 任务的 name 为配置名，用于状态栏。
+        """
+        if on_done is None:
+            on_done = lambda result: self.plot_results(result, params.get('adaptive'), params)
+        self.pending_jobs.append({'kind': kind, 'params': params, 'name': name, 'on_done': on_done})
+        if self.current_job is None:
+            self._start_next_job()
+        else:
+            self._update_status()
+
+    def _start_next_job(self):
+        self.current_job = self.pending_jobs.pop(0)
+        self.cancel_event.clear()
+        self.progress_var.set(0.0)
+        self.cancel_button.config(state=tk.NORMAL)
+        self._update_status()
+        threading.Thread(target=self._run_job, args=(self.current_job,), daemon=True).start()
+        self.master.after(self.POLL_INTERVAL_MS, self._poll_worker)
+
+    def _run_job(self, job):
+        """在工作线程中运行模拟，不直接操作任何Tk控件"""
+        params = job['params']
+        def progress(done, total):
+            if self.cancel_event.is_set():
+                raise SimulationCancelled()
+            self.worker_messages.put(('progress', done / total))
+        
+        try:
+            result = self.job_runners[job['kind']](params, progress)
+        except SimulationCancelled:
+            self.worker_messages.put(('cancelled', None))
+        except Exception as e:
+            self.worker_messages.put(('error', e))
+        else:
+            self.worker_messages.put(('done', result))
+
+    def _run_simulation(self, params, progress):
+        if params.get('adaptive'):
+            return simulate_adaptive(*deck_state(params), params['damage_seq'], params['draw_card'],
+                                     seed=params['seed'], progress=progress, **params['adaptive'])
+        if params.get('incremental'):
+            return self._simulate_incremental(params, progress)
+        # 不做增量模拟时丢弃旧的前缀状态，下次勾选后从头记录
+        self.prefix_checkpoint = None
+        args = (*deck_state(params), params['damage_seq'], params['draw_card'])
+        if self.result_cache is None:
+            return simulate(*args, seed=params['seed'], progress=progress)
+        return self.result_cache.simulate(*args, seed=params['seed'], progress=progress)
+
+    def _run_profile(self, params, progress):
+        profile = EngineProfile()
+        simulate(*deck_state(params), params['damage_seq'], params['draw_card'], seed=params['seed'],
+                 progress=progress, profile=profile)
+        return profile
+
+    def _run_sweep(self, params, progress):
+        # 依赖numpy的参数扫描和使用进程池的顺序优化不由 wssim 包导出，首次使用时才导入
+        from wssim.sweep import sweep
+        return sweep(params['damage_seq'], *deck_state(params), params['draw_card'],
+                     params['trials'], progress=progress)
+
+    def _run_optimize(self, params, progress):
+        from wssim.optimize import optimize_order
+        return optimize_order(params['items'], params['threshold'], *deck_state(params),
+                              params['draw_card'], progress=progress)
+
+    def _run_tail(self, params, progress):
+        return estimate_tail(*deck_state(params), params['damage_seq'], params['threshold'],
+                             params['draw_card'], trials=self.TAIL_TRIALS, tilt=self.TAIL_TILT,
+                             progress=progress)
+
+    def _run_what_if(self, params, progress):
+        return simulate_what_if(*deck_state(params), params['damage_seq'], params['candidates'],
+                                params['draw_card'], trials=self.WHAT_IF_TRIALS, progress=progress)
+
+    def _simulate_incremental(self, params, progress):
+        """
+        模拟并保存本次的前缀状态供下次编辑使用，不读写结果缓存。
+        只有新序列在上次序列之后追加伤害时才从上次的前缀状态继续，其他修改和重复模拟都重新抽样。
+        """
+        result, self.prefix_checkpoint = simulate_incremental(
+            *deck_state(params), params['damage_seq'], params['draw_card'], seed=params['seed'],
+            progress=progress, checkpoint=self.prefix_checkpoint, extend_only=True)
+        return result
+
+    def _poll_worker(self):
+        finished = None
+        while True:
+            try:
+                kind, value = self.worker_messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.progress_var.set(value)
+            else:
+                finished = (kind, value)
+        
+        if finished is None:
+            self.master.after(self.POLL_INTERVAL_MS, self._poll_worker)
+            return
+        
+        job, self.current_job = self.current_job, None
+        self.cancel_button.config(state=tk.DISABLED)
+        kind, value = finished
+        if kind == 'done':
+            self.progress_var.set(1.0)
+        # 先启动下一个排队任务，再处理结果（结果中的弹窗不会阻塞后续模拟）
+        if self.pending_jobs:
+            self._start_next_job()
+        else:
+            self.status_var.set("已取消" if kind == 'cancelled' else "就绪")
+        
+        if kind == 'done':
+            job['on_done'](value)
+        elif kind == 'error':
+            messagebox.showerror("模拟错误", f"模拟过程中发生错误:\n{str(value)}")
+
+    def _update_status(self):
+        job = self.current_job
+        if job is None:
+            text = "就绪"
+        elif job['kind'] == 'save':
+            text = f"正在模拟配置 '{job['name']}'..."
+        else:
+            text = self.JOB_STATUS[job['kind']]
+        if self.pending_jobs:
+            text += f" (排队中: {len(self.pending_jobs)})"
+        self.status_var.set(text)
+
+    def cancel_simulation(self):
+        """取消正在运行的模拟，并清空排队中的任务"""
+        if self.current_job is None:
+            return
+        self.pending_jobs.clear()
+        self.cancel_event.set()
+        self.status_var.set("正在取消...")
+
+    def show_profile_report(self, profile):
+        report_window = tk.Toplevel(self.master)
+        report_window.title("性能剖析报告")
+        report_window.geometry("600x500")
+        
+        report_text = scrolledtext.ScrolledText(report_window, wrap=tk.NONE,
+                                                font=("Courier New", 10))
+        report_text.pack(fill='both', expand=True, padx=10, pady=10)
+        report_text.insert(tk.END, profile.format_report())
+        report_text.config(state=tk.DISABLED)
+        
+        ttk.Button(report_window, text="关闭", command=report_window.destroy).pack(pady=(0, 10))
 
-    def plot_results(self, dmg_results, refreshes, level_ups):
+    def plot_results(self, result, adaptive=None, params=None):
+        plt, FigureCanvasTkAgg = load_plotting()
         for widget in self.result_frame.winfo_children():
             widget.destroy()
 
@@ -811,8 +652,8 @@ class WeissSimulator:
         text_frame = ttk.Frame(self.result_frame)
         text_frame.pack(fill='x', padx=10, pady=10)
 
-        max_dmg = max(dmg_results)
-        probs = [np.mean([x >= i for x in dmg_results]) for i in range(max_dmg+1)]
+        max_dmg = max(result.max_damage, 0)
+        probs = result.survival(max_dmg)
 
         plt.close('all')
         
@@ -830,8 +671,8 @@ class WeissSimulator:
         
         ax.set_xlabel("至少命中的总伤害数")
         ax.set_ylabel("概率")
-        avg_refresh = np.mean(refreshes)
-        avg_level_up = np.mean(level_ups)
+        avg_refresh = result.mean_refreshes()
+        avg_level_up = result.mean_level_ups()
         ax.set_title(f"伤害概率分布 (平均卡组更新次数：{avg_refresh:.2f}, 平均升级次数：{avg_level_up:.2f})")
         
         for i, bar in enumerate(bars):
@@ -850,24 +691,102 @@ class WeissSimulator:
         result_text = scrolledtext.ScrolledText(text_frame, width=70, height=10)
         result_text.pack(fill='both', expand=True)
         
-        result_text.insert(tk.END, "详细概率分布:\n")
+        result_text.insert(tk.END, f"模拟次数: {result.trials}次\n")
+        if params is not None:
+            note = "（从上次前缀状态继续时不能仅由种子复现）" if params.get('incremental') else ""
+            result_text.insert(tk.END, f"随机种子: {params['seed']}{note}\n")
+        if adaptive:
+            k = adaptive['threshold']
+            low, high = result.survival_interval(k)
+            result_text.insert(tk.END, f"自适应目标: 造成≥{k}点伤害概率的95%置信区间半宽≤{adaptive['half_width']}，"
+                                       f"实际半宽{(high - low) / 2:.4f}\n")
+        
+        result_text.insert(tk.END, "\n详细概率分布 (括号内为95%置信区间):\n")
         for i, p in enumerate(probs):
             if p > 0.001 or i == 0:
-                result_text.insert(tk.END, f"造成≥{i}点伤害的概率: {p:.3f}\n")
-        
-        expected_value = 0
-        for i in range(max_dmg):
-            if i < len(probs) - 1:
-                expected_value += i * (probs[i] - probs[i+1])
-        result_text.insert(tk.END, f"\n伤害期望值: {expected_value:.2f}点\n")
+                low, high = result.survival_interval(i)
+                result_text.insert(tk.END, f"造成≥{i}点伤害的概率: {p:.3f} ({low:.3f}~{high:.3f})\n")
+        
+        mean_low, mean_high = result.mean_interval()
+        result_text.insert(tk.END, f"\n伤害期望值: {result.mean_damage():.2f}点 (标准差 {result.std_damage():.2f}，"
+                                   f"95%置信区间 {mean_low:.2f}~{mean_high:.2f})\n")
+        result_text.insert(tk.END, f"伤害中位数: {result.percentile(50)}点 "
+                                   f"(10%~90%分位: {result.percentile(10)}~{result.percentile(90)}点)\n")
         result_text.insert(tk.END, f"平均卡组更新次数: {avg_refresh:.2f}次\n")
         result_text.insert(tk.END, f"平均升级次数: {avg_level_up:.2f}次\n")
         
         result_text.configure(state='disabled')
+        
+        if params is not None:
+            # 低于0.001的概率在上面被省略，可用重要性抽样单独估计
+            rare = next((i for i, p in enumerate(probs) if p <= 0.001), max_dmg + 1)
+            ttk.Button(text_frame, text="估计稀有尾部概率(重要性抽样)",
+                       command=lambda: self.estimate_rare_tail(params, rare)).pack(pady=(5, 0))
+            ttk.Button(text_frame, text="估计相邻高潮数(似然比重新加权)",
+                       command=lambda: self.estimate_what_if(params)).pack(pady=(5, 0))
+
+    def estimate_rare_tail(self, params, initial):
+        threshold = simpledialog.askinteger("稀有尾部概率", "伤害阈值k (估计造成≥k点伤害的概率):",
+                                            initialvalue=initial, minvalue=0, parent=self.master)
+        if threshold is None:
+            return
+        
+        def show(estimate):
+            low, high = estimate.interval
+            messagebox.showinfo("稀有尾部概率", 
+                                f"造成≥{threshold}点伤害的概率: {estimate.probability:.3g}\n"
+                                f"标准误: {estimate.std_error:.2g}\n"
+                                f"95%置信区间: {low:.3g} ~ {high:.3g}\n"
+                                f"模拟次数: {estimate.trials}次 (有效样本量 {estimate.effective_trials:.0f})")
+        
+        self.submit_simulation('tail', dict(params, threshold=threshold), on_done=show)
+
+    def estimate_what_if(self, params):
+        """模拟一次当前配置，重新加权估计牌组高潮数 N±WHAT_IF_SPAN 及休息室/计时区高潮数±1的结果"""
+        D, N, R, RC, C, CC = deck_state(params)
+        candidates = [(n, RC, CC) for n in range(N - self.WHAT_IF_SPAN, N + self.WHAT_IF_SPAN + 1)
+                      if n != N and 0 <= n <= D]
+        candidates += [(N, rc, CC) for rc in (RC - 1, RC + 1) if 0 <= rc <= R]
+        candidates += [(N, RC, cc) for cc in (CC - 1, CC + 1) if 0 <= cc <= C]
+        if not candidates:
+            messagebox.showinfo("相邻高潮数", "没有可估计的相邻构成")
+            return
+        
+        def show(value):
+            reference, what_ifs = value
+            report_window = tk.Toplevel(self.master)
+            report_window.title("相邻高潮数估计")
+            report_window.geometry("600x400")
+            
+            report_text = scrolledtext.ScrolledText(report_window, wrap=tk.NONE,
+                                                    font=("Courier New", 10))
+            report_text.pack(fill='both', expand=True, padx=10, pady=10)
+            report_text.insert(tk.END, f"{'N':>3} {'RC':>3} {'CC':>3} {'期望伤害':>8} {'中位数':>6} "
+                                       f"{'有效样本量':>10} {'不可覆盖':>8}\n")
+            report_text.insert(tk.END, f"{N:>3} {RC:>3} {CC:>3} {reference.mean_damage():>10.2f} "
+                                       f"{reference.percentile(50):>9} {reference.trials:>15} "
+                                       f"{'(当前)':>10}\n")
+            for what_if in what_ifs:
+                if what_if.result is None:
+                    mean, median = "-", "-"
+                else:
+                    mean = f"{what_if.result.mean_damage():.2f}"
+                    median = what_if.result.percentile(50)
+                mark = "" if what_if.reliable else "  样本不足，建议单独模拟"
+                report_text.insert(tk.END, f"{what_if.N:>3} {what_if.RC:>3} {what_if.CC:>3} "
+                                           f"{mean:>10} {median:>9} {what_if.effective_trials:>15.0f} "
+                                           f"{what_if.uncovered:>11.2%}{mark}\n")
+            report_text.config(state=tk.DISABLED)
+            
+            ttk.Button(report_window, text="关闭", command=report_window.destroy).pack(pady=(0, 10))
+        
+        self.submit_simulation('what_if', dict(params, candidates=candidates), on_done=show)
 
     def save_configuration(self):
         try:
             D, N, R, RC, C, CC = [int(e.get()) for e in self.entries[:6]]
+            adaptive = self.adaptive_settings()
+            seed = self.run_seed()
             dmg_seq_str = self.entries[6].get("1.0", tk.END).strip()
             
             if not dmg_seq_str:
@@ -879,6 +798,9 @@ class WeissSimulator:
                 messagebox.showerror("输入错误", "伤害序列解析为空，请检查输入格式！")
                 return
                 
+        except DamageSequenceError as e:
+            messagebox.showerror("解析错误", f"伤害序列解析失败: {str(e)}")
+            return
         except ValueError:
             messagebox.showerror("输入错误", "请检查输入的参数格式是否正确！")
             return
@@ -907,16 +829,15 @@ class WeissSimulator:
                 'D': D, 'N': N, 'R': R, 'RC': RC, 'C': C, 'CC': CC,
                 'damage_seq': damage_seq,
                 'damage_str': dmg_seq_str,
-                'draw_card': self.draw_card_var.get()
+                'draw_card': self.draw_card_var.get(),
+                'adaptive': adaptive,
+                'incremental': self.incremental_var.get(),
+                'seed': seed
             }
             
-            draw_card = self.draw_card_var.get()
-            dmg_results, refreshes, level_ups = simulate(D, N, R, RC, C, CC, damage_seq, draw_card)
-            
-            self.simulation_results[config_name] = (dmg_results, refreshes, level_ups, params)
-            
-            messagebox.showinfo("保存成功", f"配置 '{config_name}' 已保存")
             name_dialog.destroy()
+            self.submit_simulation('save', params, config_name, on_done=lambda result:
+                                   self.store_configuration(config_name, params, result))
         
         button_frame = ttk.Frame(name_dialog)
         button_frame.pack(pady=10)
@@ -925,6 +846,10 @@ class WeissSimulator:
         
         name_entry.focus_set()
 
+    def store_configuration(self, name, params, result):
+        self.simulation_results[name] = (result, params)
+        messagebox.showinfo("保存成功", f"配置 '{name}' 已保存")
+
     def delete_config(self, name, window=None):
         if messagebox.askyesno("确认删除", f"确定要删除配置 '{name}' 吗?"):
             if name in self.simulation_results:
@@ -936,7 +861,7 @@ class WeissSimulator:
 
     def show_config_details(self, name):
         if name in self.simulation_results:
-            _, _, _, params = self.simulation_results[name]
+            _, params = self.simulation_results[name]
             
             details_window = tk.Toplevel(self.master)
             details_window.title(f"配置详情: {name}")
@@ -952,7 +877,8 @@ class WeissSimulator:
             text_area.insert(tk.END, f"休息室高潮数(RC): {params['RC']}\n")
             text_area.insert(tk.END, f"计时区总数(C): {params['C']}\n")
             text_area.insert(tk.END, f"计时区高潮数(CC): {params['CC']}\n")
-            text_area.insert(tk.END, f"结束后抽1张牌: {'是' if params['draw_card'] else '否'}\n\n")
+            text_area.insert(tk.END, f"结束后抽1张牌: {'是' if params['draw_card'] else '否'}\n")
+            text_area.insert(tk.END, f"随机种子: {params.get('seed', '未记录')}\n\n")
             
             text_area.insert(tk.END, f"伤害序列:\n{params['damage_str']}\n\n")
             text_area.insert(tk.END, f"解析后的序列:\n{format_damage_seq(params['damage_seq'])}\n")
@@ -1036,6 +962,12 @@ class WeissSimulator:
         ttk.Button(left_frame, text="生成比较图表", 
                   command=lambda: self.compare_selected(selected_configs, right_frame)).pack(pady=10)
         
+        ttk.Button(left_frame, text="配对比较(共同随机数)", 
+                  command=lambda: self.compare_paired_selected(selected_configs, right_frame)).pack(pady=5)
+        
+        ttk.Button(left_frame, text="共享前缀重新模拟", 
+                  command=lambda: self.resimulate_tree_selected(selected_configs, right_frame)).pack(pady=5)
+        
         ttk.Button(left_frame, text="导出所有配置数据", 
                   command=lambda: self.export_all_data()).pack(pady=5)
         
@@ -1053,7 +985,79 @@ class WeissSimulator:
         
         self.create_comparison_charts(selected_names, frame)
 
+    def compare_paired_selected(self, selected_configs, frame):
+        """用共同随机数重新模拟选中的配置，以第一个选中的配置为基准计算配对差值"""
+        selected_names = [name for name, var in selected_configs.items() if var.get()]
+        
+        if len(selected_names) < 2:
+            messagebox.showinfo("提示", "配对比较至少需要选择两个配置")
+            return
+        
+        threshold = simpledialog.askinteger("配对比较", "致死伤害阈值k (比较造成≥k点伤害的概率):",
+                                            initialvalue=6, minvalue=0, parent=frame)
+        if threshold is None:
+            return
+        
+        params = {
+            'configs': [self.simulation_results[name][1] for name in selected_names],
+            'threshold': threshold,
+            'trials': self.PAIRED_TRIALS,
+        }
+        self.submit_simulation('paired', params, on_done=lambda value: self.show_paired_comparison(
+            selected_names, threshold, value, frame))
+
+    def resimulate_tree_selected(self, selected_configs, frame):
+        """把选中的配置合并成前缀树重新模拟（公共前缀只模拟一次），完成后更新配置结果并生成比较图表"""
+        selected_names = [name for name, var in selected_configs.items() if var.get()]
+        
+        if not selected_names:
+            messagebox.showinfo("提示", "请至少选择一个配置进行比较")
+            return
+        
+        params = {'configs': [self.simulation_results[name][1] for name in selected_names]}
+        
+        def on_done(results):
+            for name, result in zip(selected_names, results):
+                if name in self.simulation_results:
+                    self.simulation_results[name] = (result, self.simulation_results[name][1])
+            if frame.winfo_exists():
+                self.create_comparison_charts(selected_names, frame)
+        
+        self.submit_simulation('tree', params, on_done=on_done)
+
+    def show_paired_comparison(self, config_names, threshold, value, frame):
+        if not frame.winfo_exists():
+            return
+        for widget in frame.winfo_children():
+            widget.destroy()
+        
+        results, differences = value
+        base = config_names[0]
+        ttk.Label(frame, text=f"共同随机数配对比较（{results[0].trials}次试验，基准配置: {base}，"
+                              f"区间为95%置信区间）").pack(pady=5)
+        
+        columns = ('配置名称', '期望伤害', f'P(伤害≥{threshold})', '期望伤害差', '期望差置信区间',
+                   f'P(≥{threshold})差', '概率差置信区间')
+        tree = ttk.Treeview(frame, columns=columns, show='headings')
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=110, anchor='center')
+        
+        for i, (name, result) in enumerate(zip(config_names, results)):
+            lethal = result.survival(threshold)[threshold]
+            row = [name, f'{result.mean_damage():.3f}', f'{lethal:.4f}']
+            if i == 0:
+                row += ['基准', '', '基准', '']
+            else:
+                diff = differences[i - 1]
+                row += [f'{diff.mean:+.3f}', f'[{diff.mean_ci[0]:+.3f}, {diff.mean_ci[1]:+.3f}]',
+                        f'{diff.lethal:+.4f}', f'[{diff.lethal_ci[0]:+.4f}, {diff.lethal_ci[1]:+.4f}]']
+            tree.insert('', 'end', values=row)
+        
+        tree.pack(fill='both', expand=True, padx=5, pady=5)
+
     def create_comparison_charts(self, config_names, frame):
+        plt, FigureCanvasTkAgg = load_plotting()
         for widget in frame.winfo_children():
             widget.destroy()
             
@@ -1078,8 +1082,8 @@ class WeissSimulator:
         
         max_dmg = 0
         for name in config_names:
-            dmg_results, _, _, _ = self.simulation_results[name]
-            max_dmg = max(max_dmg, max(dmg_results))
+            result, _ = self.simulation_results[name]
+            max_dmg = max(max_dmg, result.max_damage)
         
         plt.close('all')
         
@@ -1091,23 +1095,14 @@ class WeissSimulator:
         markers = ['o', 's', '^', 'D', 'v', '<', '>', 'p', '*', 'h']
         
         for i, name in enumerate(config_names):
-            dmg_results, _, _, params = self.simulation_results[name]
-            
-            current_max = max(dmg_results) if dmg_results else 1
-            max_dmg = max(max_dmg, current_max)
+            result, params = self.simulation_results[name]
             
-            probs = []
-            for j in range(max_dmg + 1):
-                if j <= current_max:
-                    prob = np.mean([x >= j for x in dmg_results])
-                else:
-                    prob = 0.0
-                probs.append(prob)
+            probs = result.survival(max_dmg)
             
             cutoff = next((j for j, p in enumerate(probs) if p < 0.001), len(probs))
             cutoff = max(cutoff, 5)
             
-            x_values = np.arange(cutoff + 1)
+            x_values = range(cutoff + 1)
             y_values = probs[:cutoff + 1]
             
             min_len = min(len(x_values), len(y_values))
@@ -1146,18 +1141,18 @@ class WeissSimulator:
         level_up_avgs = []
         
         for name in config_names:
-            dmg_results, refreshes, level_ups, _ = self.simulation_results[name]
+            result, _ = self.simulation_results[name]
             
-            exp_val = np.mean(dmg_results)
-            std_dev = np.std(dmg_results)
+            exp_val = result.mean_damage()
+            std_dev = result.std_damage()
             
             names.append(name)
             exp_values.append(exp_val)
             std_devs.append(std_dev)
-            refresh_avgs.append(np.mean(refreshes))
-            level_up_avgs.append(np.mean(level_ups))
+            refresh_avgs.append(result.mean_refreshes())
+            level_up_avgs.append(result.mean_level_ups())
         
-        x = np.arange(len(names))
+        x = range(len(names))
         width = 0.35
         
         bars = ax_exp.bar(x, exp_values, width, label='期望伤害', color='skyblue')
@@ -1192,7 +1187,7 @@ class WeissSimulator:
         
         columns = ('配置名称', '牌组大小', '高潮卡数', '休息室总数', '休息室高潮数', 
                 '计时区总数', '计时区高潮数', '抽牌', '期望伤害', '标准差', 
-                '最低伤害', '最高伤害', '平均洗牌次数', '平均升级次数')
+                '中位数', '最低伤害', '最高伤害', '平均洗牌次数', '平均升级次数')
         
         tree = ttk.Treeview(table_container, columns=columns, show='headings',
                            xscrollcommand=h_scroll.set, yscrollcommand=v_scroll.set)
@@ -1202,14 +1197,14 @@ class WeissSimulator:
             tree.column(col, width=80, anchor='center', stretch=False)
         
         for name in config_names:
-            dmg_results, refreshes, level_ups, params = self.simulation_results[name]
+            result, params = self.simulation_results[name]
             
-            exp_val = np.mean(dmg_results)
-            std_dev = np.std(dmg_results)
-            min_dmg = min(dmg_results)
-            max_dmg = max(dmg_results)
-            refresh_avg = np.mean(refreshes)
-            level_up_avg = np.mean(level_ups)
+            exp_val = result.mean_damage()
+            std_dev = result.std_damage()
+            min_dmg = result.min_damage
+            max_dmg = result.max_damage
+            refresh_avg = result.mean_refreshes()
+            level_up_avg = result.mean_level_ups()
             
             tree.insert('', 'end', values=(
                 name,
@@ -1222,6 +1217,7 @@ class WeissSimulator:
                 '是' if params['draw_card'] else '否',
                 f'{exp_val:.2f}',
                 f'{std_dev:.2f}',
+                result.percentile(50),
                 min_dmg,
                 max_dmg,
                 f'{refresh_avg:.2f}',
@@ -1265,18 +1261,18 @@ class WeissSimulator:
                 
                 header = ['配置名称', '牌组大小', '高潮卡数', '休息室总数', '休息室高潮数', 
                          '计时区总数', '计时区高潮数', '抽牌', '期望伤害', '标准差', 
-                         '最低伤害', '最高伤害', '平均洗牌次数', '平均升级次数', '伤害序列']
+                         '中位数', '最低伤害', '最高伤害', '平均洗牌次数', '平均升级次数', '伤害序列']
                 writer.writerow(header)
                 
                 for name in config_names:
-                    dmg_results, refreshes, level_ups, params = self.simulation_results[name]
+                    result, params = self.simulation_results[name]
                     
-                    exp_val = np.mean(dmg_results)
-                    std_dev = np.std(dmg_results)
-                    min_dmg = min(dmg_results)
-                    max_dmg = max(dmg_results)
-                    refresh_avg = np.mean(refreshes)
-                    level_up_avg = np.mean(level_ups)
+                    exp_val = result.mean_damage()
+                    std_dev = result.std_damage()
+                    min_dmg = result.min_damage
+                    max_dmg = result.max_damage
+                    refresh_avg = result.mean_refreshes()
+                    level_up_avg = result.mean_level_ups()
                     
                     row = [
                         name,
@@ -1289,6 +1285,7 @@ class WeissSimulator:
                         '是' if params['draw_card'] else '否',
                         f'{exp_val:.2f}',
                         f'{std_dev:.2f}',
+                        result.percentile(50),
                         min_dmg,
                         max_dmg,
                         f'{refresh_avg:.2f}',
@@ -1302,18 +1299,18 @@ class WeissSimulator:
                 
                 max_dmg = 0
                 for name in config_names:
-                    dmg_results, _, _, _ = self.simulation_results[name]
-                    max_dmg = max(max_dmg, max(dmg_results))
+                    result, _ = self.simulation_results[name]
+                    max_dmg = max(max_dmg, result.max_damage)
                 
                 prob_header = ['伤害值'] + config_names
                 writer.writerow(prob_header)
                 
+                survivals = [self.simulation_results[name][0].survival(max_dmg)
+                             for name in config_names]
                 for i in range(max_dmg + 1):
                     row = [i]
-                    for name in config_names:
-                        dmg_results, _, _, _ = self.simulation_results[name]
-                        prob = np.mean([x >= i for x in dmg_results])
-                        row.append(f'{prob:.6f}')
+                    for probs in survivals:
+                        row.append(f'{probs[i]:.6f}')
                     writer.writerow(row)
             
             messagebox.showinfo("导出成功", f"比较数据已成功导出到:\n{filename}")
@@ -1328,13 +1325,214 @@ class WeissSimulator:
             
         self.export_comparison_data(list(self.simulation_results.keys()))
 
+    def open_order_optimizer(self):
+        """把当前伤害序列的各项视为一组伤害，搜索使 P(伤害≥k) 最大的攻击顺序"""
+        try:
+            D, N, R, RC, C, CC = [int(e.get()) for e in self.entries[:6]]
+        except ValueError:
+            messagebox.showerror("输入错误", "请检查输入的参数格式是否正确！")
+            return
+        dmg_seq_str = self.entries[6].get("1.0", tk.END).strip()
+        try:
+            items = parse_damage_sequence(dmg_seq_str)
+        except DamageSequenceError as e:
+            messagebox.showerror("解析错误", f"伤害序列解析失败: {str(e)}")
+            return
+        if len(items) < 2:
+            messagebox.showinfo("提示", "顺序优化至少需要两项伤害")
+            return
+        
+        threshold = simpledialog.askinteger("顺序优化", "致死伤害阈值k (最大化造成≥k点伤害的概率):",
+                                            initialvalue=6, minvalue=0, parent=self.master)
+        if threshold is None:
+            return
+        
+        params = {'items': items, 'threshold': threshold, 'D': D, 'N': N, 'R': R, 'RC': RC,
+                  'C': C, 'CC': CC, 'draw_card': self.draw_card_var.get()}
+        self.submit_simulation('optimize', params,
+                               on_done=lambda ranked: self.show_order_ranking(ranked, threshold))
+
+    def show_order_ranking(self, ranked, threshold):
+        ranking_window = tk.Toplevel(self.master)
+        ranking_window.title("顺序优化结果")
+        ranking_window.geometry("800x500")
+        
+        ttk.Label(ranking_window, text=f"共比较 {len(ranked)} 种顺序，按坚持的轮次和 P(伤害≥{threshold}) 排名"
+                                       f"（区间为95%置信区间）").pack(pady=5)
+        
+        columns = ('排名', '伤害顺序', f'P(伤害≥{threshold})', '置信区间', '模拟次数')
+        tree = ttk.Treeview(ranking_window, columns=columns, show='headings')
+        for col, width in zip(columns, (50, 330, 110, 150, 90)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor='center')
+        
+        for rank, entry in enumerate(ranked, 1):
+            low, high = entry.interval
+            tree.insert('', 'end', iid=str(rank - 1), values=(
+                rank, format_damage_seq(entry.damage_seq), f'{entry.probability:.4f}',
+                f'[{low:.4f}, {high:.4f}]', entry.result.trials))
+        
+        scrollbar = ttk.Scrollbar(ranking_window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        
+        def load_selected():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showinfo("提示", "请先选择一个顺序", parent=ranking_window)
+                return
+            self.entries[6].delete("1.0", tk.END)
+            self.entries[6].insert(tk.END, format_damage_seq(ranked[int(selection[0])].damage_seq))
+        
+        button_frame = ttk.Frame(ranking_window)
+        button_frame.pack(side=tk.BOTTOM, pady=10)
+        ttk.Button(button_frame, text="载入所选顺序", command=load_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="关闭", command=ranking_window.destroy).pack(side=tk.LEFT, padx=5)
+        
+        scrollbar.pack(side=tk.RIGHT, fill='y', pady=5)
+        tree.pack(fill='both', expand=True, padx=(10, 0), pady=5)
+
+    def open_sweep_window(self):
+        from wssim.sweep import SWEEP_PARAMS, parse_values
+
+        dmg_seq_str = self.entries[6].get("1.0", tk.END).strip()
+        if not dmg_seq_str:
+            messagebox.showinfo("提示", "请先输入伤害序列")
+            return
+        try:
+            damage_seq = parse_damage_sequence(dmg_seq_str)
+        except DamageSequenceError as e:
+            messagebox.showerror("解析错误", f"伤害序列解析失败: {str(e)}")
+            return
+        if not damage_seq:
+            messagebox.showerror("输入错误", "伤害序列解析为空，请检查输入格式！")
+            return
+        
+        sweep_window = tk.Toplevel(self.master)
+        sweep_window.title("参数扫描")
+        sweep_window.geometry("900x700")
+        
+        input_frame = ttk.LabelFrame(sweep_window, text="扫描范围（单个值 / 起始-结束[:步长] / 逗号分隔列表）")
+        input_frame.pack(padx=10, pady=10, fill='x')
+        
+        range_entries = {}
+        for i, name in enumerate(SWEEP_PARAMS):
+            ttk.Label(input_frame, text=SWEEP_LABELS[name] + ":").grid(
+                row=i // 3, column=(i % 3) * 2, padx=5, pady=5, sticky='e')
+            entry = ttk.Entry(input_frame, width=14)
+            entry.insert(0, self.entries[i].get())
+            entry.grid(row=i // 3, column=(i % 3) * 2 + 1, padx=5, pady=5)
+            range_entries[name] = entry
+        
+        ttk.Label(input_frame, text="每点模拟次数:").grid(row=2, column=0, padx=5, pady=5, sticky='e')
+        trials_entry = ttk.Entry(input_frame, width=14)
+        trials_entry.insert(0, "5000")
+        trials_entry.grid(row=2, column=1, padx=5, pady=5)
+        
+        ttk.Label(input_frame, text="伤害阈值k:").grid(row=2, column=2, padx=5, pady=5, sticky='e')
+        k_entry = ttk.Entry(input_frame, width=14)
+        k_entry.insert(0, "6")
+        k_entry.grid(row=2, column=3, padx=5, pady=5)
+        
+        chart_frame = ttk.Frame(sweep_window)
+        chart_frame.pack(fill='both', expand=True, padx=10, pady=5)
+        ttk.Label(chart_frame, text=f"伤害序列: {format_damage_seq(damage_seq)}").pack(pady=50)
+        
+        sweep_state = {'result': None}
+        
+        def draw_heatmap():
+            if sweep_state['result'] is None:
+                return
+            try:
+                k = int(k_entry.get())
+            except ValueError:
+                messagebox.showerror("输入错误", "伤害阈值必须为整数", parent=sweep_window)
+                return
+            self.plot_sweep_heatmap(sweep_state['result'], k, chart_frame)
+        
+        def show_result(result):
+            if not sweep_window.winfo_exists():
+                return
+            sweep_state['result'] = result
+            draw_heatmap()
+        
+        def run_sweep():
+            try:
+                axes = {name: parse_values(range_entries[name].get()) for name in SWEEP_PARAMS}
+                trials = int(trials_entry.get())
+            except ValueError:
+                messagebox.showerror("输入错误", "请检查扫描范围和模拟次数的格式！", parent=sweep_window)
+                return
+            varying = [name for name, values in axes.items() if len(values) > 1]
+            if not 1 <= len(varying) <= 2:
+                messagebox.showerror("输入错误", "热力图需要一到两个参数取多个值", parent=sweep_window)
+                return
+            
+            params = dict(axes, damage_seq=damage_seq, damage_str=dmg_seq_str,
+                          draw_card=self.draw_card_var.get(), trials=trials)
+            self.submit_simulation('sweep', params, on_done=show_result)
+        
+        button_frame = ttk.Frame(input_frame)
+        button_frame.grid(row=2, column=4, columnspan=2, padx=5, pady=5)
+        ttk.Button(button_frame, text="开始扫描", command=run_sweep).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="更新热力图", command=draw_heatmap).pack(side=tk.LEFT, padx=5)
+
+    def plot_sweep_heatmap(self, result, k, frame):
+        plt, FigureCanvasTkAgg = load_plotting()
+        for widget in frame.winfo_children():
+            widget.destroy()
+        
+        varying = result.varying()
+        x_name = varying[-1]
+        y_name = varying[0] if len(varying) == 2 else None
+        x_values = result.axes[x_name]
+        y_values = result.axes[y_name] if y_name else [None]
+        grid = result.probability_grid(k).reshape(len(y_values), len(x_values))
+        
+        if getattr(self, 'sweep_fig', None) is not None:
+            plt.close(self.sweep_fig)
+        self.sweep_fig = fig = plt.figure(figsize=(8, 6))
+        ax = fig.add_subplot(111)
+        
+        image = ax.imshow(grid, origin='lower', aspect='auto', cmap='viridis', vmin=0, vmax=1)
+        fig.colorbar(image, ax=ax, label=f"P(伤害≥{k})")
+        
+        x_step = max(1, len(x_values) // 20)
+        ax.set_xticks(range(0, len(x_values), x_step))
+        ax.set_xticklabels(x_values[::x_step])
+        ax.set_xlabel(SWEEP_LABELS[x_name])
+        if y_name:
+            y_step = max(1, len(y_values) // 20)
+            ax.set_yticks(range(0, len(y_values), y_step))
+            ax.set_yticklabels(y_values[::y_step])
+            ax.set_ylabel(SWEEP_LABELS[y_name])
+        else:
+            ax.set_yticks([])
+        ax.set_title(f"造成≥{k}点伤害的概率")
+        
+        if grid.size <= 200:
+            for row, probs in enumerate(grid):
+                for col, p in enumerate(probs):
+                    if p == p:  # 跳过非法状态(NaN)
+                        ax.text(col, row, f'{p:.2f}', ha='center', va='center', fontsize=8,
+                                color='black' if p > 0.5 else 'white')
+        
+        fig.tight_layout()
+        
+        canvas = FigureCanvasTkAgg(fig, master=frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill='both', expand=True)
+
     def on_closing(self):
-        plt.close('all')
+        self.pending_jobs.clear()
+        self.cancel_event.set()
+        if _plotting is not None:
+            _plotting[0].close('all')
         self.master.quit()
         self.master.destroy()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = WeissSimulator(root)
     root.mainloop()
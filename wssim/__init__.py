@@ -0,0 +1,26 @@
+"""
+Weiß Schwarz 伤害模拟核心库，不依赖 tkinter / matplotlib。
+
+依赖numpy的引擎放在子模块中，按需导入：
+    from wssim.parallel import simulate_parallel
+    from wssim.batch import simulate_batch
+    from wssim.sweep import sweep
+
+使用进程池的伤害顺序优化同样按需导入：
+    from wssim.optimize import optimize_order
+"""
+
+from .parser import DamageSequenceError, parse_damage_sequence, format_damage_seq
+from .program import compile_damage_sequence, slot_ops_end
+from .result import SimulationResult
+from .engine import PROGRESS_INTERVAL, SimulationCancelled, simulate, simulate_program
+from .exact import solve_exact
+from .compare import PairedDifference, compare_paired
+from .adaptive import simulate_adaptive
+from .cache import ResultCache
+from .profile import EngineProfile
+from .checkpoint import PrefixCheckpoint, simulate_incremental
+from .tree import simulate_tree
+from .threshold import ThresholdEstimate, simulate_threshold
+from .tail import TailEstimate, estimate_tail
+from .reweight import WhatIf, simulate_what_if
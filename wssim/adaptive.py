@@ -0,0 +1,46 @@
+"""自适应模拟次数：分批模拟，直到置信区间达到要求的半宽"""
+
+import random
+
+from .engine import PROGRESS_INTERVAL, simulate_program
+from .program import compile_damage_sequence
+from .result import SimulationResult
+
+def simulate_adaptive(D, N, R, RC, C, CC, damage_seq, draw_card=False, threshold=None,
+                      half_width=0.01, mean_half_width=None, confidence=0.95,
+                      min_trials=PROGRESS_INTERVAL, max_trials=1000000, seed=None, progress=None):
+    """
+    每批 PROGRESS_INTERVAL 次分批模拟，精度达标即停止，返回 SimulationResult（其trials即实际试验次数）。
+    threshold 给出时要求 P(伤害≥threshold) 的Wilson区间半宽不超过 half_width；
+    mean_half_width 给出时要求期望伤害的正态区间半宽不超过它；两者都给出时须同时满足。
+    达到 max_trials 仍未达标也会停止，实际精度可由 survival_interval / mean_interval 查看。
+    progress(已完成次数, 预计总次数) 每批调用一次，可抛出 SimulationCancelled 取消。
+    """
+    if threshold is None and mean_half_width is None:
+        raise ValueError("需要指定 threshold 或 mean_half_width 作为停止条件")
+    program = compile_damage_sequence(damage_seq)
+    master = random.Random(seed)
+    result = SimulationResult()
+    done = 0
+
+    while True:
+        size = min(PROGRESS_INTERVAL, max_trials - done)
+        result.merge(simulate_program(program, D, N, R, RC, C, CC, draw_card, size,
+                                      master.getrandbits(64)))
+        done += size
+
+        # ratio = 当前半宽 / 目标半宽，不大于1即达标
+        ratio = 0.0
+        if threshold is not None:
+            low, high = result.survival_interval(threshold, confidence)
+            ratio = max(ratio, (high - low) / 2 / half_width)
+        if mean_half_width is not None:
+            low, high = result.mean_interval(confidence)
+            ratio = max(ratio, (high - low) / 2 / mean_half_width)
+        if done >= max_trials or (done >= min_trials and ratio <= 1):
+            return result
+
+        if progress is not None:
+            # 半宽约与 1/sqrt(试验次数) 成正比，据此估计总共需要的试验次数
+            estimate = max(int(done * ratio * ratio), done + PROGRESS_INTERVAL)
+            progress(done, min(estimate, max_trials))
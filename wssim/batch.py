@@ -0,0 +1,328 @@
+"""基于numpy的向量化批量模拟引擎"""
+
+import numpy as np
+
+from .program import (OP_DAMAGE, OP_FX, OP_MOVE, OP_ADD, OP_REMOVE, ZONE_DT, ZONE_DB, ZONE_RS,
+                      EFFECT_ZJ, EFFECT_SZJ, compile_damage_sequence, _deck_layout)
+from .result import SimulationResult
+
+def _shuffled_rows(rng, climax_counts, lengths, width):
+    """为每一行生成随机排列的卡组：前lengths张中随机climax_counts张为高潮卡(1)，其余为0"""
+    rows = len(lengths)
+    if width == 0:
+        return np.zeros((rows, 0), dtype=np.int8)
+    keys = rng.random((rows, width))
+    keys[np.arange(width) >= lengths[:, None]] = 2.0
+    # 每行取最小的climax_counts个随机键作为高潮卡位置
+    kth = np.sort(keys, axis=1)[np.arange(rows), np.maximum(climax_counts - 1, 0)]
+    cards = (keys <= kth[:, None]) & (climax_counts > 0)[:, None]
+    return cards.astype(np.int8)
+
+def _simulate_batch_chunk(program, D, N, R, RC, C, CC, draw_card, size, rng):
+    """向量化执行一批试验，所有试验按同一份编译程序同步推进"""
+    ops, slots, tail = program
+    head, width = _deck_layout(program, D, R, C)
+    clock_width = width + 7
+    positions = np.arange(width)
+    
+    # 卡组：deck[t, top[t]:bot[t]]，1为高潮卡，0为普通卡
+    deck = np.zeros((size, width), dtype=np.int8)
+    deck[:, head:head + D] = _shuffled_rows(rng, np.full(size, N), np.full(size, D), D)
+    top = np.full(size, head, dtype=np.int64)
+    bot = np.full(size, head + D, dtype=np.int64)
+    # 休息室的顺序不影响结果，只记录数量
+    rest_c = np.full(size, RC, dtype=np.int64)
+    rest_n = np.full(size, R - RC, dtype=np.int64)
+    # 计时区需要保持顺序（升级时取前7张）
+    clock = np.zeros((size, clock_width), dtype=np.int8)
+    clock[:, :C] = _shuffled_rows(rng, np.full(size, CC), np.full(size, C), C)
+    clock_len = np.full(size, C, dtype=np.int64)
+    total_damage = np.zeros(size, dtype=np.int64)
+    refresh_count = np.zeros(size, dtype=np.int64)
+    level_up_count = np.zeros(size, dtype=np.int64)
+    
+    def pop_top(rows):
+        cards = deck[rows, top[rows]]
+        top[rows] += 1
+        return cards
+    
+    def clock_append(rows, cards):
+        clock[rows, clock_len[rows]] = cards
+        clock_len[rows] += 1
+    
+    def clock_remove(rows, index):
+        shifted = np.empty_like(clock[rows])
+        current = clock[rows]
+        shifted[:, :-1] = current[:, 1:]
+        shifted[:, -1] = 0
+        keep = np.arange(clock_width) < index[:, None]
+        clock[rows] = np.where(keep, current, shifted)
+        clock_len[rows] -= 1
+    
+    def check_level_up(rows):
+        while True:
+            rows = rows[clock_len[rows] >= 7]
+            if not rows.size:
+                return
+            lvl_c = clock[rows, :7].sum(axis=1, dtype=np.int64)
+            lvl_n = 7 - lvl_c
+            # 前7张中有普通卡则以普通卡升级，否则以高潮卡升级，其余6张进休息室
+            has_n = lvl_n > 0
+            rest_c[rows] += np.where(has_n, lvl_c, lvl_c - 1)
+            rest_n[rows] += np.where(has_n, lvl_n - 1, 0)
+            clock[rows, :-7] = clock[rows, 7:]
+            clock_len[rows] -= 7
+            level_up_count[rows] += 1
+    
+    def refresh_deck(rows):
+        """对卡组为空的试验执行卡组更新，返回每行卡组是否可用"""
+        ok = np.ones(len(rows), dtype=bool)
+        empty = np.nonzero(top[rows] == bot[rows])[0]
+        if not empty.size:
+            return ok
+        
+        empty_rows = rows[empty]
+        lengths = rest_c[empty_rows] + rest_n[empty_rows]
+        has_rest = lengths > 0
+        ok[empty[~has_rest]] = False
+        
+        refreshed = empty_rows[has_rest]
+        if refreshed.size:
+            lengths = lengths[has_rest]
+            span = int(lengths.max())
+            refresh_count[refreshed] += 1
+            deck[refreshed, head:head + span] = _shuffled_rows(rng, rest_c[refreshed], lengths, span)
+            top[refreshed] = head
+            bot[refreshed] = head + lengths
+            rest_c[refreshed] = 0
+            rest_n[refreshed] = 0
+            
+            clock_append(refreshed, pop_top(refreshed))
+            total_damage[refreshed] += 1
+            check_level_up(refreshed)
+        return ok
+    
+    def run_block(start, end, rows):
+        for index in range(start, end):
+            if not rows.size:
+                return
+            execute(ops[index], rows)
+    
+    def execute(op, rows):
+        """对一组试验执行一条编译后的操作，返回每行被取消的传火追加编号"""
+        code, src, dst, count, card_type, effect, start, end, next_carry = op
+        carry_out = np.zeros(len(rows), dtype=np.int64)
+        
+        if code == OP_DAMAGE:
+            if count <= 0:
+                return carry_out
+            
+            zone_n = np.zeros(len(rows), dtype=np.int64)
+            cancelled = np.zeros(len(rows), dtype=bool)
+            live = np.arange(len(rows))
+            for _ in range(count):
+                ok = refresh_deck(rows[live])
+                live = live[ok]
+                if not live.size:
+                    break
+                live_rows = rows[live]
+                cards = pop_top(live_rows)
+                # 在每次取牌后检查牌组是否为空
+                refresh_deck(live_rows)
+                is_climax = cards == 1
+                zone_n[live[~is_climax]] += 1
+                cancelled[live[is_climax]] = True
+                live = live[~is_climax]
+            
+            # 取消：翻出的卡全部进休息室
+            cancelled_rows = rows[cancelled]
+            rest_c[cancelled_rows] += 1
+            rest_n[cancelled_rows] += zone_n[cancelled]
+            
+            # 未取消：翻出的普通卡全部进计时区
+            hit = ~cancelled
+            hit_rows = rows[hit]
+            hit_n = zone_n[hit]
+            for k in range(int(hit_n.max()) if hit_n.size else 0):
+                clock_append(hit_rows[hit_n > k], 0)
+            total_damage[hit_rows] += hit_n
+            
+            finish = rows
+            if cancelled_rows.size and effect == EFFECT_SZJ:
+                run_block(start, end, cancelled_rows)
+                carry_out[cancelled] = next_carry
+                finish = hit_rows
+            elif cancelled_rows.size and effect == EFFECT_ZJ:
+                run_block(start, end, cancelled_rows)
+            
+            check_level_up(finish)
+            refresh_deck(finish)
+            return carry_out
+        
+        rows = rows[refresh_deck(rows)]
+        if not rows.size:
+            return carry_out
+        
+        if code == OP_FX:
+            check_level_up(rows)
+            moved = np.minimum(count, rest_n[rows])
+            rest_n[rows] -= moved
+            # 洗回的普通卡与卡组一起重新洗牌
+            segment = (positions >= top[rows][:, None]) & (positions < bot[rows][:, None])
+            deck_c = (deck[rows] * segment).sum(axis=1, dtype=np.int64)
+            lengths = bot[rows] - top[rows] + moved
+            span = int(lengths.max())
+            if span:
+                deck[rows, head:head + span] = _shuffled_rows(rng, deck_c, lengths, span)
+            top[rows] = head
+            bot[rows] = head + lengths
+        
+        elif code == OP_MOVE:
+            moved_cards = np.zeros((len(rows), count), dtype=np.int8)
+            moved_valid = np.zeros((len(rows), count), dtype=bool)
+            
+            for i in range(count):
+                if src == ZONE_DT or src == ZONE_DB:
+                    has = np.nonzero(top[rows] < bot[rows])[0]
+                    picked = rows[has]
+                    if src == ZONE_DT:
+                        cards = pop_top(picked)
+                    else:
+                        bot[picked] -= 1
+                        cards = deck[picked, bot[picked]]
+                    # 检查牌组是否为空
+                    refresh_deck(picked)
+                elif src == ZONE_RS:
+                    rest_total = rest_c[rows] + rest_n[rows]
+                    has = np.nonzero(rest_total > 0)[0]
+                    picked = rows[has]
+                    cards = (rng.random(has.size) * rest_total[has] < rest_c[picked]).astype(np.int8)
+                    rest_c[picked] -= cards
+                    rest_n[picked] -= 1 - cards
+                else:
+                    has = np.nonzero(clock_len[rows] > 0)[0]
+                    picked = rows[has]
+                    index = (rng.random(has.size) * clock_len[picked]).astype(np.int64)
+                    cards = clock[picked, index]
+                    clock_remove(picked, index)
+                    total_damage[picked] -= 1
+                moved_cards[has, i] = cards
+                moved_valid[has, i] = True
+            
+            for i in range(count):
+                placed = np.nonzero(moved_valid[:, i])[0]
+                placed_rows = rows[placed]
+                cards = moved_cards[placed, i]
+                if dst == ZONE_DT:
+                    top[placed_rows] -= 1
+                    deck[placed_rows, top[placed_rows]] = cards
+                elif dst == ZONE_DB:
+                    deck[placed_rows, bot[placed_rows]] = cards
+                    bot[placed_rows] += 1
+                elif dst == ZONE_RS:
+                    rest_c[placed_rows] += cards
+                    rest_n[placed_rows] += 1 - cards
+                else:
+                    clock_append(placed_rows, cards)
+                    total_damage[placed_rows] += 1
+                    check_level_up(placed_rows)
+            
+            if card_type is not None:
+                target = 1 if card_type == 'C' else 0
+                met = (moved_valid & (moved_cards == target)).any(axis=1)
+                run_block(start, end, rows[met])
+        
+        elif code == OP_ADD:
+            value = 1 if card_type == 'C' else 0
+            if src == ZONE_DT:
+                top[rows] -= 1
+                deck[rows, top[rows]] = value
+            elif src == ZONE_DB:
+                deck[rows, bot[rows]] = value
+                bot[rows] += 1
+            elif src == ZONE_RS:
+                rest_c[rows] += value
+                rest_n[rows] += 1 - value
+            else:
+                clock_append(rows, value)
+                total_damage[rows] += 1
+                check_level_up(rows)
+        
+        elif code == OP_REMOVE:
+            value = 1 if card_type == 'C' else 0
+            if src == ZONE_DT or src == ZONE_DB:
+                current = deck[rows]
+                segment = (positions >= top[rows][:, None]) & (positions < bot[rows][:, None])
+                match = segment & (current == value)
+                has = match.any(axis=1)
+                current, match, rows = current[has], match[has], rows[has]
+                shifted = np.zeros_like(current)
+                if src == ZONE_DT:
+                    # 移除最靠近顶部的一张，其上方的卡整体下移一格
+                    index = match.argmax(axis=1)
+                    shifted[:, 1:] = current[:, :-1]
+                    moving = (positions > top[rows][:, None]) & (positions <= index[:, None])
+                    deck[rows] = np.where(moving, shifted, current)
+                    top[rows] += 1
+                else:
+                    # 移除最靠近底部的一张，其下方的卡整体上移一格
+                    index = width - 1 - match[:, ::-1].argmax(axis=1)
+                    shifted[:, :-1] = current[:, 1:]
+                    moving = (positions >= index[:, None]) & (positions < bot[rows][:, None] - 1)
+                    deck[rows] = np.where(moving, shifted, current)
+                    bot[rows] -= 1
+            elif src == ZONE_RS:
+                zone = rest_c if value else rest_n
+                rows = rows[zone[rows] > 0]
+                zone[rows] -= 1
+            else:
+                match = (clock[rows] == value) & (np.arange(clock_width) < clock_len[rows][:, None])
+                has = match.any(axis=1)
+                rows = rows[has]
+                clock_remove(rows, match[has].argmax(axis=1))
+                total_damage[rows] -= 1
+        
+        return carry_out
+    
+    all_rows = np.arange(size)
+    carry = np.zeros(size, dtype=np.int64)
+    for slot in slots:
+        refresh_deck(all_rows)
+        next_carry = np.zeros(size, dtype=np.int64)
+        for carry_id, index in slot.items():
+            rows = np.nonzero(carry == carry_id)[0]
+            if rows.size:
+                next_carry[rows] = execute(ops[index], rows)
+        carry = next_carry
+    
+    # 处理最后可能剩余的特殊zj效果
+    for carry_id, index in tail.items():
+        rows = np.nonzero(carry == carry_id)[0]
+        if rows.size:
+            execute(ops[index], rows)
+    
+    refresh_deck(all_rows)
+    # 处理抽牌
+    if draw_card:
+        refresh_deck(all_rows)
+        rows = all_rows[top < bot]
+        clock_append(rows, pop_top(rows))
+        total_damage[rows] += 1
+        check_level_up(rows)
+        refresh_deck(rows)
+    
+    return total_damage, refresh_count, level_up_count
+
+def simulate_batch(D, N, R, RC, C, CC, damage_seq, draw_card=False, trials=10000,
+                   batch_size=100000, seed=None):
+    """向量化批量模拟，结果与simulate同分布；每批结果只累加到直方图，返回 SimulationResult"""
+    program = compile_damage_sequence(damage_seq)
+    rng = np.random.default_rng(seed)
+    result = SimulationResult()
+    
+    for begin in range(0, trials, batch_size):
+        size = min(batch_size, trials - begin)
+        chunk = _simulate_batch_chunk(program, D, N, R, RC, C, CC, draw_card, size, rng)
+        result.merge(SimulationResult.from_samples(*(values.tolist() for values in chunk)))
+    
+    return result
@@ -0,0 +1,149 @@
+"""
+模拟引擎的基准测试：固定用例集，报告每秒试验数和峰值内存，并与保存的基准JSON比较。
+
+    python -m wssim.bench                          # 运行并打印结果
+    python -m wssim.bench --save bench.json        # 保存为基准
+    python -m wssim.bench --baseline bench.json    # 与基准比较，退步超过阈值时返回1
+    python -m wssim.bench --baseline               # 与仓库中的参考基准 wssim/bench_baseline.json 比较
+
+main.py 与 ws cl.py 都调用 wssim.simulate，"simulate" 引擎即两个界面实际使用的引擎。
+参考基准的吞吐与录制它的机器有关，在其他机器上比较前先用 --save 在本机录制一份。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from .engine import simulate
+from .parser import parse_damage_sequence
+
+# 名称: (伤害序列, (D, N, R, RC, C, CC), 结束后是否抽牌)
+CORPUS = {
+    "plain": ("3,3,2,3,4,2,3", (50, 8, 0, 0, 0, 0), False),
+    "draw-card": ("3,3,2,3,4,2,3", (50, 8, 0, 0, 0, 0), True),
+    "example-szj": ("*2zj(2),3,4", (50, 8, 0, 0, 0, 0), False),
+    "example-szj-stack": ("*2zj(1),*3zj(2),4", (50, 8, 0, 0, 0, 0), False),
+    "fx-heavy": ("3,fx2,3,fx3,2,fx1,4,fx2,3", (40, 8, 10, 2, 3, 1), False),
+    "refresh-heavy": ("3,3,3,3,3,3,3,3", (12, 2, 20, 6, 2, 0), False),
+    "refresh-draw-card": ("3,3,3,3,3,3,3,3", (12, 2, 20, 6, 2, 0), True),
+    "conditional-move": ("DT>RS4:C+zj(2),3,DT>RS3:N+zj(1),4", (45, 8, 5, 1, 0, 0), False),
+}
+
+# 仓库中的参考基准，由 --save 在参考机器上录制
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "bench_baseline.json")
+# 同一机器上重复运行的吞吐波动约在10%以内，超过该比例才视为退步
+DEFAULT_THRESHOLD = 0.15
+
+def _run_parallel(*args, trials, seed):
+    from .parallel import simulate_parallel
+    return simulate_parallel(*args, trials=trials, seed=seed)
+
+def _run_batch(*args, trials, seed):
+    from .batch import simulate_batch
+    return simulate_batch(*args, trials=trials, seed=seed)
+
+# 名称: fn(D, N, R, RC, C, CC, damage_seq, draw_card, trials=, seed=)
+# numpy引擎在运行时才导入；parallel的子进程内存不计入峰值内存
+ENGINES = {
+    "simulate": simulate,
+    "batch": _run_batch,
+    "parallel": _run_parallel,
+}
+
+def run_case(engine, damage, state, trials, repeat=3, seed=1, draw_card=False):
+    """
+    运行一个用例，返回 {"trials_per_sec": 最快一次的吞吐, "peak_kib": 峰值内存}。
+    计时与内存分开测量，tracemalloc 的开销不计入吞吐。
+    """
+    damage_seq = parse_damage_sequence(damage)
+    fn = ENGINES[engine]
+    # 预热：numpy引擎的导入和首次调用开销不计入结果
+    fn(*state, damage_seq, draw_card, trials=min(trials, 100), seed=seed)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*state, damage_seq, draw_card, trials=trials, seed=seed)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn(*state, damage_seq, draw_card, trials=trials, seed=seed)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"trials_per_sec": trials / best, "peak_kib": peak / 1024}
+
+def run_benchmarks(engines=("simulate",), cases=None, trials=20000, repeat=3, progress=None):
+    """返回 {"用例/引擎": run_case 的结果}"""
+    report = {}
+    for case in cases or CORPUS:
+        damage, state, draw_card = CORPUS[case]
+        for engine in engines:
+            report[f"{case}/{engine}"] = run_case(engine, damage, state, trials, repeat,
+                                                  draw_card=draw_card)
+            if progress is not None:
+                progress(f"{case}/{engine}", report[f"{case}/{engine}"])
+    return report
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    与基准比较，返回退步列表 [(键, 指标, 基准值, 当前值)]：
+    吞吐低于基准的 (1 - threshold) 倍，或峰值内存高于基准的 (1 + threshold) 倍。
+    基准中没有的用例不参与比较。
+    """
+    regressions = []
+    for key, current in report.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current["trials_per_sec"] < base["trials_per_sec"] * (1 - threshold):
+            regressions.append((key, "trials_per_sec", base["trials_per_sec"],
+                                current["trials_per_sec"]))
+        if current["peak_kib"] > base["peak_kib"] * (1 + threshold):
+            regressions.append((key, "peak_kib", base["peak_kib"], current["peak_kib"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="wssim.bench", description="模拟引擎基准测试")
+    parser.add_argument("-e", "--engines", nargs="+", choices=list(ENGINES), default=["simulate"],
+                        help="要测试的引擎 (默认simulate)")
+    parser.add_argument("-c", "--cases", nargs="+", choices=list(CORPUS), default=None,
+                        help="要运行的用例 (默认全部)")
+    parser.add_argument("-n", "--trials", type=int, default=20000, help="每个用例的试验次数 (默认20000)")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数，取最快一次 (默认3)")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help="与该基准JSON比较，不给路径时使用仓库中的参考基准 wssim/bench_baseline.json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"允许的退步比例 (默认{DEFAULT_THRESHOLD}，"
+                             f"即{DEFAULT_THRESHOLD * 100:.0f}%%)")
+    parser.add_argument("--save", metavar="PATH", help="把本次结果保存为基准JSON")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    def progress(key, result):
+        line = f"{key:<32} {result['trials_per_sec']:>12,.0f} 次/秒 {result['peak_kib']:>10,.1f} KiB"
+        base = baseline.get(key)
+        if base is not None:
+            line += f"  ({result['trials_per_sec'] / base['trials_per_sec'] - 1:+.1%})"
+        print(line, flush=True)
+
+    report = run_benchmarks(args.engines, args.cases, args.trials, args.repeat, progress)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    regressions = compare(report, baseline, args.threshold)
+    for key, metric, base, current in regressions:
+        print(f"退步: {key} {metric} {base:,.1f} -> {current:,.1f}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""模拟结果的磁盘缓存（SQLite），按配置内容寻址，按最近使用时间淘汰"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from .engine import ENGINE_VERSION, simulate_program
+from .program import compile_damage_sequence
+from .result import SimulationResult
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".wssim", "cache.sqlite3")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def cache_key(program, D, N, R, RC, C, CC, draw_card, trials, seed):
+    """
+    由卡组状态、编译后的程序、draw_card、试验次数、种子和引擎版本计算缓存键。
+    使用编译结果而非原始文本，写法不同但等价的伤害序列命中同一条缓存。
+    """
+    content = repr((ENGINE_VERSION, tuple(program), D, N, R, RC, C, CC, bool(draw_card),
+                    trials, seed))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _encode(result):
+    # 保持直方图的插入顺序，解码后求和顺序不变，统计量逐位一致
+    hists = [list(hist.items()) for hist in
+             (result.damage_hist, result.refresh_hist, result.level_up_hist)]
+    return json.dumps(hists, separators=(",", ":")).encode("utf-8")
+
+def _decode(data):
+    return SimulationResult(*(dict(pairs) for pairs in json.loads(data)))
+
+class ResultCache:
+    """
+    只保存三个直方图，每条通常不足1KB。总大小超过 max_bytes 时删除最久未使用的条目。
+    每次读写单独打开连接，可在GUI的工作线程中直接使用。
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                         "key TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                         "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        """返回缓存的 SimulationResult 并刷新其使用时间，未命中返回None"""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return _decode(row[0])
+
+    def put(self, key, result):
+        data = _encode(result)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                         (key, data, len(data), time.time()))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used DESC"):
+            total += size
+            if total > self.max_bytes:
+                stale.append((key,))
+        conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM results")
+
+    def simulate(self, D, N, R, RC, C, CC, damage_seq, draw_card=False, trials=10000, seed=None,
+                 progress=None):
+        """
+        与 engine.simulate 相同，但先查缓存，未命中时模拟并写入缓存。
+        缓存的结果即该种子完整模拟的结果；seed为None时没有可复现的结果，直接模拟、不读写缓存。
+        """
+        program = compile_damage_sequence(damage_seq)
+        if seed is None:
+            return simulate_program(program, D, N, R, RC, C, CC, draw_card, trials, seed, progress)
+        key = cache_key(program, D, N, R, RC, C, CC, draw_card, trials, seed)
+        result = self.get(key)
+        if result is None:
+            result = simulate_program(program, D, N, R, RC, C, CC, draw_card, trials, seed, progress)
+            self.put(key, result)
+        return result
@@ -0,0 +1,69 @@
+"""
+前缀状态检查点：逐步编辑伤害序列时，从保存的前缀结束状态继续模拟，不再重放前缀。
+
+每个顶层位置结束后的状态是一个元组
+    (已知顶部卡, 中段高潮数, 中段普通数, 已知底部卡, 休息室高潮数, 休息室普通数,
+     计时区高潮数, 计时区普通数, 卡组更新次数, 总伤害, 升级次数, 传火追加编号)
+卡组的随机中段只记录数量，后续的模拟与完整重放同分布。
+每个位置保存的不同状态数不超过试验次数，续算时按 {状态: 试验数} 逐个状态模拟，不展开成逐次试验的列表。
+"""
+
+from .engine import simulate_program
+from .program import compile_damage_sequence, slot_ops_end
+
+class PrefixCheckpoint:
+    """
+    一次模拟在每个顶层位置结束后的状态分布。
+    state  (D, N, R, RC, C, CC)
+    ops    编译后的程序中属于顶层位置的操作（不含序列结束后的传火追加）
+    slots  各顶层位置的入口表
+    states states[k] 为执行完前 k+1 个顶层位置后的 {状态: 试验数}
+    """
+    def __init__(self, state, trials, program, states):
+        self.state = state
+        self.trials = trials
+        self.ops = program.ops[:slot_ops_end(program, len(program.slots))]
+        self.slots = program.slots
+        self.states = states
+
+    def reusable(self, state, trials, program):
+        """新程序可直接复用的顶层位置数：卡组状态和试验次数相同，且前k个位置编译结果一致"""
+        if state != self.state or trials != self.trials:
+            return 0
+        k = 0
+        for slot, saved in zip(program.slots, self.slots):
+            if slot != saved:
+                break
+            end = slot_ops_end(program, k + 1)
+            if program.ops[:end] != self.ops[:end]:
+                break
+            k += 1
+        return k
+
+    def extended_by(self, state, trials, program):
+        """新程序是否在保存的整个序列之后追加了伤害（卡组状态和试验次数也相同），即可以只模拟新增部分"""
+        return (len(program.slots) > len(self.slots)
+                and self.reusable(state, trials, program) == len(self.slots))
+
+def simulate_incremental(D, N, R, RC, C, CC, damage_seq, draw_card=False, trials=10000, seed=None,
+                         progress=None, checkpoint=None, extend_only=False):
+    """
+    与simulate相同，但尽量从 checkpoint 保存的前缀状态继续：
+    新序列的前k个顶层伤害与上次相同时只模拟其余部分，并以上次的前缀状态作为起点。
+    返回 (SimulationResult, 新的 PrefixCheckpoint)，新检查点可用于下一次编辑。
+    续算结果与完整模拟同分布，但同一种子下的样本不同；与上次的结果共用前缀的样本，彼此相关。
+    extend_only 为True时只在新序列严格延长上次的序列时续算，否则重新模拟（重复模拟同一序列得到新的样本）。
+    """
+    program = compile_damage_sequence(damage_seq)
+    state = (D, N, R, RC, C, CC)
+    k = 0
+    if checkpoint is not None and (not extend_only or checkpoint.extended_by(state, trials, program)):
+        k = checkpoint.reusable(state, trials, program)
+    resume = None
+    if k:
+        resume = (k, checkpoint.states[k - 1])
+    saved = [{} for _ in program.slots[k:]]
+    result = simulate_program(program, D, N, R, RC, C, CC, draw_card, trials, seed, progress,
+                              resume=resume, checkpoints=saved)
+    states = (checkpoint.states[:k] if k else []) + saved
+    return result, PrefixCheckpoint(state, trials, program, states)
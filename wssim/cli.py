@@ -0,0 +1,151 @@
+"""
+命令行批量模拟入口，不导入任何GUI模块：
+
+    python -m wssim "2zj(3),4" -D 50 -N 8 -n 100000 --seed 1 -f json -o result.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+from .parser import DamageSequenceError, parse_damage_sequence, format_damage_seq
+from .engine import simulate
+from .adaptive import simulate_adaptive
+from .cache import DEFAULT_CACHE_PATH, ResultCache
+from .profile import EngineProfile
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="wssim", description="Weiß Schwarz 伤害模拟（命令行）")
+    parser.add_argument("damage", help="伤害序列，如 \"1,2,3zj(2,1)\"")
+    parser.add_argument("-D", "--deck", type=int, default=50, help="牌组大小 (默认50)")
+    parser.add_argument("-N", "--climax", type=int, default=8, help="牌组高潮卡数 (默认8)")
+    parser.add_argument("-R", "--rest", type=int, default=0, help="休息室总数")
+    parser.add_argument("--RC", "--rest-climax", dest="rest_climax", type=int, default=0,
+                        help="休息室高潮数")
+    parser.add_argument("-C", "--clock", type=int, default=0, help="计时区总数")
+    parser.add_argument("--CC", "--clock-climax", dest="clock_climax", type=int, default=0,
+                        help="计时区高潮数")
+    parser.add_argument("--draw-card", action="store_true", help="结束后抽1张牌到手牌")
+    parser.add_argument("-n", "--trials", type=int, default=10000, help="模拟次数 (默认10000)")
+    parser.add_argument("--half-width", type=float, default=None,
+                        help="自适应模式：P(伤害≥--lethal)的95%%置信区间半宽达到该值即停止，此时-n为次数上限")
+    parser.add_argument("--lethal", type=int, default=6, help="自适应模式的致死阈值k (默认6)")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, default=None, metavar="PATH",
+                        help=f"单进程模拟时使用磁盘结果缓存，相同配置和种子直接返回，需同时给出 --seed "
+                             f"(默认路径 {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--profile", action="store_true",
+                        help="统计各操作的调用次数和耗时，报告输出到标准错误（仅单进程，不使用缓存）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="并行进程数 (默认1；0表示使用全部CPU)")
+    parser.add_argument("-f", "--format", choices=["json", "csv"], default=None,
+                        help="输出格式，默认按输出文件扩展名判断，否则为json")
+    parser.add_argument("-o", "--output", default="-", help="输出文件 (默认标准输出)")
+    return parser
+
+def run(args, damage_seq, profile=None):
+    params = (args.deck, args.climax, args.rest, args.rest_climax, args.clock, args.clock_climax,
+              damage_seq, args.draw_card)
+    if profile is not None:
+        return simulate(*params, trials=args.trials, seed=args.seed, profile=profile)
+    if args.half_width is not None:
+        return simulate_adaptive(*params, threshold=args.lethal, half_width=args.half_width,
+                                 max_trials=args.trials, seed=args.seed)
+    if args.cache is not None:
+        return ResultCache(args.cache).simulate(*params, trials=args.trials, seed=args.seed)
+    if args.workers == 1:
+        return simulate(*params, trials=args.trials, seed=args.seed)
+    # 进程池与numpy只在多进程时才导入，单进程运行保持快速启动
+    from .parallel import simulate_parallel
+    return simulate_parallel(*params, trials=args.trials, workers=args.workers or None,
+                             seed=args.seed)
+
+def result_to_dict(args, damage_seq, result):
+    return {
+        "params": {
+            "D": args.deck, "N": args.climax, "R": args.rest, "RC": args.rest_climax,
+            "C": args.clock, "CC": args.clock_climax,
+            "damage": format_damage_seq(damage_seq),
+            "draw_card": args.draw_card,
+            "trials": result.trials,
+            "seed": args.seed,
+            "workers": args.workers,
+        },
+        "adaptive": None if args.half_width is None else {
+            "lethal": args.lethal,
+            "half_width": args.half_width,
+            "interval": list(result.survival_interval(args.lethal)),
+        },
+        "mean_damage": result.mean_damage(),
+        "std_damage": result.std_damage(),
+        "min_damage": result.min_damage,
+        "max_damage": result.max_damage,
+        "median_damage": result.percentile(50),
+        "mean_refreshes": result.mean_refreshes(),
+        "mean_level_ups": result.mean_level_ups(),
+        "survival": result.survival(),
+        "damage_hist": {str(k): v for k, v in sorted(result.damage_hist.items())},
+        "refresh_hist": {str(k): v for k, v in sorted(result.refresh_hist.items())},
+        "level_up_hist": {str(k): v for k, v in sorted(result.level_up_hist.items())},
+    }
+
+def write_csv(stream, result):
+    """每个伤害值一行：试验数、P(伤害=k)、P(伤害≥k)"""
+    writer = csv.writer(stream)
+    writer.writerow(["damage", "count", "probability", "at_least"])
+    trials = result.trials
+    at_least = trials
+    for damage in range(result.min_damage, result.max_damage + 1):
+        count = result.damage_hist.get(damage, 0)
+        writer.writerow([damage, count, f"{count / trials:.6f}", f"{at_least / trials:.6f}"])
+        at_least -= count
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        damage_seq = parse_damage_sequence(args.damage)
+    except DamageSequenceError as e:
+        parser.error(f"伤害序列解析失败: {e}")
+    if not damage_seq:
+        parser.error("伤害序列解析为空")
+    if args.trials < 1:
+        parser.error("模拟次数必须为正整数")
+    if args.workers < 0:
+        parser.error("并行进程数不能为负数")
+    if args.half_width is not None and not 0 < args.half_width < 0.5:
+        parser.error("置信区间半宽必须在0到0.5之间")
+    if args.deck < 0 or args.rest < 0 or args.clock < 0:
+        parser.error("牌组、休息室和计时区的张数不能为负数")
+    if not 0 <= args.climax <= args.deck:
+        parser.error("牌组高潮卡数必须在0到牌组大小之间")
+    if not 0 <= args.rest_climax <= args.rest:
+        parser.error("休息室高潮数必须在0到休息室总数之间")
+    if not 0 <= args.clock_climax <= args.clock:
+        parser.error("计时区高潮数必须在0到计时区总数之间")
+    # 自适应模式、剖析和缓存都只支持单进程，且彼此不能组合
+    if args.workers != 1 and (args.half_width is not None or args.profile or args.cache is not None):
+        parser.error("--half-width、--profile、--cache 只支持单进程，不能与 -j 同时使用")
+    if sum((args.half_width is not None, args.profile, args.cache is not None)) > 1:
+        parser.error("--half-width、--profile、--cache 不能同时使用")
+    if args.cache is not None and args.seed is None:
+        parser.error("--cache 需要同时给出 --seed，未固定种子的模拟不缓存")
+
+    profile = EngineProfile() if args.profile else None
+    result = run(args, damage_seq, profile)
+    if profile is not None:
+        print(profile.format_report(), file=sys.stderr)
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "json")
+    stream = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            write_csv(stream, result)
+        else:
+            json.dump(result_to_dict(args, damage_seq, result), stream, ensure_ascii=False, indent=2)
+            stream.write("\n")
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0
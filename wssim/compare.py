@@ -0,0 +1,66 @@
+"""共同随机数配对比较：多个配置的每次试验共用同一个随机种子"""
+
+import random
+from collections import namedtuple
+
+from .engine import PROGRESS_INTERVAL, simulate_program
+from .program import compile_damage_sequence
+from .result import SimulationResult, z_value
+
+# 某配置相对基准配置的配对差值（该配置 - 基准）：
+#   mean, mean_ci      期望伤害之差及其置信区间 (下限, 上限)
+#   lethal, lethal_ci  “造成≥threshold点伤害”的概率之差及其置信区间
+PairedDifference = namedtuple('PairedDifference', ['mean', 'mean_ci', 'lethal', 'lethal_ci'])
+
+def _paired_interval(total, total_sq, n, z):
+    """由逐次差值之和与平方和计算均值及正态近似置信区间"""
+    mean = total / n
+    variance = (total_sq - n * mean * mean) / (n - 1) if n > 1 else 0.0
+    half_width = z * (max(variance, 0.0) / n) ** 0.5
+    return mean, (mean - half_width, mean + half_width)
+
+def compare_paired(configs, threshold, trials=10000, seed=None, confidence=0.95, progress=None):
+    """
+    用共同随机数模拟多个配置，并逐次与第一个配置（基准）配对比较。
+    configs 为参数字典列表，键为 D、N、R、RC、C、CC、damage_seq、draw_card（与GUI保存的配置参数相同）。
+    每次试验所有配置使用同一个种子，相同的洗牌结果驱动每个配置，
+    配对差值的方差远小于两次独立模拟之差，达到同样精度所需的试验次数少得多。
+    返回 (各配置的 SimulationResult 列表, 其余各配置相对基准的 PairedDifference 列表)。
+    progress(已完成次数, 总次数) 每完成一批试验调用一次，可抛出 SimulationCancelled 取消。
+    """
+    programs = [compile_damage_sequence(config['damage_seq']) for config in configs]
+    master = random.Random(seed)
+    z = z_value(confidence)
+    results = [SimulationResult() for _ in configs]
+    # 每个非基准配置：[伤害差之和, 伤害差平方和, 致死差之和, 致死差平方和]
+    sums = [[0, 0, 0, 0] for _ in configs[1:]]
+
+    for begin in range(0, trials, PROGRESS_INTERVAL):
+        size = min(PROGRESS_INTERVAL, trials - begin)
+        trial_seeds = [master.getrandbits(64) for _ in range(size)]
+        damages = []
+        for program, config, result in zip(programs, configs, results):
+            damage = []
+            result.merge(simulate_program(program, config['D'], config['N'], config['R'],
+                                          config['RC'], config['C'], config['CC'],
+                                          config['draw_card'], trial_seeds=trial_seeds,
+                                          damage_out=damage))
+            damages.append(damage)
+        base = damages[0]
+        for acc, other in zip(sums, damages[1:]):
+            for a, b in zip(other, base):
+                diff = a - b
+                lethal = (a >= threshold) - (b >= threshold)
+                acc[0] += diff
+                acc[1] += diff * diff
+                acc[2] += lethal
+                acc[3] += lethal * lethal
+        if progress is not None:
+            progress(begin + size, trials)
+
+    differences = []
+    for total, total_sq, lethal_total, lethal_sq in sums:
+        mean, mean_ci = _paired_interval(total, total_sq, trials, z)
+        lethal, lethal_ci = _paired_interval(lethal_total, lethal_sq, trials, z)
+        differences.append(PairedDifference(mean, mean_ci, lethal, lethal_ci))
+    return results, differences
@@ -0,0 +1,658 @@
+"""逐次试验的蒙特卡洛模拟引擎（纯Python，不依赖numpy）"""
+
+import random
+from itertools import repeat
+
+from .program import (OP_DAMAGE, OP_FX, OP_MOVE, OP_ADD, OP_REMOVE, ZONE_DT, ZONE_DB, ZONE_RS,
+                      ZONE_CL, EFFECT_ZJ, EFFECT_SZJ, compile_damage_sequence, _deck_layout)
+from .result import SimulationResult
+
+# simulate 每完成这么多次试验调用一次 progress 回调
+PROGRESS_INTERVAL = 2000
+
+# 引擎版本：任何改变模拟结果（同一种子下的直方图）的改动都要递增，使磁盘缓存中的旧结果失效
+ENGINE_VERSION = 1
+
+class SimulationCancelled(Exception):
+    """由 progress 回调抛出，用于中途取消模拟"""
+
+def initial_state(D, N, R, RC, C, CC):
+    """伤害开始前的试验状态：卡组全部未翻开，格式见 wssim.checkpoint"""
+    return ((), N, D - N, (), RC, R - RC, CC, C - CC, 0, 0, 0, 0)
+
+class TrialEngine:
+    """
+    一次试验的全部状态和操作。卡组缓冲区在构造时按程序所需的最大张数分配，
+    每次试验只需 reset 到起始状态，试验循环中不创建函数对象和列表，同一个对象可反复使用。
+
+    卡组按需抽样：已知顶部 deck_buf[top:split] + 未翻开的随机中段 (mid_c, mid_n)
+    + 已知底部 deck_buf[split:bot]，翻到中段时按剩余数量无放回抽样，与完整洗牌同分布。
+    休息室和计时区只记录 (高潮卡数, 普通卡数)。
+    所有随机判定都经过 reveal_climax（卡组中段）和 draw_climax（休息室/计时区），
+    重要性抽样、重新加权等扩展通过子类覆盖这些方法实现。
+    """
+    __slots__ = ('ops', 'tail', 'head', 'deck_buf', 'moved', 'rand', 'randrange', 'shuffle',
+                 'top', 'split', 'bot', 'mid_c', 'mid_n', 'deck_left', 'rest_c', 'rest_n',
+                 'clock_c', 'clock_n', 'refresh_count', 'total_damage', 'level_up_count', 'carry')
+
+    def __init__(self, program, D, R, C, rng):
+        self.ops = program.ops
+        self.tail = program.tail
+        self.head, capacity = _deck_layout(program, D, R, C)
+        self.deck_buf = [None] * capacity
+        # 移动中的卡，每次移动前清空后复用
+        self.moved = []
+        self.rand = rng.random
+        self.randrange = rng.randrange
+        self.shuffle = rng.shuffle
+        self.reset(initial_state(0, 0, 0, 0, 0, 0))
+
+    def reset(self, state):
+        """从状态元组（格式见 wssim.checkpoint）开始一次新的试验"""
+        (known_top, self.mid_c, self.mid_n, known_bottom, self.rest_c, self.rest_n, self.clock_c,
+         self.clock_n, self.refresh_count, self.total_damage, self.level_up_count,
+         self.carry) = state
+        top = self.head
+        split = top + len(known_top)
+        bot = split + len(known_bottom)
+        self.deck_buf[top:split] = known_top
+        self.deck_buf[split:bot] = known_bottom
+        self.top, self.split, self.bot = top, split, bot
+        self.deck_left = bot - top + self.mid_c + self.mid_n
+
+    def snapshot(self):
+        """当前状态元组，可交给 reset 继续模拟"""
+        return (tuple(self.deck_buf[self.top:self.split]), self.mid_c, self.mid_n,
+                tuple(self.deck_buf[self.split:self.bot]), self.rest_c, self.rest_n, self.clock_c,
+                self.clock_n, self.refresh_count, self.total_damage, self.level_up_count,
+                self.carry)
+
+    def run(self, slots, draw_card):
+        """执行各顶层位置、剩余的传火追加和抽牌，carry为上一个伤害留下的传火追加编号"""
+        ops, execute, refresh_deck = self.ops, self.execute, self.refresh_deck
+        for slot in slots:
+            refresh_deck()
+            self.carry = execute(ops[slot[self.carry]])
+        self.finish(draw_card)
+
+    def finish(self, draw_card):
+        """处理最后可能剩余的特殊zj效果和抽牌"""
+        if self.carry:
+            self.execute(self.ops[self.tail[self.carry]])
+
+        self.refresh_deck()
+        # 处理抽牌
+        if draw_card:
+            self.refresh_deck()
+            if self.deck_left:
+                self.total_damage += 1
+                self.clock_add(self.reveal_top())
+                self.refresh_deck()
+
+    def reveal_climax(self, climax, total):
+        """从total张未翻开的卡（其中climax张高潮卡）中翻出一张，返回是否为高潮卡"""
+        return self.rand() * total < climax
+
+    def draw_climax(self, zone, climax, total):
+        """从休息室或计时区（zone）的total张卡中随机取一张，返回是否为高潮卡"""
+        return self.randrange(total) < climax
+
+    def refresh_deck(self):
+        if not self.deck_left:
+            if not (self.rest_c or self.rest_n):
+                return False
+            self.reshuffle()
+            self.total_damage += 1
+            self.clock_add(self.reveal_top())
+        return True
+
+    def reshuffle(self):
+        """卡组更新：休息室整体成为未翻开的随机中段，无需洗牌"""
+        self.refresh_count += 1
+        self.top = self.split = self.bot = self.head
+        self.mid_c, self.mid_n = self.rest_c, self.rest_n
+        self.deck_left = self.rest_c + self.rest_n
+        self.rest_c = self.rest_n = 0
+
+    def reveal_top(self):
+        """翻开卡组顶部的一张卡"""
+        self.deck_left -= 1
+        top = self.top
+        if top < self.split:
+            self.top = top + 1
+            return self.deck_buf[top]
+        mid_c, mid_n = self.mid_c, self.mid_n
+        if mid_c or mid_n:
+            if self.reveal_climax(mid_c, mid_c + mid_n):
+                self.mid_c = mid_c - 1
+                return 'C'
+            self.mid_n = mid_n - 1
+            return 'N'
+        self.top = self.split = top + 1
+        return self.deck_buf[top]
+
+    def reveal_bottom(self):
+        """翻开卡组底部的一张卡"""
+        self.deck_left -= 1
+        if self.split < self.bot:
+            self.bot -= 1
+            return self.deck_buf[self.bot]
+        mid_c, mid_n = self.mid_c, self.mid_n
+        if mid_c or mid_n:
+            if self.reveal_climax(mid_c, mid_c + mid_n):
+                self.mid_c = mid_c - 1
+                return 'C'
+            self.mid_n = mid_n - 1
+            return 'N'
+        self.bot -= 1
+        self.split = self.bot
+        return self.deck_buf[self.bot]
+
+    def materialize(self):
+        """把随机中段排成具体顺序，整个卡组移回缓冲区起点（仅DT-/DB-需要）"""
+        deck_buf = self.deck_buf
+        middle = ['C'] * self.mid_c + ['N'] * self.mid_n
+        self.shuffle(middle)
+        cards = deck_buf[self.top:self.split] + middle + deck_buf[self.split:self.bot]
+        self.top, self.bot = self.head, self.head + len(cards)
+        self.split = self.bot
+        deck_buf[self.top:self.bot] = cards
+        self.mid_c = self.mid_n = 0
+
+    def level_up_climax(self):
+        """升级时离开计时区的7张卡中的高潮卡数"""
+        if self.clock_c + self.clock_n == 7:
+            return self.clock_c
+        # 只有初始计时区超过7张时才会出现，此时前7张是随机的7张
+        lvl_c = 0
+        left_c, left = self.clock_c, self.clock_c + self.clock_n
+        for _ in range(7):
+            if self.draw_climax(ZONE_CL, left_c, left):
+                lvl_c += 1
+                left_c -= 1
+            left -= 1
+        return lvl_c
+
+    def check_level_up(self):
+        while self.clock_c + self.clock_n >= 7:
+            lvl_c = self.level_up_climax()
+            lvl_n = 7 - lvl_c
+            self.clock_c -= lvl_c
+            self.clock_n -= lvl_n
+            # 有普通卡则以普通卡升级，否则以高潮卡升级，其余6张进休息室
+            if lvl_n:
+                self.rest_c += lvl_c
+                self.rest_n += lvl_n - 1
+            else:
+                self.rest_c += 6
+            self.level_up_count += 1
+
+    def clock_add(self, card):
+        """计时区加入一张卡，加入前后各检查一次升级"""
+        self.check_level_up()
+        if card == 'C':
+            self.clock_c += 1
+        else:
+            self.clock_n += 1
+        self.check_level_up()
+
+    def clock_add_n(self, count):
+        """计时区依次加入count张普通卡，等价于整批加入后检查升级"""
+        self.check_level_up()
+        need = 7 - self.clock_c - self.clock_n
+        if count < need:
+            self.clock_n += count
+            return
+        # 第一次升级由原有的卡补足7张，之后每7张普通卡升级一次
+        self.rest_c += self.clock_c
+        self.rest_n += self.clock_n + need - 1
+        full, self.clock_n = divmod(count - need, 7)
+        self.clock_c = 0
+        self.rest_n += 6 * full
+        self.level_up_count += 1 + full
+
+    def run_block(self, start, end):
+        ops, execute = self.ops, self.execute
+        for index in range(start, end):
+            execute(ops[index])
+
+    def execute(self, op):
+        """执行一条编译后的操作，返回被取消的传火追加编号（无则为0）"""
+        code, src, dst, count, card_type, effect, start, end, next_carry = op
+
+        if code == OP_DAMAGE:
+            dmg = count
+            # 优化：添加对dmg为0或负数的保护
+            if dmg <= 0:
+                return 0
+
+            # 处理区只需记录翻出的普通卡数和是否翻到高潮卡
+            deck_buf = self.deck_buf
+            zone_n = 0
+            cancelled = False
+            for _ in range(dmg):
+                if not self.deck_left and not self.refresh_deck():
+                    break
+
+                # 翻卡：优先已知顶部，其次按中段剩余数量抽样（与 reveal_top 相同，内联以减少调用）
+                self.deck_left -= 1
+                top = self.top
+                if top < self.split:
+                    card = deck_buf[top]
+                    self.top = top + 1
+                elif self.mid_c or self.mid_n:
+                    mid_c = self.mid_c
+                    if self.reveal_climax(mid_c, mid_c + self.mid_n):
+                        card = 'C'
+                        self.mid_c = mid_c - 1
+                    else:
+                        card = 'N'
+                        self.mid_n -= 1
+                else:
+                    card = deck_buf[top]
+                    self.top = self.split = top + 1
+
+                # 在每次取牌后检查牌组是否为空
+                if not self.deck_left:
+                    self.refresh_deck()
+
+                if card == 'C':
+                    cancelled = True
+                    break
+                zone_n += 1
+
+            # 处理翻出的卡
+            if cancelled:
+                self.rest_c += 1
+                self.rest_n += zone_n
+                if effect == EFFECT_SZJ:
+                    self.run_block(start, end)
+                    # 返回特殊zj效果给下一个伤害
+                    return next_carry
+                if effect == EFFECT_ZJ:
+                    self.run_block(start, end)
+            elif zone_n:
+                self.clock_add_n(zone_n)
+                self.total_damage += zone_n
+
+            self.check_level_up()
+            self.refresh_deck()
+            return 0
+
+        if not self.refresh_deck():
+            return 0
+
+        if code == OP_FX:
+            self.fx(count)
+        elif code == OP_MOVE:
+            if self.move(src, dst, count, card_type):
+                self.run_block(start, end)
+        elif code == OP_ADD:
+            self.add(src, card_type)
+        elif code == OP_REMOVE:
+            self.remove(src, card_type)
+        return 0
+
+    def fx(self, count):
+        """反洗：休息室至多count张普通卡洗回卡组"""
+        self.check_level_up()
+        moved = min(count, self.rest_n)
+        self.rest_n -= moved
+        # 洗回的卡与整个卡组重新洗牌：已知部分全部并入随机中段
+        top, bot = self.top, self.bot
+        known_c = self.deck_buf[top:bot].count('C')
+        self.mid_c += known_c
+        self.mid_n += bot - top - known_c + moved
+        self.deck_left += moved
+        self.top = self.split = self.bot = self.head
+
+    def move(self, src, dst, count, card_type):
+        """从src移动至多count张卡到dst，返回是否移动了card_type类型的卡（条件移动的追加分支）"""
+        deck_buf = self.deck_buf
+        moved_cards = self.moved
+        moved_cards.clear()
+        condition_met = False
+
+        for _ in range(count):
+            card = None
+            if src == ZONE_DT and self.deck_left:
+                card = self.reveal_top()
+                # 检查牌组是否为空
+                if not self.deck_left:
+                    self.refresh_deck()
+            elif src == ZONE_DB and self.deck_left:
+                card = self.reveal_bottom()
+                if not self.deck_left:
+                    self.refresh_deck()
+            elif src == ZONE_RS and (self.rest_c or self.rest_n):
+                if self.draw_climax(ZONE_RS, self.rest_c, self.rest_c + self.rest_n):
+                    card = 'C'
+                    self.rest_c -= 1
+                else:
+                    card = 'N'
+                    self.rest_n -= 1
+            elif src == ZONE_CL and (self.clock_c or self.clock_n):
+                if self.draw_climax(ZONE_CL, self.clock_c, self.clock_c + self.clock_n):
+                    card = 'C'
+                    self.clock_c -= 1
+                else:
+                    card = 'N'
+                    self.clock_n -= 1
+                self.total_damage -= 1
+
+            if card:
+                moved_cards.append(card)
+                if card == card_type:
+                    condition_met = True
+
+        for card in moved_cards:
+            if dst == ZONE_DT:
+                self.top -= 1
+                deck_buf[self.top] = card
+                self.deck_left += 1
+            elif dst == ZONE_DB:
+                deck_buf[self.bot] = card
+                self.bot += 1
+                self.deck_left += 1
+            elif dst == ZONE_RS:
+                if card == 'C':
+                    self.rest_c += 1
+                else:
+                    self.rest_n += 1
+            elif dst == ZONE_CL:
+                self.total_damage += 1
+                self.clock_add(card)
+        return condition_met
+
+    def add(self, zone, card_type):
+        """区域添加一张card_type类型的卡"""
+        if zone == ZONE_DT:
+            self.top -= 1
+            self.deck_buf[self.top] = card_type
+            self.deck_left += 1
+        elif zone == ZONE_DB:
+            self.deck_buf[self.bot] = card_type
+            self.bot += 1
+            self.deck_left += 1
+        elif zone == ZONE_RS:
+            if card_type == 'C':
+                self.rest_c += 1
+            else:
+                self.rest_n += 1
+        else:
+            self.total_damage += 1
+            self.clock_add(card_type)
+
+    def known_cards(self, zone):
+        """DT-/DB- 查找的已知部分：卡组的已知顶部或已知底部"""
+        if zone == ZONE_DT:
+            return self.deck_buf[self.top:self.split]
+        return self.deck_buf[self.split:self.bot]
+
+    def remove(self, zone, card_type):
+        """区域移除一张card_type类型的卡，没有则不变"""
+        deck_buf = self.deck_buf
+        if zone == ZONE_DT or zone == ZONE_DB:
+            # 目标卡可能在未翻开的中段里时，先确定中段的顺序
+            mid_has = self.mid_c if card_type == 'C' else self.mid_n
+            if mid_has and card_type not in self.known_cards(zone):
+                self.materialize()
+
+        top, split, bot = self.top, self.split, self.bot
+        if zone == ZONE_DT:
+            # 移除最靠近顶部的一张，其上方的卡下移一格
+            for i in range(top, bot):
+                if deck_buf[i] == card_type:
+                    deck_buf[top+1:i+1] = deck_buf[top:i]
+                    self.top = top + 1
+                    if i >= split:
+                        self.split = split + 1
+                    self.deck_left -= 1
+                    break
+        elif zone == ZONE_DB:
+            # 移除最靠近底部的一张，其下方的卡上移一格
+            for i in range(bot-1, top-1, -1):
+                if deck_buf[i] == card_type:
+                    deck_buf[i:bot-1] = deck_buf[i+1:bot]
+                    self.bot = bot - 1
+                    if i < split:
+                        self.split = split - 1
+                    self.deck_left -= 1
+                    break
+        elif zone == ZONE_RS:
+            if card_type == 'C' and self.rest_c:
+                self.rest_c -= 1
+            elif card_type == 'N' and self.rest_n:
+                self.rest_n -= 1
+        elif card_type == 'C' and self.clock_c:
+            self.clock_c -= 1
+            self.total_damage -= 1
+        elif card_type == 'N' and self.clock_n:
+            self.clock_n -= 1
+            self.total_damage -= 1
+
+class _ProfiledEngine(TrialEngine):
+    """剖析用：不声明 __slots__，实例属性可以覆盖方法，内部调用全部经过计数计时的包装"""
+
+class _CheckpointEngine(TrialEngine):
+    """每个顶层位置结束后把状态计数累加到 checkpoints 中对应位置的字典（见 wssim.checkpoint）"""
+    __slots__ = ('checkpoints',)
+
+    def __init__(self, program, D, R, C, rng, checkpoints):
+        self.checkpoints = checkpoints
+        super().__init__(program, D, R, C, rng)
+
+    def run(self, slots, draw_card):
+        ops, execute, refresh_deck = self.ops, self.execute, self.refresh_deck
+        for slot, saved in zip(slots, self.checkpoints):
+            refresh_deck()
+            self.carry = execute(ops[slot[self.carry]])
+            state = self.snapshot()
+            saved[state] = saved.get(state, 0) + 1
+        self.finish(draw_card)
+
+class _EarlyStopEngine(TrialEngine):
+    """
+    每个顶层位置结束后检查 P(伤害≥threshold) 的结果是否已确定，确定即结束该次试验（跳过剩余伤害和抽牌）：
+    keeps[i] 为第i个位置之后不会减少伤害，reach[i] 为之后至多还能增加的伤害，由 wssim.threshold 计算。
+    """
+    __slots__ = ('threshold', 'keeps', 'reach')
+
+    def __init__(self, program, D, R, C, rng, threshold, keeps, reach):
+        self.threshold, self.keeps, self.reach = threshold, keeps, reach
+        super().__init__(program, D, R, C, rng)
+
+    def run(self, slots, draw_card):
+        ops, execute, refresh_deck = self.ops, self.execute, self.refresh_deck
+        threshold = self.threshold
+        for slot, keeps, reach in zip(slots, self.keeps, self.reach):
+            refresh_deck()
+            self.carry = execute(ops[slot[self.carry]])
+            total_damage = self.total_damage
+            if keeps and total_damage >= threshold or total_damage + reach < threshold:
+                return
+        self.finish(draw_card)
+
+class _SampledEngine(TrialEngine):
+    """
+    重要性抽样：翻开卡组中段的判定交给 sampler.reveal_climax(高潮数, 总数)，
+    每次试验开始时调用 sampler.start_trial()，结束时调用 sampler.record(总伤害)，见 wssim.tail。
+    """
+    __slots__ = ('sampler',)
+
+    def __init__(self, program, D, R, C, rng, sampler):
+        self.sampler = sampler
+        sampler.bind(rng)
+        super().__init__(program, D, R, C, rng)
+
+    def reset(self, state):
+        super().reset(state)
+        self.sampler.start_trial()
+
+    def run(self, slots, draw_card):
+        super().run(slots, draw_card)
+        self.sampler.record(self.total_damage)
+
+    def reveal_climax(self, climax, total):
+        return self.sampler.reveal_climax(climax, total)
+
+class _ReweightedEngine(TrialEngine):
+    """
+    把每次随机判定和各区域高潮卡数可能因构成而不同的时刻通知 reweight（见 wssim.reweight）：
+    卡组更新、DT-/DB- 打乱中段、升级、反洗、移除，以及试验的开始和结束。
+    """
+    __slots__ = ('reweight',)
+
+    def __init__(self, program, D, R, C, rng, reweight):
+        self.reweight = reweight
+        super().__init__(program, D, R, C, rng)
+
+    def reset(self, state):
+        super().reset(state)
+        self.reweight.start_trial()
+
+    def run(self, slots, draw_card):
+        super().run(slots, draw_card)
+        self.reweight.record(self.total_damage, self.refresh_count, self.level_up_count)
+
+    def reveal_climax(self, climax, total):
+        drew = super().reveal_climax(climax, total)
+        self.reweight.drawn(ZONE_DT, climax, total, drew)
+        return drew
+
+    def draw_climax(self, zone, climax, total):
+        drew = super().draw_climax(zone, climax, total)
+        self.reweight.drawn(zone, climax, total, drew)
+        return drew
+
+    def reshuffle(self):
+        super().reshuffle()
+        self.reweight.refreshed()
+
+    def materialize(self):
+        self.reweight.materialized()
+        super().materialize()
+
+    def level_up_climax(self):
+        if self.clock_c + self.clock_n == 7:
+            self.reweight.leveled(self.clock_c)
+        return super().level_up_climax()
+
+    def clock_add_n(self, count):
+        # 先完成升级检查，之后基类再检查一次不会有变化
+        self.check_level_up()
+        if count >= 7 - self.clock_c - self.clock_n:
+            self.reweight.clock_flushed()
+        super().clock_add_n(count)
+
+    def fx(self, count):
+        self.check_level_up()
+        self.reweight.fx_moved(count, self.rest_n, min(count, self.rest_n))
+        super().fx(count)
+
+    def remove(self, zone, card_type):
+        if zone == ZONE_DT or zone == ZONE_DB:
+            if card_type not in self.known_cards(zone):
+                self.reweight.removed(ZONE_DT, card_type,
+                                      self.mid_c if card_type == 'C' else self.mid_n)
+        elif zone == ZONE_RS:
+            self.reweight.removed(zone, card_type, self.rest_c if card_type == 'C' else self.rest_n)
+        else:
+            self.reweight.removed(zone, card_type,
+                                  self.clock_c if card_type == 'C' else self.clock_n)
+        super().remove(zone, card_type)
+
+def simulate(D, N, R, RC, C, CC, damage_seq, draw_card=False, trials=10000, seed=None,
+             progress=None, profile=None):
+    """
+    蒙特卡洛模拟，返回 SimulationResult。
+    progress(已完成次数, 总次数) 每 PROGRESS_INTERVAL 次试验调用一次，可抛出 SimulationCancelled 取消。
+    profile 为 wssim.profile.EngineProfile 时统计各操作的调用次数和耗时（结果与不剖析时相同）。
+    """
+    return simulate_program(compile_damage_sequence(damage_seq), D, N, R, RC, C, CC,
+                            draw_card, trials, seed, progress, profile=profile)
+
+def simulate_program(program, D, N, R, RC, C, CC, draw_card=False, trials=10000, seed=None,
+                     progress=None, trial_seeds=None, damage_out=None, profile=None,
+                     resume=None, checkpoints=None, early_stop=None, sampler=None, reweight=None):
+    """
+    与simulate相同，但直接执行已编译的程序，供需要对同一序列反复模拟的调用方复用编译结果。
+    trial_seeds 给出时按其长度模拟，每次试验开始前用对应种子重置随机数生成器
+    （共同随机数：不同配置使用相同的 trial_seeds 即可逐次配对）；
+    damage_out 给出时把每次试验的总伤害依次追加到该列表。
+    resume=(k, {状态: 试验数}) 时跳过前k个顶层位置，每次试验从保存的状态开始，试验次数为各状态试验数之和
+    （不能与 trial_seeds 同时使用）。状态格式见 wssim.checkpoint。
+
+    以下参数各自选择一种引擎变体，至多给出其中一个，否则抛出 ValueError：
+    profile     wssim.profile.EngineProfile，统计各操作的调用次数和耗时
+    checkpoints 为每个执行的顶层位置提供一个字典，位置结束后的状态计数累加到其中
+    early_stop  (阈值, keeps, reach)，结果确定即结束该次试验，此时直方图中的伤害只保证
+                与阈值的大小关系正确，由 wssim.threshold 构造和使用
+    sampler     翻开卡组未知部分的判定改由它抽样并加权（重要性抽样），接口见 _SampledEngine 和 wssim.tail
+    reweight    把随机判定和卡组更新、升级等事件通知它，用于按其他卡组构成重新加权，见 wssim.reweight
+    """
+    variants = [name for name, value in (('profile', profile), ('checkpoints', checkpoints),
+                                         ('early_stop', early_stop), ('sampler', sampler),
+                                         ('reweight', reweight)) if value is not None]
+    if len(variants) > 1:
+        raise ValueError(f"{'、'.join(variants)} 不能同时使用")
+    if resume is not None and trial_seeds is not None:
+        raise ValueError("resume 与 trial_seeds 不能同时使用")
+    rng = random.Random(seed)
+    if trial_seeds is not None:
+        trials = len(trial_seeds)
+    ops, slots, tail = program
+    start_slot = 0
+    if resume is None:
+        starts = repeat(initial_state(D, N, R, RC, C, CC), trials)
+    else:
+        # 逐个状态模拟其试验数次，不展开成每次试验一项的列表
+        start_slot, states = resume
+        slots = slots[start_slot:]
+        starts = (state for state, count in states.items() for _ in range(count))
+        trials = sum(states.values())
+    # 结果直接累加到直方图，不保存逐次试验的结果
+    damage_hist, refresh_hist, level_up_hist = {}, {}, {}
+
+    if checkpoints is not None:
+        engine = _CheckpointEngine(program, D, R, C, rng, checkpoints)
+    elif early_stop is not None:
+        threshold, keeps, reach = early_stop
+        engine = _EarlyStopEngine(program, D, R, C, rng, threshold, keeps[start_slot:],
+                                  reach[start_slot:])
+    elif reweight is not None:
+        engine = _ReweightedEngine(program, D, R, C, rng, reweight)
+    elif sampler is not None:
+        engine = _SampledEngine(program, D, R, C, rng, sampler)
+    elif profile is None:
+        engine = TrialEngine(program, D, R, C, rng)
+    else:
+        # 只在剖析时用计数计时的包装覆盖实例方法，未剖析时热路径不受影响
+        engine = _ProfiledEngine(program, D, R, C, rng)
+        (engine.execute, engine.refresh_deck, engine.check_level_up, engine.materialize,
+         engine.reveal_top, engine.reveal_bottom) = profile.instrument(
+            ops, lambda: engine.deck_left, engine.execute, engine.refresh_deck,
+            engine.check_level_up, engine.materialize, engine.reveal_top, engine.reveal_bottom)
+    reset, run = engine.reset, engine.run
+
+    for trial, state in enumerate(starts, 1):
+        if trial_seeds is not None:
+            rng.seed(trial_seeds[trial - 1])
+        reset(state)
+        run(slots, draw_card)
+
+        total_damage = engine.total_damage
+        refresh_count = engine.refresh_count
+        level_up_count = engine.level_up_count
+        damage_hist[total_damage] = damage_hist.get(total_damage, 0) + 1
+        refresh_hist[refresh_count] = refresh_hist.get(refresh_count, 0) + 1
+        level_up_hist[level_up_count] = level_up_hist.get(level_up_count, 0) + 1
+        if damage_out is not None:
+            damage_out.append(total_damage)
+        if progress is not None and not trial % PROGRESS_INTERVAL:
+            progress(trial, trials)
+
+    result = SimulationResult(damage_hist, refresh_hist, level_up_hist)
+    if profile is not None:
+        profile.record(result)
+    return result
@@ -0,0 +1,291 @@
+"""精确求解伤害分布（对所有随机结果做前向动态规划）"""
+
+from collections import namedtuple
+
+from .program import (OP_DAMAGE, OP_FX, OP_MOVE, OP_ADD, OP_REMOVE, ZONE_DT, ZONE_DB, ZONE_RS,
+                      ZONE_CL, EFFECT_ZJ, EFFECT_SZJ, compile_damage_sequence)
+
+# 精确求解的状态：卡组为“已知顶部 + 随机中段计数 + 已知底部”，休息室和计时区只记数量
+_ExactState = namedtuple('_ExactState', ['top', 'mid_c', 'mid_n', 'bottom', 'rest_c', 'rest_n',
+                                         'clock_c', 'clock_n', 'damage', 'refreshes', 'level_ups'])
+
+def _exact_deck_size(s):
+    return len(s.top) + s.mid_c + s.mid_n + len(s.bottom)
+
+def _exact_reveal(s, from_bottom=False):
+    """从卡组顶部（或底部）取一张卡，返回 [(概率, 新状态, 卡)]"""
+    if from_bottom and s.bottom:
+        return [(1.0, s._replace(bottom=s.bottom[:-1]), s.bottom[-1])]
+    if not from_bottom and s.top:
+        return [(1.0, s._replace(top=s.top[1:]), s.top[0])]
+    remaining = s.mid_c + s.mid_n
+    if remaining:
+        outcomes = []
+        if s.mid_c:
+            outcomes.append((s.mid_c / remaining, s._replace(mid_c=s.mid_c - 1), 'C'))
+        if s.mid_n:
+            outcomes.append((s.mid_n / remaining, s._replace(mid_n=s.mid_n - 1), 'N'))
+        return outcomes
+    if from_bottom:
+        return [(1.0, s._replace(top=s.top[:-1]), s.top[-1])]
+    return [(1.0, s._replace(bottom=s.bottom[1:]), s.bottom[0])]
+
+def _exact_clock_add(s, card):
+    """计时区加入一张卡并检查升级；逐张检查与整批加入后再检查结果相同"""
+    clock_c = s.clock_c + (card == 'C')
+    clock_n = s.clock_n + (card == 'N')
+    if clock_c + clock_n < 7:
+        return s._replace(clock_c=clock_c, clock_n=clock_n)
+    # 有普通卡则以普通卡升级，否则以高潮卡升级，其余6张进休息室
+    if clock_n:
+        return s._replace(clock_c=0, clock_n=0, rest_c=s.rest_c + clock_c,
+                          rest_n=s.rest_n + clock_n - 1, level_ups=s.level_ups + 1)
+    return s._replace(clock_c=0, clock_n=0, rest_c=s.rest_c + 6, level_ups=s.level_ups + 1)
+
+def _exact_refresh(s):
+    """卡组为空时执行卡组更新，返回 [(概率, 新状态, 卡组是否可用)]"""
+    if _exact_deck_size(s):
+        return [(1.0, s, True)]
+    if not (s.rest_c or s.rest_n):
+        return [(1.0, s, False)]
+    s = s._replace(top=(), mid_c=s.rest_c, mid_n=s.rest_n, bottom=(), rest_c=0, rest_n=0,
+                   refreshes=s.refreshes + 1)
+    return [(p, _exact_clock_add(s1._replace(damage=s1.damage + 1), card), True)
+            for p, s1, card in _exact_reveal(s)]
+
+def _exact_remove(s, card, from_bottom=False):
+    """移除最靠近顶部（或底部）的一张指定卡，返回 [(概率, 新状态)]"""
+    other = 'N' if card == 'C' else 'C'
+    near, far = (s.bottom, s.top) if from_bottom else (s.top, s.bottom)
+    mid_card = s.mid_c if card == 'C' else s.mid_n
+    mid_other = s.mid_n if card == 'C' else s.mid_c
+    
+    def without(cards, last):
+        index = len(cards) - 1 - cards[::-1].index(card) if last else cards.index(card)
+        return cards[:index] + cards[index+1:]
+    
+    if card in near:
+        near = without(near, from_bottom)
+    elif mid_card:
+        # 中段中第一张目标卡之前有j张另一种卡，这些卡随之变为已知
+        outcomes = []
+        p_before = 1.0
+        for j in range(mid_other + 1):
+            remaining = mid_card + mid_other - j
+            p = p_before * mid_card / remaining
+            known = (other,) * j
+            counts = {'mid_c': s.mid_c - (card == 'C') - j * (other == 'C'),
+                      'mid_n': s.mid_n - (card == 'N') - j * (other == 'N')}
+            if from_bottom:
+                outcomes.append((p, s._replace(bottom=known + s.bottom, **counts)))
+            else:
+                outcomes.append((p, s._replace(top=s.top + known, **counts)))
+            p_before *= (mid_other - j) / remaining
+        return outcomes
+    elif card in far:
+        far = without(far, from_bottom)
+    else:
+        return [(1.0, s)]
+    
+    if from_bottom:
+        return [(1.0, s._replace(bottom=near, top=far))]
+    return [(1.0, s._replace(top=near, bottom=far))]
+
+def _merge_into(dist, key, p):
+    dist[key] = dist.get(key, 0.0) + p
+
+def solve_exact(D, N, R, RC, C, CC, damage_seq, draw_card=False):
+    """
+    精确计算伤害分布（非蒙特卡洛），适用于不含休息室/计时区随机抽取的序列。
+    返回 (伤害概率, 卡组更新次数概率, 升级次数概率)，第k项为恰好等于k的概率，
+    总伤害为负（移除计时区原有卡片）时计入第0项。
+    """
+    program = compile_damage_sequence(damage_seq)
+    ops, slots, tail = program
+    for op in ops:
+        if op.code == OP_MOVE and op.src in (ZONE_RS, ZONE_CL):
+            raise ValueError("精确计算不支持从休息室或计时区随机移动卡片的操作")
+    if C >= 7:
+        raise ValueError("精确计算要求计时区初始卡数小于7")
+    
+    memo = {}
+    
+    def run_block(start, end, s):
+        dist = {s: 1.0}
+        for index in range(start, end):
+            next_dist = {}
+            for s1, p in dist.items():
+                for q, s2, _ in run(index, s1):
+                    _merge_into(next_dist, s2, p * q)
+            dist = next_dist
+        return [(p, s1, 0) for s1, p in dist.items()]
+    
+    def run(index, s):
+        """执行一条操作，返回 [(概率, 新状态, 传火追加编号)]，按(操作, 状态)记忆化"""
+        key = (index, s)
+        if key not in memo:
+            memo[key] = execute(ops[index], s)
+        return memo[key]
+    
+    def finish(s):
+        # 伤害处理结束后检查升级（已逐张处理）并检查卡组更新
+        return [(p, s1, 0) for p, s1, _ in _exact_refresh(s)]
+    
+    def execute(op, s):
+        code, src, dst, count, card_type, effect, start, end, next_carry = op
+        
+        if code == OP_DAMAGE:
+            if count <= 0:
+                return [(1.0, s, 0)]
+            
+            # 枚举翻卡结果：(状态, 已翻普通卡数) -> 概率
+            frontier = {(s, 0): 1.0}
+            settled = {}
+            for _ in range(count):
+                next_frontier = {}
+                for (s1, zone_n), p in frontier.items():
+                    for q1, s2, ok in _exact_refresh(s1):
+                        if not ok:
+                            _merge_into(settled, (s2, zone_n, False), p * q1)
+                            continue
+                        for q2, s3, card in _exact_reveal(s2):
+                            # 在每次取牌后检查牌组是否为空
+                            for q3, s4, _ in _exact_refresh(s3):
+                                if card == 'C':
+                                    _merge_into(settled, (s4, zone_n, True), p * q1 * q2 * q3)
+                                else:
+                                    _merge_into(next_frontier, (s4, zone_n + 1), p * q1 * q2 * q3)
+                frontier = next_frontier
+            for (s1, zone_n), p in frontier.items():
+                _merge_into(settled, (s1, zone_n, False), p)
+            
+            outcomes = []
+            for (s1, zone_n, cancelled), p in settled.items():
+                if cancelled:
+                    s1 = s1._replace(rest_c=s1.rest_c + 1, rest_n=s1.rest_n + zone_n)
+                    if effect == EFFECT_SZJ:
+                        outcomes.extend((p * q, s2, next_carry) for q, s2, _ in run_block(start, end, s1))
+                        continue
+                    branches = run_block(start, end, s1) if effect == EFFECT_ZJ else [(1.0, s1, 0)]
+                else:
+                    for _ in range(zone_n):
+                        s1 = _exact_clock_add(s1, 'N')
+                    branches = [(1.0, s1._replace(damage=s1.damage + zone_n), 0)]
+                for q, s2, _ in branches:
+                    outcomes.extend((p * q * r, s3, 0) for r, s3, _ in finish(s2))
+            return outcomes
+        
+        outcomes = []
+        for p, s1, ok in _exact_refresh(s):
+            if not ok:
+                outcomes.append((p, s1, 0))
+                continue
+            
+            if code == OP_FX:
+                moved = min(count, s1.rest_n)
+                # 洗回的普通卡与整个卡组重新洗牌，已知部分并入随机中段
+                deck_c = s1.mid_c + s1.top.count('C') + s1.bottom.count('C')
+                deck_n = s1.mid_n + s1.top.count('N') + s1.bottom.count('N') + moved
+                outcomes.append((p, s1._replace(top=(), mid_c=deck_c, mid_n=deck_n, bottom=(),
+                                                rest_n=s1.rest_n - moved), 0))
+            
+            elif code == OP_MOVE:
+                # 先枚举取出的卡，再依次放入目标区域
+                picks = [(1.0, s1, ())]
+                for _ in range(count):
+                    next_picks = []
+                    for q, s2, moved in picks:
+                        if not _exact_deck_size(s2):
+                            next_picks.append((q, s2, moved))
+                            continue
+                        for q2, s3, card in _exact_reveal(s2, from_bottom=(src == ZONE_DB)):
+                            # 检查牌组是否为空
+                            for q3, s4, _ in _exact_refresh(s3):
+                                next_picks.append((q * q2 * q3, s4, moved + (card,)))
+                    picks = next_picks
+                
+                for q, s2, moved in picks:
+                    for card in moved:
+                        if dst == ZONE_DT:
+                            s2 = s2._replace(top=(card,) + s2.top)
+                        elif dst == ZONE_DB:
+                            s2 = s2._replace(bottom=s2.bottom + (card,))
+                        elif dst == ZONE_RS:
+                            s2 = s2._replace(rest_c=s2.rest_c + (card == 'C'),
+                                             rest_n=s2.rest_n + (card == 'N'))
+                        else:
+                            s2 = _exact_clock_add(s2._replace(damage=s2.damage + 1), card)
+                    if card_type in moved:
+                        outcomes.extend((p * q * r, s3, 0) for r, s3, _ in run_block(start, end, s2))
+                    else:
+                        outcomes.append((p * q, s2, 0))
+            
+            elif code == OP_ADD:
+                if src == ZONE_DT:
+                    s1 = s1._replace(top=(card_type,) + s1.top)
+                elif src == ZONE_DB:
+                    s1 = s1._replace(bottom=s1.bottom + (card_type,))
+                elif src == ZONE_RS:
+                    s1 = s1._replace(rest_c=s1.rest_c + (card_type == 'C'),
+                                     rest_n=s1.rest_n + (card_type == 'N'))
+                else:
+                    s1 = _exact_clock_add(s1._replace(damage=s1.damage + 1), card_type)
+                outcomes.append((p, s1, 0))
+            
+            elif code == OP_REMOVE:
+                if src == ZONE_DT or src == ZONE_DB:
+                    outcomes.extend((p * q, s2, 0)
+                                    for q, s2 in _exact_remove(s1, card_type, from_bottom=(src == ZONE_DB)))
+                    continue
+                if src == ZONE_RS:
+                    if card_type == 'C' and s1.rest_c:
+                        s1 = s1._replace(rest_c=s1.rest_c - 1)
+                    elif card_type == 'N' and s1.rest_n:
+                        s1 = s1._replace(rest_n=s1.rest_n - 1)
+                elif card_type == 'C' and s1.clock_c:
+                    s1 = s1._replace(clock_c=s1.clock_c - 1, damage=s1.damage - 1)
+                elif card_type == 'N' and s1.clock_n:
+                    s1 = s1._replace(clock_n=s1.clock_n - 1, damage=s1.damage - 1)
+                outcomes.append((p, s1, 0))
+        return outcomes
+    
+    initial = _ExactState((), N, D - N, (), RC, R - RC, CC, C - CC, 0, 0, 0)
+    dist = {(initial, 0): 1.0}
+    for slot in slots:
+        next_dist = {}
+        for (s, carry), p in dist.items():
+            for q, s1, _ in _exact_refresh(s):
+                for r, s2, next_carry in run(slot[carry], s1):
+                    _merge_into(next_dist, (s2, next_carry), p * q * r)
+        dist = next_dist
+    
+    # 处理最后可能剩余的特殊zj效果，然后检查卡组更新
+    final = {}
+    for (s, carry), p in dist.items():
+        branches = run(tail[carry], s) if carry else [(1.0, s, 0)]
+        for q, s1, _ in branches:
+            for r, s2, _ in _exact_refresh(s1):
+                _merge_into(final, s2, p * q * r)
+    
+    # 处理抽牌
+    if draw_card:
+        drawn = {}
+        for s, p in final.items():
+            for q, s1, _ in _exact_refresh(s):
+                if not _exact_deck_size(s1):
+                    _merge_into(drawn, s1, p * q)
+                    continue
+                for r, s2, card in _exact_reveal(s1):
+                    s3 = _exact_clock_add(s2._replace(damage=s2.damage + 1), card)
+                    for t, s4, _ in _exact_refresh(s3):
+                        _merge_into(drawn, s4, p * q * r * t)
+        final = drawn
+    
+    damage_probs = [0.0] * (max(max(s.damage for s in final) + 1, 1))
+    refresh_probs = [0.0] * (max(s.refreshes for s in final) + 1)
+    level_up_probs = [0.0] * (max(s.level_ups for s in final) + 1)
+    for s, p in final.items():
+        damage_probs[max(s.damage, 0)] += p
+        refresh_probs[s.refreshes] += p
+        level_up_probs[s.level_ups] += p
+    return damage_probs, refresh_probs, level_up_probs
@@ -0,0 +1,104 @@
+"""伤害顺序优化：在一组伤害的各种排列中寻找 P(伤害≥k) 最大的顺序"""
+
+import itertools
+import math
+import os
+import random
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .engine import simulate_program
+from .parser import format_damage_seq
+from .program import compile_damage_sequence
+from .result import SimulationResult
+
+# 排名结果：damage_seq 为该顺序的伤害序列，probability/interval 为 P(伤害≥k) 及其置信区间
+RankedOrder = namedtuple('RankedOrder', ['damage_seq', 'result', 'probability', 'interval'])
+
+def orderings(items, max_orders=720, seed=None):
+    """
+    列出 items 的不同排列（相同的伤害项只算一种）。
+    排列总数不超过 max_orders 时全部列出，否则随机抽取 max_orders 种。
+    """
+    keys = [format_damage_seq([item]) for item in items]
+    by_key = dict(zip(keys, items))
+    counts = Counter(keys)
+    total = math.factorial(len(keys))
+    for count in counts.values():
+        total //= math.factorial(count)
+
+    if total <= max_orders:
+        orders = set(itertools.permutations(keys))
+    else:
+        rng = random.Random(seed)
+        orders = set()
+        while len(orders) < max_orders:
+            order = keys[:]
+            rng.shuffle(order)
+            orders.add(tuple(order))
+    return [[by_key[key] for key in order] for order in sorted(orders)]
+
+def _evaluate(args):
+    """进程池中模拟一个顺序的一批试验"""
+    program, state, draw_card, trials, seed = args
+    return simulate_program(program, *state, draw_card, trials, seed)
+
+def optimize_order(items, threshold, D, N, R, RC, C, CC, draw_card=False, max_orders=720,
+                   initial_trials=400, max_rounds=8, confidence=0.95, workers=None, seed=None,
+                   progress=None):
+    """
+    用逐次减半（successive halving）加置信区间淘汰，比较 items 的各种排列下 P(伤害≥threshold)。
+    每轮为仍在竞争的顺序各追加一批试验（批量逐轮翻倍），然后：
+      1. 淘汰置信区间上限低于当前最佳顺序下限的顺序；
+      2. 剩余顺序按估计值只保留前一半。
+    明显较差的顺序只得到几百次试验，预算集中在领先者之间；剩一个顺序或达到 max_rounds 时停止。
+    返回 RankedOrder 列表：先按坚持的轮次、再按估计概率降序，包括被淘汰的顺序（其区间较宽）。
+    workers 为进程数（None为全部CPU，1为不使用进程池）。
+    progress(已完成试验数, 预计总试验数) 每模拟完一个顺序的一批调用一次，可抛出 SimulationCancelled 取消。
+    """
+    master = random.Random(seed)
+    candidates = orderings(items, max_orders, master.getrandbits(64))
+    programs = [compile_damage_sequence(order) for order in candidates]
+    results = [SimulationResult() for _ in candidates]
+    state = (D, N, R, RC, C, CC)
+    rounds = min(max_rounds, max(1, math.ceil(math.log2(len(candidates))) + 1))
+    planned = len(candidates) * initial_trials * rounds
+    done = 0
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(candidates)))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        alive = list(range(len(candidates)))
+        batch = initial_trials
+        for round_index in range(max_rounds):
+            tasks = [(programs[i], state, draw_card, batch, master.getrandbits(64)) for i in alive]
+            outcomes = executor.map(_evaluate, tasks) if executor else map(_evaluate, tasks)
+            for i, outcome in zip(alive, outcomes):
+                results[i].merge(outcome)
+                done += batch
+                if progress is not None:
+                    progress(done, max(planned, done))
+
+            if len(alive) == 1 or round_index == max_rounds - 1:
+                break
+            intervals = {i: results[i].survival_interval(threshold, confidence) for i in alive}
+            best_lower = max(low for low, _ in intervals.values())
+            alive = [i for i in alive if intervals[i][1] >= best_lower]
+            alive.sort(key=lambda i: -results[i].survival(threshold)[threshold])
+            alive = alive[:math.ceil(len(alive) / 2)]
+            batch *= 2
+    except BaseException:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = None
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    ranked = [RankedOrder(order, result, result.survival(threshold)[threshold],
+                          result.survival_interval(threshold, confidence))
+              for order, result in zip(candidates, results)]
+    # 坚持到越后轮次的顺序试验次数越多，先按轮次排名，同一轮内再按估计值
+    ranked.sort(key=lambda entry: (-entry.result.trials, -entry.probability))
+    return ranked
@@ -0,0 +1,41 @@
+"""将试验分片到多个进程并行模拟"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .engine import simulate
+from .result import SimulationResult
+
+def _simulate_shard(args):
+    """进程池中执行的一个分片，结果只含直方图，进程间传输量很小"""
+    D, N, R, RC, C, CC, damage_seq, draw_card, trials, seed = args
+    return simulate(D, N, R, RC, C, CC, damage_seq, draw_card, trials, seed)
+
+def shard_seeds(seed, workers):
+    """由一个种子派生每个分片互相独立的种子，相同 (seed, workers) 结果可复现"""
+    children = np.random.SeedSequence(seed).spawn(workers)
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
+
+def simulate_parallel(D, N, R, RC, C, CC, damage_seq, draw_card=False, trials=10000,
+                      workers=None, seed=None):
+    """
+    将试验分片到多个进程并行模拟。
+    返回合并所有分片直方图后的 SimulationResult。
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, trials))
+    sizes = [trials // workers + (1 if i < trials % workers else 0) for i in range(workers)]
+    shards = [(D, N, R, RC, C, CC, damage_seq, draw_card, size, shard_seed)
+              for size, shard_seed in zip(sizes, shard_seeds(seed, workers))]
+    
+    result = SimulationResult()
+    if workers == 1:
+        shard_results = map(_simulate_shard, shards)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shard_results = list(executor.map(_simulate_shard, shards))
+    for shard_result in shard_results:
+        result.merge(shard_result)
+    
+    return result
@@ -0,0 +1,165 @@
+"""伤害序列字符串的解析与格式化"""
+
+class DamageSequenceError(ValueError):
+    """伤害序列格式错误"""
+
+def parse_damage_sequence(dmg_str):
+    """解析伤害序列字符串，格式错误时抛出 DamageSequenceError"""
+    if not dmg_str:
+        return []
+    
+    result = []
+    i = 0
+    while i < len(dmg_str):
+        # 处理特殊的*前缀
+        is_special_zj = False
+        if i < len(dmg_str) and dmg_str[i] == "*":
+            is_special_zj = True
+            i += 1
+            
+        # 处理数字开头的伤害
+        if i < len(dmg_str) and dmg_str[i].isdigit():
+            j = i
+            while j < len(dmg_str) and dmg_str[j].isdigit():
+                j += 1
+                
+            num = int(dmg_str[i:j])
+            
+            # 检查是否是追加伤害效果
+            if j+2 < len(dmg_str) and dmg_str[j:j+2] == "zj" and dmg_str[j+2] == "(":
+                effect_type = dmg_str[j:j+2]  # zj
+                # 找到匹配的右括号
+                bracket_count = 1
+                k = j + 3
+                while k < len(dmg_str) and bracket_count > 0:
+                    if dmg_str[k] == "(":
+                        bracket_count += 1
+                    elif dmg_str[k] == ")":
+                        bracket_count -= 1
+                    k += 1
+                
+                if bracket_count == 0:
+                    # 递归解析括号内的内容
+                    inner_seq = parse_damage_sequence(dmg_str[j+3:k-1])
+                    if is_special_zj and effect_type == "zj":
+                        # 特殊的zj，添加标记
+                        result.append((num, "szj", inner_seq))
+                    else:
+                        result.append((num, effect_type, inner_seq))
+                    i = k
+                else:
+                    raise DamageSequenceError(f"括号不匹配: {dmg_str}")
+            else:
+                result.append(num)
+                i = j
+        
+        # 处理fx反洗
+        elif dmg_str[i:i+2] == "fx" and i+2 < len(dmg_str) and dmg_str[i+2].isdigit():
+            j = i + 2
+            while j < len(dmg_str) and dmg_str[j].isdigit():
+                j += 1
+            
+            result.append(f"fx{dmg_str[i+2:j]}")
+            i = j
+        
+        # 处理卡片移动操作 (如 DT>RS, DT>CL, RS>DT)
+        elif i+4 < len(dmg_str) and dmg_str[i:i+2] in ["DT", "DB", "RS", "CL"] and dmg_str[i+2] == ">" and dmg_str[i+3:i+5] in ["DT", "DB", "RS", "CL"]:
+            from_loc = dmg_str[i:i+2]
+            to_loc = dmg_str[i+3:i+5]
+            
+            # 检查是否是带数量的移动操作 (如 DT>RS4)
+            if i+5 < len(dmg_str) and dmg_str[i+5].isdigit():
+                j = i + 5
+                while j < len(dmg_str) and dmg_str[j].isdigit():
+                 j += 1
+                count = int(dmg_str[i+5:j])
+                
+                # 检查是否有条件判断部分 (如 DT>RS4:C+zj(2))
+                if j < len(dmg_str) and dmg_str[j] == ":":
+                    # 找到条件类型 (C或N)
+                    if j+1 < len(dmg_str) and dmg_str[j+1] in ["C", "N"]:
+                        condition = dmg_str[j+1]
+                        j += 2
+                        
+                        # 查找追加伤害部分
+                        if j+3 < len(dmg_str) and dmg_str[j:j+3] == "+zj":
+                            # 找到匹配的右括号
+                            bracket_count = 1
+                            k = j + 4
+                            while k < len(dmg_str) and bracket_count > 0:
+                                if dmg_str[k] == "(":
+                                    bracket_count += 1
+                                elif dmg_str[k] == ")":
+                                    bracket_count -= 1
+                                k += 1
+                            
+                            if bracket_count == 0:
+                                # 递归解析括号内的内容
+                                zj_seq = parse_damage_sequence(dmg_str[j+4:k-1])
+                                result.append((f"{from_loc}>{to_loc}{count}:{condition}", "zj", zj_seq))
+                                i = k
+                            else:
+                                raise DamageSequenceError(f"追加伤害括号不匹配: {dmg_str[i:]}")
+                        else:
+                            raise DamageSequenceError(f"条件判断格式错误: {dmg_str[i:]}")
+                    else:
+                        raise DamageSequenceError(f"条件类型错误: {dmg_str[i:]}")
+                else:
+                    # 只有数量没有条件判断
+                    result.append(f"{from_loc}>{to_loc}{count}")
+                    i = j
+            else:
+                # 简单移动操作
+                result.append(f"{from_loc}>{to_loc}")
+                i += 5
+        
+        # 处理卡组操作
+        elif i+2 < len(dmg_str) and (
+                dmg_str[i:i+2] == "DT" or   # 卡组顶部
+                dmg_str[i:i+2] == "DB" or   # 卡组底部
+                dmg_str[i:i+2] == "RS" or   # 休息室
+                dmg_str[i:i+2] == "CL"      # 计时区
+            ):
+            location = dmg_str[i:i+2]
+            if i+3 < len(dmg_str) and dmg_str[i+2] in ['+', '-'] and dmg_str[i+3] in ['N', 'C']:
+                operation = dmg_str[i+2]
+                card_type = dmg_str[i+3]
+                result.append(f"{location}{operation}{card_type}")
+                i += 4
+            else:
+                raise DamageSequenceError(f"卡组操作格式错误: {dmg_str[i:]}")
+        
+        # 跳过分隔符和空格
+        elif dmg_str[i] == "," or dmg_str[i] == " ":
+            i += 1
+        
+        # 未知字符
+        else:
+            raise DamageSequenceError(f"未知字符: {dmg_str[i]}")
+    
+    return result
+
+def format_damage_seq(seq):
+    """格式化伤害序列为可读字符串"""
+    result = []
+    for item in seq:
+        if isinstance(item, tuple):
+            if isinstance(item[0], str) and ":" in item[0]:
+                # 条件判断操作 (如 DT>RS4:C+zj(2))
+                move_op, effect_type, zj_seq = item
+                sub_formatted = format_damage_seq(zj_seq)
+                result.append(f"{move_op}+{effect_type}({sub_formatted})")
+            else:
+                # 普通追加伤害或特殊zj
+                dmg, effect_type, sub_seq = item
+                sub_formatted = format_damage_seq(sub_seq)
+                if effect_type == "szj":
+                    # 特殊的zj，添加*前缀
+                    result.append(f"*{dmg}zj({sub_formatted})")
+                else:
+                    result.append(f"{dmg}{effect_type}({sub_formatted})")
+        elif isinstance(item, str):
+            result.append(item)
+        else:
+            result.append(str(item))
+    return ','.join(result)
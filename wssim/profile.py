@@ -0,0 +1,152 @@
+"""可选的引擎性能剖析：按操作位置和类型统计调用次数与耗时"""
+
+from collections import Counter
+from time import perf_counter
+
+from .program import (OP_DAMAGE, OP_FX, OP_MOVE, OP_ADD, OP_REMOVE, ZONES, EFFECT_ZJ,
+                      EFFECT_SZJ)
+
+OP_NAMES = {OP_DAMAGE: "伤害", OP_FX: "反洗", OP_MOVE: "移动", OP_ADD: "添加", OP_REMOVE: "移除"}
+ZONE_NAMES = {zone: name for name, zone in ZONES.items()}
+# 单独计时的引擎内部函数
+HELPERS = ('refresh_deck', 'check_level_up', 'materialize')
+
+def describe_op(op):
+    """编译后操作的简短文字描述，如 "3zj"、"fx2"、"DT>RS4:C"、"CL-C" """
+    if op.code == OP_DAMAGE:
+        return {EFFECT_ZJ: f"{op.count}zj", EFFECT_SZJ: f"*{op.count}zj"}.get(op.effect, str(op.count))
+    if op.code == OP_FX:
+        return f"fx{op.count}"
+    if op.code == OP_MOVE:
+        text = f"{ZONE_NAMES[op.src]}>{ZONE_NAMES[op.dst]}{op.count}"
+        return f"{text}:{op.card}" if op.card else text
+    return f"{ZONE_NAMES[op.src]}{'+' if op.code == OP_ADD else '-'}{op.card}"
+
+class EngineProfile:
+    """
+    传给 simulate(profile=...) 后，引擎把 TrialEngine 的内部方法替换为计数计时的包装，
+    未传入时引擎不执行任何剖析代码。可在多次模拟间累加。
+    calls/total/own 以操作下标（int）或内部函数名（str）为键：
+        calls  调用次数
+        total  含嵌套调用的总耗时（zj分支计入触发它的伤害）
+        own    扣除嵌套操作和内部函数后的自身耗时
+    reveals 为从卡组翻开的总张数；refreshes、level_ups 由模拟结果累加。
+    计时本身有开销，耗时只用于比较各部分的相对占比。
+    """
+    def __init__(self):
+        self.ops = None
+        self._index = None
+        self.calls = Counter()
+        self.total = Counter()
+        self.own = Counter()
+        self.reveals = 0
+        self.trials = 0
+        self.refreshes = 0
+        self.level_ups = 0
+        # 正在执行的调用栈，每层为 [子调用耗时, 子调用引起的卡组张数变化]
+        self._stack = []
+
+    def instrument(self, ops, deck_left, execute, refresh_deck, check_level_up, materialize,
+                   reveal_top, reveal_bottom):
+        """
+        返回包装后的 (execute, refresh_deck, check_level_up, materialize, reveal_top, reveal_bottom)。
+        deck_left() 返回当前卡组剩余张数：伤害内联翻开的张数由卡组的净减少量
+        扣除刷新和嵌套操作的影响得到，引擎的翻卡热路径不需要任何改动。
+        """
+        if self.ops is not ops:
+            self.ops = ops
+            self._index = {id(op): index for index, op in enumerate(ops)}
+        index_of = self._index
+        stack = self._stack
+        calls, total, own = self.calls, self.total, self.own
+
+        def timed(key, fn, *args):
+            stack.append([0.0, 0])
+            before = deck_left()
+            start = perf_counter()
+            value = fn(*args)
+            elapsed = perf_counter() - start
+            drawn = before - deck_left()
+            child_time, child_drawn = stack.pop()
+            calls[key] += 1
+            total[key] += elapsed
+            own[key] += elapsed - child_time
+            if stack:
+                stack[-1][0] += elapsed
+                stack[-1][1] += drawn
+            return value, drawn - child_drawn
+
+        def execute_wrapper(op):
+            carry, own_drawn = timed(index_of[id(op)], execute, op)
+            if op.code == OP_DAMAGE:
+                self.reveals += own_drawn
+            return carry
+
+        def helper_wrapper(name, fn):
+            def wrapper(*args):
+                return timed(name, fn, *args)[0]
+            return wrapper
+
+        def reveal_wrapper(fn):
+            def wrapper():
+                self.reveals += 1
+                return fn()
+            return wrapper
+
+        return (execute_wrapper, helper_wrapper('refresh_deck', refresh_deck),
+                helper_wrapper('check_level_up', check_level_up),
+                helper_wrapper('materialize', materialize),
+                reveal_wrapper(reveal_top), reveal_wrapper(reveal_bottom))
+
+    def record(self, result):
+        """累加一次模拟的试验数、卡组更新次数和升级次数"""
+        self.trials += result.trials
+        self.refreshes += sum(k * v for k, v in result.refresh_hist.items())
+        self.level_ups += sum(k * v for k, v in result.level_up_hist.items())
+
+    def by_position(self):
+        """各操作位置 [(下标, 描述, 调用次数, 总耗时, 自身耗时)]，按自身耗时降序"""
+        rows = [(key, describe_op(self.ops[key]), self.calls[key], self.total[key], self.own[key])
+                for key in self.calls if isinstance(key, int)]
+        return sorted(rows, key=lambda row: -row[4])
+
+    def by_type(self):
+        """按操作类型和内部函数汇总 {名称: (调用次数, 自身耗时)}"""
+        summary = {}
+        for key in self.calls:
+            name = OP_NAMES[self.ops[key].code] if isinstance(key, int) else key
+            count, seconds = summary.get(name, (0, 0.0))
+            summary[name] = (count + self.calls[key], seconds + self.own[key])
+        return summary
+
+    def to_dict(self):
+        return {
+            "trials": self.trials,
+            "reveals": self.reveals,
+            "refreshes": self.refreshes,
+            "level_ups": self.level_ups,
+            "by_type": {name: {"calls": count, "seconds": seconds}
+                        for name, (count, seconds) in self.by_type().items()},
+            "by_position": [{"index": index, "op": text, "calls": count, "total_seconds": spent,
+                             "own_seconds": own}
+                            for index, text, count, spent, own in self.by_position()],
+        }
+
+    def format_report(self):
+        """GUI和命令行共用的文本报告"""
+        trials = max(self.trials, 1)
+        lines = [
+            f"试验次数: {self.trials}",
+            f"平均每次: 翻卡 {self.reveals / trials:.2f} 张，卡组更新 {self.refreshes / trials:.3f} 次，"
+            f"升级 {self.level_ups / trials:.3f} 次",
+            "",
+            "按类型（自身耗时）:",
+        ]
+        by_type = self.by_type()
+        spent = sum(seconds for _, seconds in by_type.values()) or 1.0
+        for name, (count, seconds) in sorted(by_type.items(), key=lambda item: -item[1][1]):
+            lines.append(f"  {name:<16}{count:>10} 次 {seconds * 1000:>10.1f} ms {seconds / spent:>7.1%}")
+        lines += ["", "按位置（下标 操作: 调用次数 总耗时 / 自身耗时）:"]
+        for index, text, count, total, own in self.by_position():
+            lines.append(f"  #{index:<4}{text:<14}{count:>10} 次 {total * 1000:>10.1f} / {own * 1000:.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,144 @@
+"""将伤害序列编译为扁平的操作列表，供各模拟引擎执行"""
+
+from collections import namedtuple
+
+from .parser import format_damage_seq
+
+# 编译后的操作码
+OP_DAMAGE = 0   # 伤害（含zj/*zj分支）
+OP_FX = 1       # 反洗
+OP_MOVE = 2     # 卡片移动（可带条件判断）
+OP_ADD = 3      # 区域添加一张卡，如DT+N
+OP_REMOVE = 4   # 区域移除一张卡，如CL-C
+
+ZONE_DT, ZONE_DB, ZONE_RS, ZONE_CL = range(4)
+ZONES = {"DT": ZONE_DT, "DB": ZONE_DB, "RS": ZONE_RS, "CL": ZONE_CL}
+
+EFFECT_NONE, EFFECT_ZJ, EFFECT_SZJ = range(3)
+
+# 编译后的单条操作：
+#   code   操作码
+#   src    源区域（移动）或目标区域（添加/移除）
+#   dst    目标区域（移动）
+#   count  伤害点数/反洗张数/移动张数
+#   card   条件卡类型或添加/移除的卡类型（'C'/'N'），无条件移动为None
+#   effect 伤害的追加类型（EFFECT_*）
+#   start, end  追加分支在ops中的区间 [start, end)
+#   carry  传火追加(*zj)被取消时传递给下一个伤害的编号，0表示无
+Op = namedtuple('Op', ['code', 'src', 'dst', 'count', 'card', 'effect', 'start', 'end', 'carry'])
+
+# 编译后的程序：
+#   ops    扁平的操作列表，追加分支以区间形式引用
+#   slots  顶层每个位置的入口表 {传火编号: 操作下标}
+#   tail   序列结束后仍有传火效果时执行的操作 {传火编号: 操作下标}
+DamageProgram = namedtuple('DamageProgram', ['ops', 'slots', 'tail'])
+
+
+def _apply_carry(item, carry_item):
+    """将上一个传火追加效果应用到当前顶层伤害上"""
+    _, orig_zj_seq = carry_item
+    if isinstance(item, int):
+        return (item, "szj", orig_zj_seq)
+    if isinstance(item, tuple) and len(item) == 3:
+        current_dmg, current_effect, current_seq = item
+        if current_effect == "szj":
+            return (current_dmg, "szj", current_seq + orig_zj_seq)
+        return (current_dmg, "szj", orig_zj_seq)
+    # fx、卡组操作等不接收传火效果，效果随之消失
+    return item
+
+
+def compile_damage_sequence(damage_seq):
+    """将parse_damage_sequence的结果编译为扁平的操作程序，每次模拟只需编译一次"""
+    ops = []
+    carry_ids = {}
+    carry_items = [None]
+
+    def carry_id(dmg, zj_seq):
+        key = (dmg, format_damage_seq(zj_seq))
+        if key not in carry_ids:
+            carry_ids[key] = len(carry_items)
+            carry_items.append((dmg, zj_seq))
+        return carry_ids[key]
+
+    def emit_block(seq):
+        # 先编译子分支，再连续写入本层操作，保证区间连续
+        records = [make_op(item) for item in seq]
+        start = len(ops)
+        ops.extend(records)
+        return start, len(ops)
+
+    def make_op(item):
+        if isinstance(item, tuple):
+            head, effect_type, zj_seq = item
+            start, end = emit_block(zj_seq)
+            if isinstance(head, str):
+                # 条件判断操作 (如 DT>RS4:C+zj(2))
+                move_part, condition = head.split(":")
+                count = int(move_part[5:]) if move_part[5:].isdigit() else 1
+                return Op(OP_MOVE, ZONES[move_part[:2]], ZONES[move_part[3:5]], count,
+                          condition, EFFECT_ZJ, start, end, 0)
+            if effect_type == "szj":
+                return Op(OP_DAMAGE, None, None, head, None, EFFECT_SZJ, start, end,
+                          carry_id(head, zj_seq))
+            return Op(OP_DAMAGE, None, None, head, None, EFFECT_ZJ, start, end, 0)
+
+        if isinstance(item, str):
+            if item.startswith("fx"):
+                return Op(OP_FX, None, None, int(item[2:]), None, EFFECT_NONE, 0, 0, 0)
+            if ">" in item:
+                # 无条件移动 (如 DT>RS, DT>RS4)
+                count = int(item[5:]) if item[5:].isdigit() else 1
+                return Op(OP_MOVE, ZONES[item[:2]], ZONES[item[3:5]], count,
+                          None, EFFECT_NONE, 0, 0, 0)
+            code = OP_ADD if item[2] == "+" else OP_REMOVE
+            return Op(code, ZONES[item[:2]], None, 1, item[3], EFFECT_NONE, 0, 0, 0)
+
+        return Op(OP_DAMAGE, None, None, item, None, EFFECT_NONE, 0, 0, 0)
+
+    def emit(item):
+        ops.append(make_op(item))
+        return len(ops) - 1
+
+    slots = []
+    incoming = [0]
+    for item in damage_seq:
+        slot = {}
+        outgoing = [0]
+        for carry in incoming:
+            if carry == 0:
+                index = emit(item)
+            else:
+                effective = _apply_carry(item, carry_items[carry])
+                index = slot[0] if effective is item else emit(effective)
+            slot[carry] = index
+            next_carry = ops[index].carry
+            if next_carry and next_carry not in outgoing:
+                outgoing.append(next_carry)
+        slots.append(slot)
+        incoming = outgoing
+
+    # 处理最后可能剩余的特殊zj效果：以原伤害值再执行一次特殊zj
+    tail = {}
+    for carry in incoming:
+        if carry:
+            dmg, zj_seq = carry_items[carry]
+            tail[carry] = emit((dmg, "szj", zj_seq))
+
+    return DamageProgram(ops, slots, tail)
+
+
+def slot_ops_end(program, k):
+    """前k个顶层位置占用的操作数（追加分支先于其伤害写入，入口的最大下标即该位置的末尾）"""
+    if k == 0:
+        return 0
+    return max(program.slots[k - 1].values()) + 1
+
+
+def _deck_layout(program, D, R, C):
+    """计算固定容量卡组缓冲区的布局，返回 (顶部预留空间, 缓冲区容量)"""
+    n_add = sum(1 for op in program.ops if op.code == OP_ADD)
+    n_moved = sum(op.count for op in program.ops if op.code == OP_MOVE) + n_add
+    total = D + R + C + n_add
+    # 每条操作在一次试验中至多执行一次，因此DT插入不会越过预留空间，DB追加不会越过容量
+    return n_moved, n_moved + total + n_moved + 1
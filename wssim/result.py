@@ -0,0 +1,148 @@
+"""模拟结果（直方图）及其统计量"""
+
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+from statistics import NormalDist
+
+def z_value(confidence):
+    """双侧置信水平对应的标准正态分位数，如0.95对应1.96"""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+def wilson_interval(successes, n, confidence=0.95):
+    """二项比例的Wilson置信区间 (下限, 上限)，在概率接近0或1时比正态近似可靠；n为0时为 (0, 1)"""
+    if n <= 0:
+        return 0.0, 1.0
+    z = z_value(confidence)
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half_width = z * (p * (1 - p) / n + z * z / (4 * n * n)) ** 0.5 / denominator
+    return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+class SimulationResult:
+    """
+    模拟结果：只保存伤害、卡组更新次数、升级次数三个 {取值: 试验数} 直方图，
+    占用空间与试验次数无关。生存函数、均值、标准差、分位数等统计量在首次使用时
+    由直方图一次算出并缓存，merge之后重新计算。
+    没有任何试验时（如空结果尚未merge、第一批之前就被取消）试验数为0，
+    伤害的最小值、最大值、均值、标准差和各平均次数都为0，生存函数为 [0.0]。
+    """
+    def __init__(self, damage_hist=None, refresh_hist=None, level_up_hist=None):
+        self.damage_hist = Counter(damage_hist or {})
+        self.refresh_hist = Counter(refresh_hist or {})
+        self.level_up_hist = Counter(level_up_hist or {})
+        self._stats = None
+
+    @classmethod
+    def from_samples(cls, damage, refreshes, level_ups):
+        """由逐次试验的结果序列构造"""
+        return cls(Counter(damage), Counter(refreshes), Counter(level_ups))
+
+    def merge(self, other):
+        """将另一组结果的直方图累加到自身，返回自身"""
+        self.damage_hist.update(other.damage_hist)
+        self.refresh_hist.update(other.refresh_hist)
+        self.level_up_hist.update(other.level_up_hist)
+        self._stats = None
+        return self
+
+    def _summary(self):
+        """由直方图计算全部统计量：伤害按 (取值-最小值) 计数成稠密数组，一次得到累计分布、生存函数和矩"""
+        if self._stats is None and not sum(self.damage_hist.values()):
+            self._stats = {
+                'trials': 0, 'min': 0, 'max': 0, 'mean': 0.0, 'std': 0.0,
+                'cumulative': [0], 'survival': [0.0],
+                'mean_refreshes': 0.0, 'mean_level_ups': 0.0,
+            }
+        if self._stats is None:
+            low, high = min(self.damage_hist), max(self.damage_hist)
+            counts = [0] * (high - low + 1)
+            for value, count in self.damage_hist.items():
+                counts[value - low] += count
+            cumulative = list(accumulate(counts))
+            trials = cumulative[-1]
+            mean = sum(value * count for value, count in self.damage_hist.items()) / trials
+            variance = sum(count * (value - mean) ** 2
+                           for value, count in self.damage_hist.items()) / trials
+            # P(伤害 ≥ i) = 1 - P(伤害 ≤ i-1)
+            survival = []
+            for i in range(max(high, 0) + 1):
+                if i <= low:
+                    survival.append(1.0)
+                elif i > high:
+                    survival.append(0.0)
+                else:
+                    survival.append((trials - cumulative[i - low - 1]) / trials)
+            self._stats = {
+                'trials': trials,
+                'min': low,
+                'max': high,
+                'mean': mean,
+                'std': variance ** 0.5,
+                'cumulative': cumulative,
+                'survival': survival,
+                'mean_refreshes': self._mean(self.refresh_hist),
+                'mean_level_ups': self._mean(self.level_up_hist),
+            }
+        return self._stats
+
+    @staticmethod
+    def _mean(hist):
+        return sum(value * count for value, count in hist.items()) / sum(hist.values())
+
+    @property
+    def trials(self):
+        return self._summary()['trials']
+
+    @property
+    def min_damage(self):
+        return self._summary()['min']
+
+    @property
+    def max_damage(self):
+        return self._summary()['max']
+
+    def mean_damage(self):
+        return self._summary()['mean']
+
+    def std_damage(self):
+        return self._summary()['std']
+
+    def mean_refreshes(self):
+        return self._summary()['mean_refreshes']
+
+    def mean_level_ups(self):
+        return self._summary()['mean_level_ups']
+
+    def percentile(self, q):
+        """伤害的q分位数（0 ≤ q ≤ 100），取累计试验数首次达到 q% 的伤害值"""
+        stats = self._summary()
+        index = bisect_left(stats['cumulative'], stats['trials'] * q / 100)
+        return stats['min'] + min(index, len(stats['cumulative']) - 1)
+
+    def survival_interval(self, k, confidence=0.95):
+        """P(伤害≥k) 的Wilson置信区间 (下限, 上限)"""
+        stats = self._summary()
+        trials, low = stats['trials'], stats['min']
+        if k <= low:
+            at_least = trials
+        elif k > stats['max']:
+            at_least = 0
+        else:
+            at_least = trials - stats['cumulative'][k - low - 1]
+        return wilson_interval(at_least, trials, confidence)
+
+    def mean_interval(self, confidence=0.95):
+        """期望伤害的正态近似置信区间 (下限, 上限)"""
+        stats = self._summary()
+        n = stats['trials']
+        half_width = z_value(confidence) * stats['std'] / (n - 1) ** 0.5 if n > 1 else 0.0
+        return stats['mean'] - half_width, stats['mean'] + half_width
+
+    def survival(self, max_dmg=None):
+        """返回 [P(伤害≥0), P(伤害≥1), ..., P(伤害≥max_dmg)]"""
+        probs = self._summary()['survival']
+        if max_dmg is None:
+            return list(probs)
+        return probs[:max_dmg + 1] + [0.0] * (max_dmg + 1 - len(probs))
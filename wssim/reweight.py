@@ -0,0 +1,148 @@
+"""
+似然比重新加权：在一个参考卡组构成上模拟一次，估计相邻的 N / RC / CC 取值下的伤害分布。
+
+同一条试验轨迹（每次翻出/抽出的卡型相同）在另一种构成下的概率，只差在各区域高潮卡数的偏移：
+牌组中段偏移 N'-N，休息室偏移 RC'-RC，计时区偏移 CC'-CC。卡组更新时休息室的偏移转入中段，
+升级时计时区的偏移转入休息室。每次随机判定按两种构成下的概率之比更新权重。
+参考构成下某卡型已抽完而另一构成下仍可能抽到时（如参考卡组只剩普通卡），另一构成抽到该卡型的
+那部分概率没有样本，计入不可覆盖的概率；另一构成下需要打乱中段顺序（DT-/DB-）或移除结果不同时，
+该试验的全部权重都不可覆盖。
+"""
+
+from collections import Counter, namedtuple
+
+from .engine import simulate_program
+from .program import ZONE_DT, ZONE_RS, ZONE_CL, compile_damage_sequence
+from .result import SimulationResult
+
+# 一个候选构成的估计：result 的直方图为加权计数（以可覆盖的轨迹为条件，总和为试验数），
+# effective_trials 为有效样本量，uncovered 为该构成下落在不可覆盖轨迹上的估计概率，
+# reliable 为两者是否都在可接受范围内
+WhatIf = namedtuple('WhatIf', ['N', 'RC', 'CC', 'result', 'effective_trials', 'uncovered',
+                               'reliable'])
+
+class Reweighter:
+    """
+    为每个候选构成维护区域偏移和权重，作为 simulate_program 的 reweight 参数，由引擎在各事件处调用。
+    offsets[i][zone] 为第i个候选在该区域比参考多出的高潮卡数（zone 为 ZONE_DT 中段、ZONE_RS、ZONE_CL）。
+    """
+    def __init__(self, reference, candidates):
+        self.reference = reference
+        self.candidates = candidates
+        self.start = [[n - reference[0], 0, rc - reference[1], cc - reference[2]]
+                      for n, rc, cc in candidates]
+        count = len(candidates)
+        self.hists = [(Counter(), Counter(), Counter()) for _ in range(count)]
+        self.weight_sq = [0.0] * count
+        self.uncovered = [0.0] * count
+        self.trials = 0
+
+    def start_trial(self):
+        self.offsets = [offset[:] for offset in self.start]
+        self.weights = [1.0] * len(self.candidates)
+
+    def drawn(self, zone, climax, total, drew):
+        """参考构成下该区域 climax/total 为高潮卡，实际抽到 drew；按各候选的概率之比更新权重"""
+        normal = total - climax
+        for i, offset in enumerate(self.offsets):
+            if not self.weights[i]:
+                continue
+            alt_climax = climax + offset[zone]
+            alt_normal = normal - offset[zone]
+            if alt_climax < 0 or alt_normal < 0:
+                self.weights[i] = 0.0
+            elif not climax and alt_climax:
+                # 参考构成只能抽到普通卡：另一构成抽到高潮卡的部分没有样本
+                self.uncovered[i] += self.weights[i] * alt_climax / total
+                self.weights[i] *= alt_normal / normal
+            elif not normal and alt_normal:
+                self.uncovered[i] += self.weights[i] * alt_normal / total
+                self.weights[i] *= alt_climax / climax
+            elif drew:
+                self.weights[i] *= alt_climax / climax
+            else:
+                self.weights[i] *= alt_normal / normal
+
+    def _uncover(self, i):
+        self.uncovered[i] += self.weights[i]
+        self.weights[i] = 0.0
+
+    def refreshed(self):
+        for offset in self.offsets:
+            offset[ZONE_DT], offset[ZONE_RS] = offset[ZONE_RS], 0
+
+    def materialized(self):
+        for i, offset in enumerate(self.offsets):
+            if offset[ZONE_DT]:
+                self._uncover(i)
+
+    def leveled(self, lvl_c):
+        """计时区恰好7张时升级：各候选的高潮卡数不同，进入休息室的高潮卡数随之不同"""
+        gained = lvl_c if lvl_c < 7 else 6
+        for i, offset in enumerate(self.offsets):
+            alt_c = lvl_c + offset[ZONE_CL]
+            if not 0 <= alt_c <= 7:
+                self.weights[i] = 0.0
+                continue
+            offset[ZONE_RS] += (alt_c if alt_c < 7 else 6) - gained
+            offset[ZONE_CL] = 0
+
+    def clock_flushed(self):
+        for offset in self.offsets:
+            offset[ZONE_RS] += offset[ZONE_CL]
+            offset[ZONE_CL] = 0
+
+    def fx_moved(self, count, rest_n, moved):
+        for i, offset in enumerate(self.offsets):
+            if min(count, rest_n - offset[ZONE_RS]) != moved:
+                self._uncover(i)
+
+    def removed(self, zone, card_type, have):
+        for i, offset in enumerate(self.offsets):
+            alt_have = have + offset[zone] if card_type == 'C' else have - offset[zone]
+            if (have > 0) != (alt_have > 0):
+                self._uncover(i)
+
+    def record(self, damage, refreshes, level_ups):
+        self.trials += 1
+        for i, weight in enumerate(self.weights):
+            if weight:
+                damage_hist, refresh_hist, level_up_hist = self.hists[i]
+                damage_hist[damage] += weight
+                refresh_hist[refreshes] += weight
+                level_up_hist[level_ups] += weight
+                self.weight_sq[i] += weight * weight
+
+    def what_ifs(self, min_effective=0.1, max_uncovered=0.01):
+        """
+        各候选构成的 WhatIf。直方图按试验数自归一化；
+        有效样本量低于 min_effective×试验数 或不可覆盖比例超过 max_uncovered 时 reliable 为False。
+        """
+        what_ifs = []
+        for (n, rc, cc), hists, weight_sq, uncovered in zip(self.candidates, self.hists,
+                                                            self.weight_sq, self.uncovered):
+            total = sum(hists[0].values())
+            scale = self.trials / total if total else 0.0
+            result = SimulationResult(*({value: weight * scale for value, weight in hist.items()}
+                                        for hist in hists))
+            effective = total * total / weight_sq if weight_sq else 0.0
+            ratio = uncovered / self.trials
+            reliable = effective >= min_effective * self.trials and ratio <= max_uncovered
+            what_ifs.append(WhatIf(n, rc, cc, result if total else None, effective, ratio,
+                                   reliable))
+        return what_ifs
+
+def simulate_what_if(D, N, R, RC, C, CC, damage_seq, candidates, draw_card=False, trials=10000,
+                     seed=None, progress=None, min_effective=0.1, max_uncovered=0.01):
+    """
+    在参考构成 (N, RC, CC) 上模拟一次，返回 (参考结果, 各候选构成的 WhatIf 列表)。
+    candidates 为 (N', RC', CC') 列表，D、R、C 不变。候选离参考越远有效样本量越低，
+    不可靠的候选（reliable 为False）应单独模拟。
+    """
+    for n, rc, cc in candidates:
+        if not (0 <= n <= D and 0 <= rc <= R and 0 <= cc <= C):
+            raise ValueError(f"候选构成超出范围: N={n}, RC={rc}, CC={cc}")
+    reweighter = Reweighter((N, RC, CC), candidates)
+    result = simulate_program(compile_damage_sequence(damage_seq), D, N, R, RC, C, CC, draw_card,
+                              trials, seed, progress, reweight=reweighter)
+    return result, reweighter.what_ifs(min_effective, max_uncovered)
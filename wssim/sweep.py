@@ -0,0 +1,116 @@
+"""参数扫描：同一伤害序列在一组卡组状态 (D, N, R, RC, C, CC) 上批量模拟"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .engine import simulate_program
+from .parallel import shard_seeds
+from .program import compile_damage_sequence
+
+SWEEP_PARAMS = ('D', 'N', 'R', 'RC', 'C', 'CC')
+
+def parse_values(text):
+    """
+    解析扫描取值：单个整数 "8"，区间 "10-50" 或带步长 "10-50:5"（含两端），
+    或逗号分隔的列表 "0,2,4"。格式错误时抛出 ValueError。
+    """
+    values = []
+    for part in text.replace(' ', '').split(','):
+        if '-' in part:
+            span, _, step = part.partition(':')
+            start, end = (int(x) for x in span.split('-'))
+            step = int(step) if step else 1
+            if step <= 0 or end < start:
+                raise ValueError(f"无效的区间: {part}")
+            values.extend(range(start, end + 1, step))
+        else:
+            values.append(int(part))
+    return values
+
+def valid_state(D, N, R, RC, C, CC):
+    """卡组状态是否合法：各区域的高潮卡数不超过该区域总数"""
+    return 0 <= N <= D and 0 <= RC <= R and 0 <= CC <= C
+
+def _sweep_point(args):
+    """进程池中模拟一个网格点"""
+    program, state, draw_card, trials, seed = args
+    return simulate_program(program, *state, draw_card, trials, seed)
+
+class SweepResult:
+    """
+    参数扫描结果。
+    axes    {参数名: 取值列表}，按 SWEEP_PARAMS 的顺序
+    results {(D, N, R, RC, C, CC): SimulationResult}，不含非法状态
+    """
+    def __init__(self, axes, results):
+        self.axes = axes
+        self.results = results
+
+    @property
+    def shape(self):
+        return tuple(len(values) for values in self.axes.values())
+
+    def varying(self):
+        """取值多于一个的参数名"""
+        return [name for name, values in self.axes.items() if len(values) > 1]
+
+    def max_damage(self):
+        return max((result.max_damage for result in self.results.values()), default=0)
+
+    def survival_tensor(self, max_dmg=None):
+        """
+        返回形状为 shape + (max_dmg+1,) 的数组，[..., k] = P(伤害≥k)。
+        非法状态为NaN。
+        """
+        if max_dmg is None:
+            max_dmg = max(self.max_damage(), 0)
+        tensor = np.full(self.shape + (max_dmg + 1,), np.nan)
+        for index in np.ndindex(*self.shape):
+            state = tuple(values[i] for values, i in zip(self.axes.values(), index))
+            result = self.results.get(state)
+            if result is not None:
+                tensor[index] = result.survival(max_dmg)
+        return tensor
+
+    def probability_grid(self, k):
+        """各网格点 P(伤害≥k)，形状为 shape"""
+        return self.survival_tensor(max(k, 0))[..., k]
+
+def sweep(damage_seq, D, N, R, RC, C, CC, draw_card=False, trials=10000, workers=None,
+          seed=None, progress=None):
+    """
+    对 D/N/R/RC/C/CC 的取值网格逐点模拟，每个参数可为整数或整数序列，返回 SweepResult。
+    伤害序列只编译一次，所有网格点共用一个进程池，各点的种子由seed派生。
+    progress(已完成点数, 总点数) 每完成一个网格点调用一次，可抛出 SimulationCancelled 取消。
+    """
+    program = compile_damage_sequence(damage_seq)
+    axes = {name: [value] if isinstance(value, int) else list(value)
+            for name, value in zip(SWEEP_PARAMS, (D, N, R, RC, C, CC))}
+    states = [state for state in itertools.product(*axes.values()) if valid_state(*state)]
+    tasks = [(program, state, draw_card, trials, point_seed)
+             for state, point_seed in zip(states, shard_seeds(seed, len(states)))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+
+    results = {}
+    if workers == 1:
+        for done, task in enumerate(tasks, 1):
+            results[task[1]] = _sweep_point(task)
+            if progress is not None:
+                progress(done, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_sweep_point, task): task[1] for task in tasks}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    if progress is not None:
+                        progress(done, len(tasks))
+            except BaseException:
+                # 取消时丢弃尚未开始的网格点
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    return SweepResult(axes, results)
@@ -0,0 +1,78 @@
+"""稀有尾部概率的重要性抽样估计：偏向翻出非高潮卡，再按似然比加权"""
+
+from collections import namedtuple
+
+from .engine import simulate_program
+from .program import compile_damage_sequence
+from .result import z_value
+
+# probability 为 P(伤害≥threshold) 的无偏估计，std_error 为其标准误，
+# interval 为正态近似置信区间，effective_trials 为权重的有效样本量
+TailEstimate = namedtuple('TailEstimate', ['threshold', 'probability', 'std_error', 'interval',
+                                           'trials', 'effective_trials'])
+
+class TiltedSampler:
+    """
+    重要性抽样：翻开卡组未知部分时，把翻出高潮卡的赔率除以 tilt（tilt > 1 时取消变少、伤害变高），
+    即 q = p / (p + tilt·(1-p))；翻出高潮卡时权重乘 p/q，否则乘 (1-p)/(1-q)。
+    加权后的统计量对原分布无偏。按伤害值累加权重和权重平方，由此得到任意阈值的尾部概率和标准误。
+    作为 simulate_program 的 sampler 参数，由引擎在翻开卡组中段时调用 reveal_climax。
+    """
+    def __init__(self, tilt=2.0):
+        if tilt <= 0:
+            raise ValueError("tilt 必须为正数")
+        self.tilt = tilt
+        self.weight = 1.0
+        self.weight_sum = {}
+        self.weight_sq = {}
+        self.trials = 0
+        self._random = None
+
+    def bind(self, rng):
+        """使用引擎的随机数生成器"""
+        self._random = rng.random
+
+    def start_trial(self):
+        self.weight = 1.0
+
+    def reveal_climax(self, climax, total):
+        """从total张（其中climax张高潮卡）中按倾斜后的概率翻出一张，返回是否为高潮卡"""
+        p = climax / total
+        q = p / (p + self.tilt * (1 - p))
+        if self._random() < q:
+            self.weight *= p / q
+            return True
+        self.weight *= (1 - p) / (1 - q)
+        return False
+
+    def record(self, damage):
+        weight = self.weight
+        self.weight_sum[damage] = self.weight_sum.get(damage, 0.0) + weight
+        self.weight_sq[damage] = self.weight_sq.get(damage, 0.0) + weight * weight
+        self.trials += 1
+
+    def estimate(self, threshold, confidence=0.95):
+        n = self.trials
+        total = sum(w for damage, w in self.weight_sum.items() if damage >= threshold)
+        total_sq = sum(w for damage, w in self.weight_sq.items() if damage >= threshold)
+        probability = total / n
+        variance = max(total_sq / n - probability * probability, 0.0) / (n - 1) if n > 1 else 0.0
+        std_error = variance ** 0.5
+        half_width = z_value(confidence) * std_error
+        effective = total * total / total_sq if total_sq else 0.0
+        return TailEstimate(threshold, probability, std_error,
+                            (max(probability - half_width, 0.0), probability + half_width),
+                            n, effective)
+
+def estimate_tail(D, N, R, RC, C, CC, damage_seq, threshold, draw_card=False, trials=10000,
+                  tilt=2.0, seed=None, confidence=0.95, progress=None):
+    """
+    用重要性抽样估计 P(伤害≥threshold)，返回 TailEstimate。
+    tilt 越大越偏向不取消的翻牌：阈值远高于期望伤害时用 2~4；tilt=1 即普通蒙特卡洛，tilt<1 偏向取消。
+    取消会触发zj追加的序列中，减少取消不一定增加伤害，此时应比较不同tilt下的标准误再选用。
+    effective_trials 远小于命中阈值的试验数时说明权重过于分散，应降低tilt。
+    """
+    sampler = TiltedSampler(tilt)
+    simulate_program(compile_damage_sequence(damage_seq), D, N, R, RC, C, CC, draw_card, trials,
+                     seed, progress, sampler=sampler)
+    return sampler.estimate(threshold, confidence)
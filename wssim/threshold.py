@@ -0,0 +1,62 @@
+"""致死阈值查询：只求 P(伤害≥k)，每次试验在结果确定后立即结束"""
+
+from collections import namedtuple
+
+from .engine import simulate_program
+from .program import (OP_DAMAGE, OP_MOVE, OP_ADD, OP_REMOVE, ZONE_DT, ZONE_DB, ZONE_CL,
+                      compile_damage_sequence, slot_ops_end)
+
+# probability 为 P(伤害≥threshold)，interval 为其Wilson置信区间
+ThresholdEstimate = namedtuple('ThresholdEstimate', ['threshold', 'probability', 'interval', 'trials'])
+
+def _op_reach(ops, op):
+    """一条操作（含追加分支）至多还能增加的伤害：每张离开卡组的牌可能进计时区并触发一次卡组更新"""
+    reach = 1  # 操作开始时的卡组更新
+    if op.code == OP_DAMAGE:
+        reach += 2 * max(op.count, 0)
+    elif op.code == OP_MOVE:
+        if op.src in (ZONE_DT, ZONE_DB):
+            reach += 2 * op.count
+        if op.dst == ZONE_CL:
+            reach += op.count
+    elif op.code == OP_ADD and op.src == ZONE_CL:
+        reach += 1
+    return reach + sum(_op_reach(ops, ops[i]) for i in range(op.start, op.end))
+
+def _reduces(op):
+    """会从计时区移走卡（减少伤害）的操作：CL>xx 和 CL-x"""
+    return op.src == ZONE_CL and op.code in (OP_MOVE, OP_REMOVE)
+
+def stop_bounds(program, draw_card):
+    """
+    计算每个顶层位置结束后的 (keeps, reach)：
+    keeps[i] 为之后的操作都不会减少伤害，reach[i] 为之后至多还能增加的伤害。
+    追加分支在其伤害之前写入，序列结束后的传火追加在最后，
+    因此第i个位置之后可能执行的操作都在 ops[slot_ops_end(program, i+1):] 中。
+    """
+    ops, slots, tail = program
+    # 序列结束后的传火追加、最后的卡组更新和抽牌
+    final = max((_op_reach(ops, ops[i]) for i in tail.values()), default=0) + 1
+    if draw_card:
+        final += 3
+    keeps, reach = [], []
+    remaining = final
+    for k in range(len(slots), 0, -1):
+        keeps.append(not any(_reduces(op) for op in ops[slot_ops_end(program, k):]))
+        reach.append(remaining)
+        remaining += max(_op_reach(ops, ops[i]) for i in slots[k - 1].values())
+    return keeps[::-1], reach[::-1]
+
+def simulate_threshold(D, N, R, RC, C, CC, damage_seq, threshold, draw_card=False, trials=10000,
+                       seed=None, confidence=0.95, progress=None):
+    """
+    估计 P(伤害≥threshold)，与 simulate 同分布，返回 ThresholdEstimate。
+    每个顶层位置结束后，若伤害已达到阈值且之后没有 CL> / CL- 操作会减少伤害，
+    或之后的操作即使全部命中也达不到阈值，就提前结束该次试验（跳过剩余伤害和抽牌）。
+    """
+    program = compile_damage_sequence(damage_seq)
+    keeps, reach = stop_bounds(program, draw_card)
+    result = simulate_program(program, D, N, R, RC, C, CC, draw_card, trials, seed, progress,
+                              early_stop=(threshold, keeps, reach))
+    return ThresholdEstimate(threshold, result.survival(threshold)[threshold],
+                             result.survival_interval(threshold, confidence), result.trials)
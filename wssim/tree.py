@@ -0,0 +1,71 @@
+"""共享前缀的批量模拟：只在末尾几项不同的多个序列，公共前缀每次试验只模拟一次"""
+
+import random
+
+from .engine import simulate_program
+from .program import compile_damage_sequence, slot_ops_end
+
+def _shared_slots(a, b, start):
+    """两个程序从第start个顶层位置起仍然相同的位置数，返回公共前缀的总长度"""
+    k = start
+    for slot_a, slot_b in zip(a.slots[start:], b.slots[start:]):
+        if slot_a != slot_b:
+            break
+        end = slot_ops_end(a, k + 1)
+        if a.ops[:end] != b.ops[:end]:
+            break
+        k += 1
+    return k
+
+def simulate_tree(configs, trials=10000, seed=None, progress=None):
+    """
+    模拟多个配置，按编译后的序列合并成前缀树：每组公共前缀只模拟一次，
+    在分叉处保存试验状态，各分支从保存的状态继续模拟各自的剩余部分。
+    configs 为参数字典列表（键同 compare_paired），卡组状态不同的配置之间不共享。
+    返回与 configs 顺序对应的 SimulationResult 列表；各配置的结果共用前缀的样本，彼此相关。
+    progress(已完成次数, 总次数) 按所有分支的试验次数之和报告，可抛出 SimulationCancelled 取消。
+    """
+    programs = [compile_damage_sequence(config['damage_seq']) for config in configs]
+    master = random.Random(seed)
+    results = [None] * len(configs)
+    total = trials * len(configs)
+    done = 0
+
+    def run(index, start, states):
+        """从第start个位置的状态分布继续模拟配置index到结束，返回各位置结束后的状态"""
+        nonlocal done
+        config = configs[index]
+        program = programs[index]
+        saved = [{} for _ in program.slots[start:]]
+
+        def report(count, _):
+            progress(done + count, total)
+
+        results[index] = simulate_program(
+            program, config['D'], config['N'], config['R'], config['RC'], config['C'],
+            config['CC'], config['draw_card'], trials, master.getrandbits(64),
+            report if progress is not None else None,
+            resume=(start, states) if start else None, checkpoints=saved)
+        done += trials
+        if progress is not None:
+            progress(done, total)
+        return saved
+
+    def solve(group, start, states):
+        # 组内第一个配置模拟到结束，其余配置按与它的公共前缀长度分组，从对应位置的状态分叉
+        first, others = group[0], group[1:]
+        saved = run(first, start, states)
+        branches = {}
+        for index in others:
+            shared = _shared_slots(programs[first], programs[index], start)
+            branches.setdefault(shared, []).append(index)
+        for shared, branch in branches.items():
+            solve(branch, shared, saved[shared - start - 1] if shared > start else states)
+
+    roots = {}
+    for index, config in enumerate(configs):
+        key = tuple(config[name] for name in ('D', 'N', 'R', 'RC', 'C', 'CC'))
+        roots.setdefault(key, []).append(index)
+    for group in roots.values():
+        solve(group, 0, None)
+    return results